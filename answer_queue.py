@@ -0,0 +1,262 @@
+import json
+import queue
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+
+from backend_client import IDEMPOTENT_PATHS
+from resilience import NOT_PROCESSED_STATUS, RETRYABLE_STATUS, LoadShed
+from scheduler import TELEMETRY
+
+# ── ANSWER WRITE-BEHIND QUEUE ───────────────────────────────────
+# /submit-answer is fire-and-forget from the user's point of view:
+# the submit handler enqueues the event and reruns immediately, a
+# single background worker delivers events in batches. When the
+# backend is unreachable events go to a local SQLite spool, which
+# is drained (oldest first) once deliveries succeed again. While the
+# spool holds anything, new batches are spooled behind it, so events
+# go out in order and a steady stream of new ones cannot starve the
+# backlog. Any other
+# fire-and-forget endpoint can get its own queue (`path`). Deliveries
+# go out at the lowest outbound priority (`level`); a shed one is
+# retried like any other failure.
+#
+# Retries follow BackendClient's rule: an event is resent only when
+# the worker cannot have processed it (connect failure, shed, 425 /
+# 429 / 503), unless the path is idempotent. A non-idempotent event
+# whose fate is unknown (read timeout, dropped connection, 500 / 502 /
+# 504) is counted as unconfirmed and not resent, so an answer is
+# never recorded twice.
+# `on_delivered(payload)` runs on the worker for every event the
+# backend may have applied (delivered or unconfirmed).
+
+
+class AnswerQueue:
+    def __init__(
+        self,
+        client,
+        spool_path,
+        path="/submit-answer",
+        batch_size=20,
+        flush_interval=0.5,
+        base_backoff=0.5,
+        max_backoff=30.0,
+        maxsize=10000,
+        level=TELEMETRY,
+        on_delivered=None,
+    ):
+        self.client = client
+        self.on_delivered = on_delivered
+        self.path = path
+        self.level = level
+        self.idempotent = path in IDEMPOTENT_PATHS
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(spool_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " enqueued_at REAL NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        self._db.commit()
+        self._spool_pending = self._db.execute("SELECT 1 FROM spool LIMIT 1").fetchone() is not None
+
+        # delivery state
+        self._failures = 0
+        self._retry_at = 0.0
+
+        # counters
+        self.enqueued = 0
+        self.delivered = 0
+        self.spooled = 0
+        self.dropped = 0
+        self.unconfirmed = 0
+        self.retries = 0
+        self.last_delivery_lag = 0.0
+
+        self._stop = threading.Event()
+        self._worker = threading.Thread(
+            target=self._run, name="answer-queue", daemon=True
+        )
+        self._worker.start()
+
+    # ── producer side ──
+    def put(self, payload):
+        event = (time.time(), payload)
+        self.enqueued += 1
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spool([event])
+
+    # ── metrics ──
+    def depth(self):
+        return self._queue.qsize()
+
+    def spool_depth(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def drain_lag(self):
+        # age of the oldest event not yet delivered (memory or spool)
+        oldest = []
+        with self._queue.mutex:
+            if self._queue.queue:
+                oldest.append(self._queue.queue[0][0])
+        with self._lock:
+            row = self._db.execute("SELECT MIN(enqueued_at) FROM spool").fetchone()
+        if row[0] is not None:
+            oldest.append(row[0])
+        return time.time() - min(oldest) if oldest else 0.0
+
+    def metrics(self):
+        return {
+            "queue_depth": self.depth(),
+            "spool_depth": self.spool_depth(),
+            "drain_lag_seconds": self.drain_lag(),
+            "last_delivery_lag_seconds": self.last_delivery_lag,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "spooled": self.spooled,
+            "dropped": self.dropped,
+            "unconfirmed": self.unconfirmed,
+            "retries": self.retries,
+        }
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._worker.join(timeout)
+
+    # ── worker side ──
+    def _run(self):
+        while not self._stop.is_set():
+            # with a backlog, do not idle waiting for new events
+            batch = self._take_batch(block=not self._spool_pending)
+
+            if time.time() < self._retry_at:
+                # backend is backing off: keep new events durable
+                if batch:
+                    self._spool(batch)
+                else:
+                    self._stop.wait(min(self.flush_interval, self._retry_at - time.time()))
+                continue
+
+            if self._spool_pending:
+                # older spooled events go first, new ones queue behind them
+                if batch:
+                    self._spool(batch)
+                self._drain_spool()
+            elif batch:
+                self._deliver(batch)
+
+        # flush whatever is left in memory so nothing is lost on shutdown
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self._spool(leftover)
+
+    def _take_batch(self, block=True):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait()]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain_spool(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, enqueued_at, payload FROM spool ORDER BY id LIMIT ?",
+                (self.batch_size,),
+            ).fetchall()
+            if not rows:
+                # under the lock: a concurrent _spool() sets it again
+                self._spool_pending = False
+                return
+
+        events = [(enqueued_at, json.loads(payload)) for _, enqueued_at, payload in rows]
+        delivered = self._deliver(events, from_spool=True)
+
+        if delivered:
+            ids = [row[0] for row in rows[:delivered]]
+            with self._lock:
+                self._db.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in ids])
+                self._db.commit()
+
+    def _deliver(self, events, from_spool=False):
+        # returns how many events (from the front) were handled
+        for n, (enqueued_at, payload) in enumerate(events):
+            outcome = self._send(payload)
+
+            if outcome == "retry":
+                self._backoff()
+                if not from_spool:
+                    self._spool(events[n:])
+                return n
+
+            if outcome == "ok":
+                self.delivered += 1
+                self.last_delivery_lag = time.time() - enqueued_at
+            elif outcome == "unknown":
+                self.unconfirmed += 1
+            else:
+                self.dropped += 1
+            if outcome != "drop" and self.on_delivered is not None:
+                try:
+                    self.on_delivered(payload)
+                except Exception:
+                    pass
+
+        self._failures = 0
+        self._retry_at = 0.0
+        return len(events)
+
+    def _send(self, payload):
+        # -> ok | retry | unknown (may have been processed) | drop
+        try:
+            r = self.client.post(self.path, payload, level=self.level)
+        except (requests.exceptions.ConnectTimeout, LoadShed):
+            return "retry"      # never reached the worker
+        except Exception:
+            return "retry" if self.idempotent else "unknown"
+        if r.status_code < 300:
+            return "ok"
+        if r.status_code in NOT_PROCESSED_STATUS:
+            return "retry"
+        if r.status_code in RETRYABLE_STATUS:
+            return "retry" if self.idempotent else "unknown"
+        # 4xx: the event itself is bad, retrying will not help
+        return "drop"
+
+    def _backoff(self):
+        self._failures += 1
+        self.retries += 1
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (self._failures - 1)))
+        self._retry_at = time.time() + random.uniform(delay / 2, delay)
+
+    def _spool(self, events):
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO spool (enqueued_at, payload) VALUES (?, ?)",
+                [(enqueued_at, json.dumps(payload)) for enqueued_at, payload in events],
+            )
+            self._db.commit()
+            self._spool_pending = True
+        self.spooled += len(events)
@@ -0,0 +1,405 @@
+import contextvars
+import json
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import parse_url
+
+import metrics
+from resilience import (
+    NOT_PROCESSED_STATUS,
+    RETRYABLE_STATUS,
+    CircuitBreaker,
+    CircuitOpen,
+    Deadline,
+    DeadlineExceeded,
+    LatencyWindow,
+    LoadShed,
+    backoff_delay,
+)
+from scheduler import PRIORITY_NAMES, SPECULATIVE, current_priority
+from tracing import CLIENT, TRACER
+
+# ── BACKEND CLIENT ──────────────────────────────────────────────
+# One pooled, keep-alive HTTP session per process. Every Streamlit
+# session shares it, so repeat calls to the worker reuse warm
+# TCP + TLS connections instead of paying a fresh handshake.
+# Every request goes through _request(), where an optional
+# scheduler.RequestScheduler admits it by priority class. call() and
+# each request on the wire are traced; the wire span travels to the
+# worker as a traceparent header. With a cassette.CassetteRecorder,
+# every exchange is also recorded (anonymized) for bench/replay.py.
+
+# (connect, read) seconds per endpoint
+ENDPOINT_TIMEOUTS = {
+    "/login": (5, 10),
+    "/generate-quiz": (5, 90),
+    "/next-topic": (5, 30),
+    "/next-concept": (5, 30),
+    "/check-answer": (5, 30),
+    "/explain-better": (5, 30),
+    "/submit-answer": (5, 5),
+}
+
+DEFAULT_TIMEOUT = (5, 30)
+
+# total seconds one user action may spend on an endpoint, retries included
+ENDPOINT_BUDGETS = {
+    "/login": 15,
+    "/generate-quiz": 120,
+    "/next-topic": 40,
+    "/next-concept": 40,
+    "/check-answer": 40,
+    "/explain-better": 40,
+    "/submit-answer": 10,
+}
+
+DEFAULT_BUDGET = 40
+
+# safe to send twice (retry after a read timeout, hedge)
+IDEMPOTENT_PATHS = frozenset({
+    "/login",
+    "/generate-quiz",
+    "/next-topic",
+    "/next-concept",
+    "/explain-better",
+})
+
+STREAM_ACCEPT = "application/x-ndjson, text/event-stream;q=0.9, application/json;q=0.5"
+
+
+class BackendClient:
+    def __init__(
+        self,
+        base_url,
+        pool_connections=4,
+        pool_maxsize=64,
+        timeouts=None,
+        budgets=None,
+        hedge_percentile=None,
+        breaker_failures=5,
+        breaker_reset=30.0,
+        scheduler=None,
+        recorder=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = dict(ENDPOINT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.budgets = dict(ENDPOINT_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+
+        # resilience state, per endpoint
+        self.hedge_percentile = hedge_percentile
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._latency = {}
+        self._hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        # outbound admission by priority class (None = send right away)
+        self.scheduler = scheduler
+        # traffic capture (None = off)
+        self.recorder = recorder
+
+        # counters
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.warmed = 0
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+        # pool_maxsize bounds idle keep-alive sockets per host; pool_block=False
+        # lets bursts above it open extra (non-pooled) connections instead of
+        # queueing behind busy ones
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def warm(self, connections=4, timeout=5.0):
+        # resolve the host and open `connections` keep-alive sockets (TCP,
+        # plus TLS for https) into the pool before the first real request;
+        # -> sockets opened. Uses the pool requests itself will pick.
+        u = parse_url(self.base_url)
+        socket.getaddrinfo(u.host, u.port or (443 if u.scheme == "https" else 80),
+                           proto=socket.IPPROTO_TCP)
+
+        request = requests.Request("POST", self.base_url).prepare()
+        adapter = self.session.get_adapter(self.base_url)
+        pool = adapter.get_connection_with_tls_context(request, self.session.verify)
+
+        opened = []
+        try:
+            for _ in range(min(connections, pool.pool.maxsize)):
+                conn = pool._get_conn()
+                conn.timeout = timeout
+                if not conn.is_connected:
+                    conn.connect()
+                opened.append(conn)
+        finally:
+            for conn in opened:
+                pool._put_conn(conn)
+        self.warmed += len(opened)
+        return len(opened)
+
+    def timeout_for(self, path, timeout=None):
+        if timeout is None:
+            return self.timeouts.get(path, DEFAULT_TIMEOUT)
+        if isinstance(timeout, (int, float)):
+            return (min(DEFAULT_TIMEOUT[0], timeout), timeout)
+        return timeout
+
+    def post(self, path, payload, timeout=None, level=None):
+        # single attempt; level: outbound priority (default the caller's)
+        return self._request(path, payload, self.timeout_for(path, timeout), level=level)
+
+    def deadline(self, path):
+        return Deadline(self.budgets.get(path, DEFAULT_BUDGET))
+
+    def call(self, path, payload, retries=2, deadline=None):
+        # one user action: retries with jittered backoff inside the deadline,
+        # only where safe, behind the endpoint's circuit breaker
+        with TRACER.span(f"call {path}", **{"url.path": path}) as span:
+            r = self._call(path, payload, retries, deadline, span)
+            span.set("http.response.status_code", r.status_code)
+            return r
+
+    def _call(self, path, payload, retries, deadline, span):
+        deadline = deadline or self.deadline(path)
+        breaker = self.breaker(path)
+        idempotent = path in IDEMPOTENT_PATHS
+        connect, read = self.timeout_for(path)
+        last_response = None
+        last_error = None
+
+        for attempt in range(retries + 1):
+            if attempt:
+                self.retries += 1
+                metrics.observe_retry(path, metrics.mode_for(path, payload))
+                delay = min(backoff_delay(attempt - 1), deadline.remaining())
+                span.event("retry", attempt=attempt, backoff_seconds=round(delay, 3))
+                time.sleep(delay)
+
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                break
+            if not breaker.allow():
+                span.event("circuit_open")
+                metrics.observe_circuit_open(path, metrics.mode_for(path, payload))
+                raise CircuitOpen(f"Backend unavailable ({path} circuit open)")
+
+            timeout = (min(connect, remaining), min(read, remaining))
+            try:
+                r = self._send(path, payload, timeout, hedge=idempotent)
+            except requests.exceptions.ConnectTimeout as e:
+                # never reached the worker: always safe to retry
+                breaker.record_failure()
+                last_error = e
+                continue
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                breaker.record_failure()
+                last_error = e
+                if idempotent:
+                    continue
+                raise
+            # every other way out resolves a half-open probe too, or
+            # the breaker would reject the endpoint until a restart
+            except LoadShed:
+                breaker.release()
+                raise
+            except Exception:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+
+            if r.status_code in RETRYABLE_STATUS:
+                breaker.record_failure()
+                last_response = r
+                if idempotent or r.status_code in NOT_PROCESSED_STATUS:
+                    continue
+                return r
+
+            breaker.record_success()
+            return r
+
+        if last_response is not None:
+            return last_response
+        if last_error is not None:
+            raise last_error
+        raise DeadlineExceeded(f"Deadline exceeded for {path}")
+
+    def breaker(self, path):
+        with self._lock:
+            breaker = self._breakers.get(path)
+            if breaker is None:
+                breaker = self._breakers[path] = CircuitBreaker(
+                    self.breaker_failures, self.breaker_reset
+                )
+            return breaker
+
+    def latency(self, path):
+        with self._lock:
+            window = self._latency.get(path)
+            if window is None:
+                window = self._latency[path] = LatencyWindow()
+            return window
+
+    def health(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            "breakers": {path: b.state for path, b in breakers.items()},
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "warmed_connections": self.warmed,
+        }
+
+    def _timed_post(self, path, payload, timeout, level=None):
+        start = time.monotonic()
+        r = self._request(path, payload, self.timeout_for(path, timeout), level=level)
+        if r.status_code < 500:
+            self.latency(path).add(time.monotonic() - start)
+        return r
+
+    def _send(self, path, payload, timeout, hedge=False):
+        # hedged request: if the first attempt is slower than the endpoint's
+        # recent p-th percentile, race a duplicate and take the first success
+        after = None
+        if hedge and self.hedge_percentile:
+            after = self.latency(path).percentile(self.hedge_percentile)
+        if after is None or after >= timeout[1]:
+            return self._timed_post(path, payload, timeout)
+
+        # hedge threads do not inherit the caller's context: the primary
+        # runs in a copy of it (span, class, a shared flight's priority)
+        level = current_priority()
+        primary = self._hedge_pool.submit(
+            contextvars.copy_context().run, self._timed_post, path, payload, timeout, level
+        )
+        try:
+            return primary.result(timeout=after)
+        except FutureTimeout:
+            pass
+
+        self.hedged += 1
+        TRACER.current().event("hedge", after_seconds=round(after, 3))
+        backup_timeout = (timeout[0], max(0.1, timeout[1] - after))
+        # the duplicate is extra load: it queues behind everything else
+        backup = self._hedge_pool.submit(
+            TRACER.bind(self._timed_post), path, payload, backup_timeout, max(level, SPECULATIVE)
+        )
+        # a retryable status (a 5xx, a shed) is returned only once no
+        # other attempt can answer properly
+        pending = {primary, backup}
+        error = fallback = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    r = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if r.status_code in RETRYABLE_STATUS:
+                    if fallback is not None:
+                        fallback.close()
+                    fallback = r
+                    continue
+                if future is backup:
+                    self.hedge_wins += 1
+                if fallback is not None:
+                    fallback.close()
+                return r
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def stream(self, path, payload, timeout=None):
+        # caller iterates the body incrementally and must close the response
+        return self._request(
+            path,
+            payload,
+            self.timeout_for(path, timeout),
+            headers={"Accept": STREAM_ACCEPT},
+            stream=True,
+        )
+
+    def _request(self, path, payload, timeout, headers=None, stream=False, level=None):
+        level = current_priority() if level is None else level
+        with TRACER.span(f"POST {path}", kind=CLIENT, **{
+            "http.request.method": "POST",
+            "url.path": path,
+            "quiz.priority": PRIORITY_NAMES[level],
+        }) as span:
+            if self.scheduler is not None:
+                with self.scheduler.slot(path, level):
+                    span.event("admitted")
+                    return self._post(path, payload, timeout, headers, stream, span, level)
+            return self._post(path, payload, timeout, headers, stream, span, level)
+
+    def _post(self, path, payload, timeout, headers, stream, span, level):
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        if span.traceparent:
+            headers["traceparent"] = span.traceparent
+        body = json.dumps(payload).encode()
+        mode = metrics.mode_for(path, payload)
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            r = self.session.post(
+                self.url(path),
+                data=body,
+                timeout=timeout,
+                headers=headers,
+                stream=stream,
+            )
+        except requests.exceptions.RequestException as e:
+            elapsed = time.perf_counter() - start
+            metrics.observe_request(path, mode, elapsed, len(body), error=e)
+            if self.recorder is not None:
+                self.recorder.capture(path, payload, PRIORITY_NAMES[level], started, elapsed, error=e)
+            raise
+
+        span.set("http.response.status_code", r.status_code)
+        if r.status_code >= 500:
+            span.fail(f"HTTP {r.status_code}")
+
+        # streamed bodies: latency is time-to-headers, size is unknown
+        elapsed = time.perf_counter() - start
+        metrics.observe_request(
+            path,
+            mode,
+            elapsed,
+            len(body),
+            response=r,
+            response_bytes=None if stream else len(r.content),
+        )
+        if self.recorder is not None:
+            self.recorder.capture(path, payload, PRIORITY_NAMES[level], started, elapsed,
+                                  response=r, stream=stream)
+        return r
+
+    def close(self):
+        self.session.close()
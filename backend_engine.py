@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from scheduler import PRIORITY_NAMES, current_priority, with_priority
+from tracing import TRACER
+
+# ── BACKEND EXECUTION ENGINE ────────────────────────────────────
+# A capped, fair executor for every background backend job:
+# prefetched and streamed rounds, warm-up generation, concept
+# lookahead, explanation speculation. Script runs and workers submit
+# plain callables from any thread and get a concurrent.futures.Future
+# back, so independent calls run side by side instead of one after
+# another.
+#
+# Admission, under one lock:
+#   max_concurrency  jobs running at once, process-wide (the number
+#                    of backend connections background work may hold)
+#   per_user         jobs running at once for one owner
+# Waiting jobs are queued per priority class (scheduler.py) and per
+# owner: the highest class with a startable job goes first, owners
+# take turns within it, so one user's burst of prefetches queues
+# behind itself instead of in front of everyone else. Jobs run under
+# their class, which the outbound scheduler sees on every request,
+# and inside the trace span that submitted them.
+#
+# It is a thread pool, not async I/O: each job is a blocking call on
+# the shared pooled requests session and holds a worker thread while
+# it waits. Foreground calls (login, grading, a round the user is
+# waiting for, post() in the app) do not go through it at all: they
+# block the script thread that makes them, and only the outbound
+# scheduler (BackendClient.scheduler) caps and orders them.
+
+
+class BackendEngine:
+    def __init__(self, max_concurrency=16, per_user=4):
+        self.max_concurrency = max_concurrency
+        self.per_user = per_user
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="backend-io"
+        )
+        self._lock = threading.Lock()
+        # per class: owner -> deque[(fn, args, future, queued_at)]
+        self._waiting = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._running = {}              # owner -> jobs running
+        self._active = 0
+
+        # counters (under the lock)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.deferred = 0               # passed over: owner at its per_user cap
+        self.peak_running = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait = 0.0
+
+    def submit(self, owner, fn, *args, level=None):
+        # level: scheduler class, default the caller's own
+        level = current_priority() if level is None else level
+        future = Future()
+        job = (TRACER.bind(with_priority(level, fn)), args, future, time.perf_counter())
+        with self._lock:
+            self.submitted += 1
+            self._waiting[level].setdefault(owner, deque()).append(job)
+        self._dispatch()
+        return future
+
+    def run(self, owner, fn, *args, timeout=None, level=None):
+        return self.submit(owner, fn, *args, level=level).result(timeout=timeout)
+
+    def executor(self, owner, level=None):
+        # a ThreadPoolExecutor look-alike whose jobs run as `owner`
+        return OwnerExecutor(self, owner, level)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ── internals ──
+    def _next(self):
+        # lock held -> (owner, job) to start next, or None
+        for waiting in self._waiting:
+            for owner in list(waiting):
+                if self._running.get(owner, 0) >= self.per_user:
+                    self.deferred += 1
+                    continue
+                jobs = waiting.pop(owner)
+                job = jobs.popleft()
+                if jobs:
+                    waiting[owner] = jobs       # back of the round-robin
+                return owner, job
+        return None
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            while self._active < self.max_concurrency:
+                picked = self._next()
+                if picked is None:
+                    break   # nothing waiting, or every owner is at its cap
+                owner, (fn, args, future, queued_at) = picked
+                if not future.set_running_or_notify_cancel():
+                    self.cancelled += 1
+                    continue
+
+                wait = time.perf_counter() - queued_at
+                self.queue_wait_seconds += wait
+                self.max_queue_wait = max(self.max_queue_wait, wait)
+                self._running[owner] = self._running.get(owner, 0) + 1
+                self._active += 1
+                self.peak_running = max(self.peak_running, self._active)
+                started.append((owner, fn, args, future))
+        for job in started:
+            self._pool.submit(self._run, *job)
+
+    def _run(self, owner, fn, args, future):
+        result = error = None
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            error = e
+        with self._lock:
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._active -= 1
+            self._running[owner] -= 1
+            if not self._running[owner]:
+                del self._running[owner]
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+        self._dispatch()
+
+    # ── metrics ──
+    def stats(self):
+        with self._lock:
+            started = self.completed + self.failed + self._active
+            return {
+                "running": self._active,
+                "queued": sum(len(q) for w in self._waiting for q in w.values()),
+                "peak_running": self.peak_running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "deferred": self.deferred,
+                "queue_wait_seconds": self.queue_wait_seconds,
+                "mean_queue_wait": self.queue_wait_seconds / started if started else 0.0,
+                "max_queue_wait": self.max_queue_wait,
+            }
+
+
+class OwnerExecutor:
+    def __init__(self, engine, owner, level=None):
+        self.engine = engine
+        self.owner = owner
+        self.level = level
+
+    def submit(self, fn, *args):
+        return self.engine.submit(self.owner, fn, *args, level=self.level)
@@ -0,0 +1,112 @@
+import argparse
+import json
+import sqlite3
+import sys
+
+from question import valid_question
+from question_bank import QuestionBank, bank_key, write_bank
+
+# ── QUESTION BANK BUILDER ───────────────────────────────────────
+# Compiles question dumps into the mmapped bank the app serves
+# built-in category rounds from (QUIZ_QUESTION_BANK). Inputs:
+#
+#   *.json / *.jsonl   /generate-quiz responses ({"questions": [...]}),
+#                      question lists or single questions; records may
+#                      carry topic / difficulty / mode, otherwise the
+#                      --topic / --difficulty / --mode defaults apply
+#   --from-cache DB    every set in a quiz_cache.sqlite3 (already
+#                      generated rounds, keyed by topic|difficulty|mode)
+#
+# Questions are validated and de-duplicated per key by their text.
+#
+#   python -m bench.build_bank -o .quiz_data/question_bank.qbk dumps/*.jsonl \
+#       --from-cache .quiz_data/quiz_cache.sqlite3
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def _questions(record, defaults):
+    # -> (topic, difficulty, mode, [questions]) for one dump record
+    meta = {k: record.get(k) or defaults[k] for k in defaults} if isinstance(record, dict) else defaults
+    if isinstance(record, dict) and "questions" in record:
+        questions = record["questions"]
+    elif isinstance(record, list):
+        questions = record
+    else:
+        questions = [record]
+    return meta["topic"], meta["difficulty"], meta["mode"], questions
+
+
+def from_cache(path):
+    db = sqlite3.connect(path)
+    try:
+        for key, payload in db.execute("SELECT key, payload FROM sets"):
+            topic, difficulty, mode, _ = key.split("|")
+            yield topic, difficulty, mode, json.loads(payload)
+    finally:
+        db.close()
+
+
+def collect(sources):
+    sets, seen = {}, set()
+    dropped = 0
+    for topic, difficulty, mode, questions in sources:
+        if not topic or not difficulty:
+            dropped += len(questions)
+            continue
+        key = bank_key(topic, difficulty, mode)
+        for q in questions:
+            usable = valid_question(q) and str(q.get("correct", "")).strip().upper() in {
+                str(k).strip().upper() for k in q["choices"]
+            }
+            text = " ".join(str(q.get("question", "")).lower().split())
+            if not usable or (key, text) in seen:
+                dropped += 1
+                continue
+            seen.add((key, text))
+            sets.setdefault(key, []).append(q)
+    return sets, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile question dumps into a question bank")
+    parser.add_argument("inputs", nargs="*", help="JSON / JSONL question dumps")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--from-cache", action="append", default=[], help="quiz_cache.sqlite3 to include")
+    parser.add_argument("--topic")
+    parser.add_argument("--difficulty")
+    parser.add_argument("--mode", default="quiz")
+    args = parser.parse_args()
+
+    defaults = {"topic": args.topic, "difficulty": args.difficulty, "mode": args.mode}
+    sources = [
+        _questions(record, defaults)
+        for path in args.inputs
+        for record in _records(path)
+    ]
+    for path in args.from_cache:
+        sources.extend(from_cache(path))
+
+    sets, dropped = collect(sources)
+    if not sets:
+        sys.exit("no usable questions")
+
+    write_bank(args.output, sets)
+    bank = QuestionBank(args.output)
+    for key in bank.keys():
+        topic, difficulty, mode = key.split("|")
+        print(f"{key:40} {bank.count(topic, difficulty, mode):6d}")
+    stats = bank.stats()
+    print(f"{stats['questions']} questions in {stats['keys']} keys, "
+          f"{stats['bytes'] / 1024:.1f} KiB, {dropped} dropped -> {args.output}")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()
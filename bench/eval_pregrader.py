@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import zlib
+
+from pregrader import PreGrader, fit, load_model
+
+# ── PRE-GRADER EVALUATION ───────────────────────────────────────
+# Replays backend-graded answers (JSONL with concept_id, core_idea,
+# ideal_explanation, answer_text, correct) through the local
+# pre-grader and reports, per confidence threshold, how many answers
+# would be graded locally (shown without waiting on /check-answer,
+# which still receives them write-behind) and how often the local
+# verdict agrees with the backend. Collect real data by running the
+# app with QUIZ_PREGRADER=shadow QUIZ_PREGRADER_LOG=graded.jsonl.
+#
+#   python -m bench.eval_pregrader graded.jsonl --thresholds 0.9 0.95 0.99
+#   python -m bench.eval_pregrader graded.jsonl --fit .quiz_data/pregrader_model.json
+#
+# --fit fits the logistic weights on part of the log (by concept, so
+# held-out concepts are unseen), then picks the lowest threshold whose
+# held-out agreement reaches --target; the app's "on" mode only runs
+# with such a model (QUIZ_PREGRADER_MODEL). The bundled sample is a
+# smoke test, far too small to calibrate on.
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "pregrader_sample.jsonl")
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(records, threshold, model=None):
+    grader = PreGrader(
+        threshold=threshold,
+        weights=model["weights"] if model else None,
+        bias=model["bias"] if model else None,
+    )
+    resolved = agree = false_pass = false_fail = 0
+
+    for rec in records:
+        local = grader.grade(
+            rec["concept_id"], rec["core_idea"], rec["ideal_explanation"], rec["answer_text"]
+        )
+        if local is None:
+            continue
+        resolved += 1
+        if local["correct"] == bool(rec["correct"]):
+            agree += 1
+        elif local["correct"]:
+            false_pass += 1
+        else:
+            false_fail += 1
+
+    return {
+        "threshold": threshold,
+        "records": len(records),
+        "resolved": resolved,
+        "resolved_locally": resolved / len(records) if records else 0.0,
+        "agreement": agree / resolved if resolved else 1.0,
+        "false_pass": false_pass,
+        "false_fail": false_fail,
+    }
+
+
+def split(records, holdout):
+    # deterministic, by concept: held-out concepts are never trained on
+    train, test = [], []
+    for rec in records:
+        bucket = zlib.crc32(str(rec["concept_id"]).encode()) % 100
+        (test if bucket < holdout * 100 else train).append(rec)
+    return train, test
+
+
+def calibrate(records, args):
+    train, test = split(records, args.holdout)
+    if not train or not test:
+        raise SystemExit("too few concepts to hold some out; log more graded answers")
+    weights, bias = fit(train)
+    model = {"weights": weights.tolist(), "bias": bias}
+
+    grid = [t / 1000 for t in range(900, 1000, 5)]
+    rows = [evaluate(test, t, model) for t in grid]
+    good = [r for r in rows if r["resolved"] >= args.min_resolved and r["agreement"] >= args.target]
+    if not good:
+        raise SystemExit(
+            f"no threshold reaches {args.target:.1%} agreement on {len(test)} held-out answers;"
+            " keep QUIZ_PREGRADER=shadow and log more"
+        )
+    best = good[0]
+    model.update(
+        threshold=best["threshold"],
+        trained_on=len(train),
+        held_out=len(test),
+        held_out_agreement=best["agreement"],
+        held_out_resolved_locally=best["resolved_locally"],
+    )
+    with open(args.fit, "w", encoding="utf-8") as f:
+        json.dump(model, f, indent=2)
+    print(
+        f"fitted on {len(train)}, held out {len(test)}: threshold {best['threshold']:.3f}"
+        f"  agreement {best['agreement']:.1%}  local {best['resolved_locally']:.0%}"
+        f"  false+ {best['false_pass']}  -> {args.fit}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local pre-grader")
+    parser.add_argument("path", nargs="?", default=SAMPLE)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.9, 0.95, 0.99])
+    parser.add_argument("--model", help="evaluate a fitted model file instead of the built-in weights")
+    parser.add_argument("--fit", metavar="MODEL", help="fit and calibrate, write the model here")
+    parser.add_argument("--holdout", type=float, default=0.3, help="share of concepts held out")
+    parser.add_argument("--target", type=float, default=0.99, help="held-out agreement to reach")
+    parser.add_argument("--min-resolved", type=int, default=20, help="held-out answers resolved locally")
+    parser.add_argument("--json", action="store_true", help="print raw JSON rows")
+    args = parser.parse_args()
+
+    records = load(args.path)
+    print(f"{len(records)} graded answers from {args.path}")
+    if args.fit:
+        calibrate(records, args)
+        return
+
+    model = load_model(args.model) if args.model else None
+    if args.model and model is None:
+        parser.error(f"{args.model} is not a pre-grader model")
+    print(f"{'threshold':>9} {'local':>8} {'agreement':>9} {'false+':>6} {'false-':>6}")
+    for threshold in args.thresholds:
+        row = evaluate(records, threshold, model)
+        if args.json:
+            print(json.dumps(row))
+            continue
+        print(
+            f"{row['threshold']:>9.2f} {row['resolved_locally']:>8.0%} "
+            f"{row['agreement']:>9.0%} {row['false_pass']:>6} {row['false_fail']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from bench import stub_backend
+
+# ── END-TO-END FLOW BENCHMARK ───────────────────────────────────
+# Drives streamlit_app.py headlessly against the local stub backend
+# and reports, per user flow: wall time, per-interaction latency,
+# script runs per interaction and backend calls (counted by the stub,
+# so background prefetch / write-behind calls are included).
+#
+#   python -m bench.flows --iterations 3 --json before.json
+#   python -m bench.flows --compare before.json
+#   python -m bench.flows --live      # real `streamlit run` over websocket
+#
+# One "interaction" is one browser event (widget change or click);
+# any st.rerun() inside it shows up as extra script runs. This is the
+# runs-per-interaction measurement; the app exports none of its own. By
+# default the app runs in-process under AppTest; --live starts a
+# Streamlit server and drives it with bench.ws_client, which also
+# measures websocket bytes per interaction.
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+CHOICE = "A. Right answer"     # the stub's correct option
+
+
+class FlowError(Exception):
+    pass
+
+
+class Session:
+    # one simulated browser tab
+
+    def __init__(self, timeout, think=None, on_run=None):
+        from streamlit.testing.v1 import AppTest
+
+        self.timeout = timeout
+        self.app = AppTest.from_file(APP, default_timeout=timeout)
+        self.think = think          # () -> seconds to pause before each interaction
+        self.on_run = on_run        # (seconds) -> None, after each interaction
+        self.latencies = []
+        self.script_runs = []
+        self.bytes_received = None  # not observable in-process
+
+    def run(self):
+        if self.think:
+            time.sleep(self.think())
+        runs = script_runs()
+        start = time.perf_counter()
+        self.app.run()
+        elapsed = time.perf_counter() - start
+        self.latencies.append(elapsed)
+        self.script_runs.append(script_runs() - runs)
+        if self.on_run:
+            self.on_run(elapsed)
+        if self.app.exception:
+            raise FlowError(self.app.exception[0].message)
+        return self
+
+    def has(self, kind, label=None, key=None):
+        return any(
+            (key is not None and w.key == key) or (label is not None and w.label == label)
+            for w in getattr(self.app, kind)
+        )
+
+    def widget(self, kind, label=None, key=None, index=None):
+        if index is not None:
+            return getattr(self.app, kind)[index]
+        for w in getattr(self.app, kind):
+            if (key is not None and w.key == key) or (label is not None and w.label == label):
+                return w
+        raise FlowError(f"no {kind} {key or label!r} on screen")
+
+    def click(self, label=None, key=None):
+        self.widget("button", label, key).click()
+        return self.run()
+
+    def type(self, kind, text, label=None, key=None, index=None):
+        self.widget(kind, label, key, index).input(text)
+        return self.run()
+
+    def select(self, kind, value, label=None, key=None, index=None):
+        self.widget(kind, label, key, index).set_value(value)
+        return self.run()
+
+    def reload(self):
+        # a new tab on the current URL: fresh Streamlit session, same query params
+        from streamlit.testing.v1 import AppTest
+
+        params = dict(self.app.query_params)
+        self.app = AppTest.from_file(APP, default_timeout=self.timeout)
+        self.app.query_params = params
+        return self.run()
+
+
+# ── flow steps ──
+# Steps only look at what is on screen, so they drive either an
+# AppTest Session or a bench.ws_client.StreamlitSession.
+
+def login(s, name, typing=0.0):
+    # `typing`: seconds spent on the login form before the first keystroke
+    s.run()
+    time.sleep(typing)
+    s.type("text_input", name, index=0)
+    s.type("text_input", "bench", index=1)
+    s.entered_at = time.perf_counter()
+    s.click("Enter")
+    if s.has("button", "Enter"):
+        raise FlowError("login failed")
+    s.user_mode = "quiz"
+
+
+def answer_round(s, first=0):
+    if not s.has("radio", key=f"radio_left_{first}"):
+        raise FlowError("no questions loaded")
+    if first == 0 and getattr(s, "ttfq", None) is None and hasattr(s, "entered_at"):
+        s.ttfq = time.perf_counter() - s.entered_at
+    i = first
+    while s.has("radio", key=f"radio_left_{i}"):
+        s.select("radio", CHOICE, key=f"radio_left_{i}")
+        s.click(key=f"submit_quiz_{i}")
+        s.click(key=f"next_quiz_{i}")
+        i += 1
+    if not s.has("button", "Next round ▶"):
+        raise FlowError("round did not finish")
+
+
+def set_mode(s, mode):
+    if getattr(s, "user_mode", "quiz") != mode:
+        s.select("selectbox", mode.title(), index=0)
+        s.user_mode = mode
+
+
+def category_round(s, category="Sports", mode="quiz"):
+    set_mode(s, mode)
+    s.click(category)
+    answer_round(s)
+
+
+def custom_round(s, topic="volcanoes"):
+    set_mode(s, "quiz")
+    s.click("Pick a Topic")
+    s.type("text_input", topic, key="custom_topic_input")
+    s.click(key="start_custom_topic")
+    answer_round(s)
+
+
+def concept_round(s, explain=True):
+    # False once every concept is mastered
+    s.click("Concepts")
+    s.click("Start concept challenge")
+    if not s.has("text_area", key="free_text_answer"):
+        return False
+    s.type("text_area", "it counts the arrangements of particles that match what we see",
+           key="free_text_answer")
+    s.click(key="submit_concept")
+    if not s.has("button", key="explain_more_btn"):
+        raise FlowError("answer was not graded")
+    if explain:
+        s.click(key="explain_more_btn")
+    s.click(key="next_concept")
+    return True
+
+
+def first_question(s, name):
+    # a few seconds on the login form, then straight into a category
+    login(s, name, typing=2.0)
+    s.click("Science")
+    answer_round(s)
+
+
+def quiz_round(s, name):
+    login(s, name)
+    category_round(s)
+    s.click("Next round ▶")
+    if not s.has("radio", key="radio_left_0"):
+        raise FlowError("next round did not start")
+
+
+def adaptive_rounds(s, name, rounds=3):
+    # General Knowledge keeps going with rounds picked for the user
+    login(s, name)
+    category_round(s, "General Knowledge")
+    for _ in range(rounds):
+        s.click("Next round ▶")
+        answer_round(s)
+
+
+def custom_topic(s, name):
+    login(s, name)
+    custom_round(s)
+    s.click("Next round ▶")
+    if not s.has("radio", key="radio_left_0"):
+        raise FlowError("next round did not start")
+
+
+def session_resume(s, name):
+    # reload mid-round: the tab comes back on the next question
+    login(s, name)
+    s.click("Sports")
+    s.select("radio", CHOICE, key="radio_left_0")
+    s.click(key="submit_quiz_0")
+    s.click(key="next_quiz_0")
+    s.reload()
+    if s.has("button", "Enter"):
+        raise FlowError("session was not resumed")
+    answer_round(s, first=1)
+
+
+def concept_challenge(s, name):
+    login(s, name)
+    concept_round(s)
+    s.click("Start concept challenge")
+    if not s.has("text_area", key="free_text_answer"):
+        raise FlowError("next concept did not load")
+
+
+FLOWS = {
+    "first_question": first_question,
+    "quiz_round": quiz_round,
+    "adaptive_rounds": adaptive_rounds,
+    "custom_topic": custom_topic,
+    "concept_challenge": concept_challenge,
+    "session_resume": session_resume,
+}
+
+
+# ── measurement ──
+def script_runs():
+    import metrics
+
+    return sum(s["count"] for s in metrics.RERUN_SECONDS.snapshot())
+
+
+def settle(server, quiet=0.5, limit=15.0):
+    # wait for background calls (prefetch, write-behind) to stop
+    deadline = time.monotonic() + limit
+    last = server.calls
+    while time.monotonic() < deadline:
+        time.sleep(quiet)
+        now = server.calls
+        if now == last:
+            return
+        last = now
+
+
+def measure(name, fn, server, iteration, make_session):
+    calls_before = server.calls
+
+    s = make_session()
+    start = time.perf_counter()
+    try:
+        fn(s, f"{name}-{iteration}")
+    finally:
+        if hasattr(s, "close"):
+            s.close()
+    wall = time.perf_counter() - start
+    runs = sum(s.script_runs)
+
+    settle(server)
+    calls = server.calls
+    calls.subtract(calls_before)
+    calls = {k: v for k, v in calls.items() if v}
+
+    result = {
+        "wall_seconds": wall,
+        "interactions": len(s.latencies),
+        "script_runs": runs,
+        "runs_per_interaction": runs / len(s.latencies),
+        "interaction_p50": statistics.median(s.latencies),
+        "interaction_max": max(s.latencies),
+        "backend_calls": sum(calls.values()),
+        "calls": calls,
+    }
+    if getattr(s, "ttfq", None) is not None:
+        result["ttfq"] = s.ttfq
+    if s.bytes_received is not None:
+        result["kb_per_interaction"] = sum(s.bytes_received) / len(s.latencies) / 1024
+    return result
+
+
+def start_stub(args):
+    server, url = stub_backend.serve(config=stub_backend.config_from_args(args))
+
+    # the app reads these once, when its cached resources are built
+    os.environ["QUIZ_BACKEND"] = url
+    os.environ.setdefault("QUIZ_DATA_DIR", tempfile.mkdtemp(prefix="quiz-bench-"))
+    sys.path.insert(0, os.path.dirname(APP))
+    return server
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def launch_app(env=None, port=None, timeout=60.0):
+    # `streamlit run` in a subprocess (inherits os.environ); -> (proc, url)
+    port = port or free_port()
+    url = f"http://127.0.0.1:{port}"
+    log = tempfile.NamedTemporaryFile(prefix="quiz-app-", suffix=".log", delete=False)
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", APP,
+            "--server.headless", "true",
+            "--server.address", "127.0.0.1",
+            "--server.port", str(port),
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=os.path.dirname(APP),
+        env=dict(os.environ, **(env or {})),
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited with {proc.returncode}, see {log.name}")
+        try:
+            if requests.get(f"{url}/_stcore/health", timeout=1).ok:
+                return proc, url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"streamlit did not come up in {timeout:.0f}s, see {log.name}")
+
+
+def summarize(samples):
+    # medians, except backend calls: mean per iteration (later
+    # iterations can hit warm caches, so calls vary between them)
+    out = {f: statistics.median(s[f] for s in samples) for f in samples[0] if f != "calls"}
+    out["backend_calls"] = statistics.mean(s["backend_calls"] for s in samples)
+    endpoints = {k for s in samples for k in s["calls"]}
+    out["calls"] = {
+        k: round(statistics.mean(s["calls"].get(k, 0) for s in samples), 1)
+        for k in endpoints
+    }
+    return out
+
+
+# (header, result field, scale, width.precision)
+COLUMNS = [
+    ("wall s", "wall_seconds", 1, "7.2"),
+    ("inter.", "interactions", 1, "6.0"),
+    ("runs", "script_runs", 1, "5.0"),
+    ("runs/int", "runs_per_interaction", 1, "8.2"),
+    ("p50 ms", "interaction_p50", 1000, "7.0"),
+    ("max ms", "interaction_max", 1000, "7.0"),
+    ("calls", "backend_calls", 1, "5.1"),
+    ("ttfq ms", "ttfq", 1000, "7.0"),
+    ("KB/int", "kb_per_interaction", 1, "7.1"),
+]
+
+
+def report(results, baseline=None):
+    columns = [c for c in COLUMNS if any(c[1] in r for r in results.values())]
+    print(f"{'flow':<18} " + " ".join(f"{h:>{int(f.split('.')[0])}}" for h, _, _, f in columns))
+    for name, r in results.items():
+        print(f"{name:<18} " + " ".join(
+            f"{r[k] * x:{f}f}" if k in r else " " * int(f.split(".")[0])
+            for _, k, x, f in columns
+        ))
+        print(f"{'':<18} " + ", ".join(f"{k} {v}" for k, v in sorted(r["calls"].items())))
+
+        base = (baseline or {}).get(name)
+        if base:
+            print(f"{'  vs baseline':<18} " + " ".join(
+                f"{(r[k] - base[k]) * x:+{f}f}" if k in base and k in r else " " * int(f.split(".")[0])
+                for _, k, x, f in columns
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end flow benchmark")
+    parser.add_argument("--flows", nargs="*", choices=sorted(FLOWS), default=list(FLOWS))
+    parser.add_argument("--iterations", type=int, default=1)
+    parser.add_argument("--live", action="store_true", help="drive a real streamlit server")
+    stub_backend.add_arguments(parser)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per interaction")
+    parser.add_argument("--json", help="write results here")
+    parser.add_argument("--compare", help="baseline written by --json")
+    args = parser.parse_args()
+
+    server = start_stub(args)
+    app = None
+    if args.live:
+        from bench.ws_client import StreamlitSession
+
+        app, url = launch_app()
+        make_session = lambda: StreamlitSession(url, timeout=args.timeout)
+    else:
+        make_session = lambda: Session(args.timeout)
+
+    results = {}
+    try:
+        for name in args.flows:
+            samples = []
+            for i in range(args.iterations):
+                try:
+                    samples.append(measure(name, FLOWS[name], server, i, make_session))
+                except FlowError as e:
+                    print(f"{name}: FAILED ({e})")
+                    break
+            if samples:
+                results[name] = summarize(samples)
+    finally:
+        if app:
+            app.terminate()
+            app.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import argparse
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from bench import stub_backend
+from bench.flows import (
+    FlowError,
+    category_round,
+    concept_round,
+    custom_round,
+    launch_app,
+    login,
+    start_stub,
+)
+from bench.ws_client import StreamlitSession
+
+# ── CONCURRENT-SESSION LOAD TEST ────────────────────────────────
+# Starts one `streamlit run` process against the local stub and drives
+# N simulated learners at it over the websocket protocol (one thread
+# each, bench.ws_client). Every learner logs in, then loops over
+# activities drawn from a weighted mode mix with lognormal think times
+# between interactions until --duration runs out.
+#
+#   python -m bench.load --sessions 20 --duration 60 --mix quiz=4,tutorial=2,custom=1,concept=3
+#
+# Client side: interaction throughput, p50/p95/p99 rerun latency (one
+# interaction = the script run plus any rerun() it chains), script
+# runs and websocket bytes per interaction. Server side, from the
+# app's JSON metrics export: thread counts by pool (peak / end),
+# process RSS and the deep size of each session's st.session_state.
+
+CATEGORIES = ["General Knowledge", "Sports", "Science", "History", "Geography"]
+TOPICS = ["volcanoes", "jazz", "the Roman Empire", "black holes", "chess openings"]
+
+ACTIVITIES = {
+    "quiz": lambda s, rng: category_round(s, rng.choice(CATEGORIES), "quiz"),
+    "tutorial": lambda s, rng: category_round(s, rng.choice(CATEGORIES), "tutorial"),
+    "custom": lambda s, rng: custom_round(s, rng.choice(TOPICS)),
+    "concept": lambda s, rng: concept_round(s, explain=rng.random() < 0.5),
+}
+
+
+def parse_mix(text):
+    # "quiz=4,concept=1" -> {"quiz": 4.0, "concept": 1.0}
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ACTIVITIES:
+            raise argparse.ArgumentTypeError(f"unknown activity {name!r}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, int(math.ceil(p / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+# ── server-side gauges ──
+class ServerMetrics:
+    # polls the app's QUIZ_METRICS_FILE snapshot, keeping peak gauges
+
+    def __init__(self, path, interval=0.5):
+        self.path = path
+        self.interval = interval
+        self.last = {}
+        self.peak = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-metrics", daemon=True)
+        self._thread.start()
+
+    def read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return self.last
+        self.last = snapshot.get("gauges", {})
+        for prefix in ("quiz_threads", "quiz_process"):
+            peak = self.peak.setdefault(prefix, {})
+            for name, value in self.last.get(prefix, {}).items():
+                peak[name] = max(peak.get(name, 0), value)
+        return self.last
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        return self.read()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.read()
+
+
+# ── learners ──
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.script_runs = 0
+        self.bytes_received = 0
+        self.activities = Counter()
+        self.failures = Counter()
+        self.sessions = []
+
+    def add(self, session):
+        with self.lock:
+            self.sessions.append(session)
+            self.latencies.extend(session.latencies)
+            self.script_runs += sum(session.script_runs)
+            self.bytes_received += sum(session.bytes_received)
+
+
+def learner(n, url, args, mix, stats, start_at, stop_at):
+    rng = random.Random(args.seed * 1000 + n if args.seed is not None else None)
+    mu = math.log(args.think) if args.think > 0 else None
+
+    def think():
+        return rng.lognormvariate(mu, 0.5) if mu is not None else 0.0
+
+    time.sleep(max(0.0, start_at - time.monotonic()))
+    s = StreamlitSession(url, timeout=args.timeout, think=think)
+    try:
+        login(s, f"learner-{n}")
+        while time.monotonic() < stop_at and mix:
+            activity = rng.choices(list(mix), list(mix.values()))[0]
+            if ACTIVITIES[activity](s, rng) is False:
+                del mix[activity]       # e.g. every concept mastered
+                continue
+            with stats.lock:
+                stats.activities[activity] += 1
+    except FlowError as e:
+        with stats.lock:
+            stats.failures[str(e)] += 1
+    except Exception as e:
+        with stats.lock:
+            stats.failures[type(e).__name__] += 1
+    # the tab stays open until the final measurement, like a real user
+    stats.add(s)
+
+
+def report(args, stats, elapsed, server, baseline):
+    lat = stats.latencies
+    interactions = max(len(lat), 1)
+    print(f"sessions {args.sessions}   duration {elapsed:.1f} s   think {args.think:.1f} s")
+    print(
+        f"interactions {len(lat)}  ({len(lat) / elapsed:.1f}/s)   script runs {stats.script_runs}"
+        f"  ({stats.script_runs / elapsed:.1f}/s, {stats.script_runs / interactions:.2f} per interaction)"
+        f"   {stats.bytes_received / interactions / 1024:.1f} KB per interaction"
+    )
+    print("activities   " + ", ".join(f"{k} {v}" for k, v in sorted(stats.activities.items())))
+    if stats.failures:
+        print("failures     " + ", ".join(f"{k} x{v}" for k, v in stats.failures.most_common()))
+    if lat:
+        print(
+            "rerun ms     "
+            f"p50 {percentile(lat, 50) * 1000:.0f}   p95 {percentile(lat, 95) * 1000:.0f}"
+            f"   p99 {percentile(lat, 99) * 1000:.0f}   max {max(lat) * 1000:.0f}"
+        )
+
+    final = server.last
+    threads = final.get("quiz_threads", {})
+    peak = server.peak.get("quiz_threads", {})
+    print(f"threads      peak {peak.get('total', 0):.0f}, at end {threads.get('total', 0):.0f}")
+    for name, n in sorted(peak.items(), key=lambda kv: -kv[1]):
+        if name != "total":
+            print(f"  {name:<26} peak {n:4.0f}   end {threads.get(name, 0):4.0f}")
+
+    outbound = final.get("quiz_outbound", {})
+    if outbound:
+        print(f"outbound     in flight {outbound.get('in_flight', 0):.0f}   throttled {outbound.get('throttled', 0):.0f}")
+        for name in ("interactive", "prefetch", "speculative", "telemetry"):
+            if outbound.get(f"{name}_admitted") or outbound.get(f"{name}_shed"):
+                print(
+                    f"  {name:<12} admitted {outbound[f'{name}_admitted']:5.0f}"
+                    f"   wait mean {outbound[f'{name}_mean_wait'] * 1000:6.0f} ms"
+                    f"   max {outbound[f'{name}_max_wait'] * 1000:6.0f} ms"
+                    f"   shed {outbound[f'{name}_shed']:4.0f}"
+                )
+
+    sizes = final.get("quiz_session_state", {})
+    if sizes.get("sessions"):
+        print(
+            f"session_state mean {sizes['mean_bytes'] / 1024:.1f} KiB"
+            f"   max {sizes['max_bytes'] / 1024:.1f} KiB   {sizes['mean_keys']:.0f} keys"
+            f"   ({sizes['sessions']:.0f} sessions, deep size)"
+        )
+        keys = sorted(
+            ((k[4:-6], v) for k, v in sizes.items() if k.startswith("key_")),
+            key=lambda kv: -kv[1],
+        )
+        for key, size in keys[:8]:
+            print(f"  {key:<26} {size / 1024:8.2f} KiB")
+
+    rss = final.get("quiz_process", {}).get("rss_bytes", 0)
+    base = baseline.get("quiz_process", {}).get("rss_bytes", 0)
+    if rss and base:
+        print(
+            f"process RSS  {base / 2**20:.0f} -> {rss / 2**20:.0f} MiB"
+            f" (peak {server.peak['quiz_process']['rss_bytes'] / 2**20:.0f})"
+            f"   +{(rss - base) / args.sessions / 1024:.0f} KiB per session"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds to start all sessions")
+    parser.add_argument("--think", type=float, default=1.0, help="median think time, seconds")
+    parser.add_argument(
+        "--mix", type=parse_mix, default="quiz=4,tutorial=2,custom=1,concept=3",
+        help="activity weights",
+    )
+    stub_backend.add_arguments(parser)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per interaction")
+    args = parser.parse_args()
+
+    server = start_stub(args)
+    metrics_file = os.path.join(tempfile.mkdtemp(prefix="quiz-load-"), "metrics.json")
+    app, url = launch_app({
+        "QUIZ_METRICS_FILE": metrics_file,
+        "QUIZ_METRICS_INTERVAL": "0.5",
+        "QUIZ_METRICS_SESSION_STATE": "1",
+    })
+
+    try:
+        # warm-up: imports, cached resources and the first script
+        # compile should not be charged to the sessions
+        warm = StreamlitSession(url, timeout=args.timeout)
+        login(warm, "warmup")
+        warm.close()
+        time.sleep(1.0)
+        gauges = ServerMetrics(metrics_file)
+        baseline = gauges.read()
+
+        stats = LoadStats()
+        start = time.monotonic()
+        stop_at = start + args.ramp + args.duration
+        workers = [
+            threading.Thread(
+                target=learner,
+                args=(n, url, args, dict(args.mix), stats,
+                      start + args.ramp * n / args.sessions, stop_at),
+                name=f"learner-{n}",
+                daemon=True,
+            )
+            for n in range(args.sessions)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.monotonic() - start
+
+        time.sleep(1.0)
+        gauges.close()
+        for s in stats.sessions:
+            s.close()
+        report(args, stats, elapsed, gauges, baseline)
+
+        calls = server.calls
+        print("backend      " + ", ".join(f"{k} {v}" for k, v in sorted(calls.items())))
+    finally:
+        app.terminate()
+        app.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend_client import BackendClient
+from backend_engine import BackendEngine
+from bench.load import percentile
+from scheduler import INTERACTIVE, PRIORITY_NAMES, TELEMETRY, RequestScheduler, priority
+from settings import (
+    BACKEND_CONCURRENCY,
+    BACKEND_PER_USER,
+    BREAKER_FAILURES,
+    BREAKER_RESET,
+    HEDGE_PERCENTILE,
+    OUTBOUND_BURST,
+    OUTBOUND_CONCURRENCY,
+    OUTBOUND_RATE,
+    SHED_AFTER,
+)
+
+# ── RECORD AND REPLAY ───────────────────────────────────────────
+# Replays production traffic captured with QUIZ_CAPTURE_FILE (see
+# cassette.py) without the live worker:
+#
+#   python -m bench.replay traffic.jsonl --speed 10 --json before.json
+#   python -m bench.replay traffic.jsonl --speed 10 --compare before.json
+#   python -m bench.replay traffic.jsonl --serve --port 8787 --speed 1
+#
+# The replay backend answers each request with a recorded response,
+# matched on the exact payload, then on the fields that shape the
+# answer (MATCH_FIELDS), then on the endpoint alone, with the recorded
+# status, headers-latency and (for streams) chunk timings.
+#
+# The driver re-drives every recorded session through a BackendClient
+# built from settings.py (scheduler, hedging, breakers) and a
+# BackendEngine, the way the app would: interactive calls block the
+# session, so a slower call pushes the learner's next action back
+# (think times are kept, not absolute times); background calls go to
+# the engine under their recorded class. Recorded retries and hedge
+# duplicates are not re-driven, the client makes its own.
+#
+# --speed divides every gap (and, with --latency scaled, every backend
+# latency) by the factor: 1x reproduces the recording, 100x squeezes an
+# hour into 36 s. With --latency recorded the backend keeps its real
+# latencies, so higher speeds mean more concurrent requests.
+
+MATCH_FIELDS = {
+    "/login": ("name",),
+    "/generate-quiz": ("topic", "start_difficulty", "num_questions", "mode"),
+    "/next-topic": ("user_id",),
+    "/next-concept": ("user_id",),
+    "/check-answer": ("user_id", "concept_id"),
+    "/explain-better": ("concept",),
+}
+
+ERROR_STATUS = {"ReadTimeout": 504, "ConnectTimeout": 504, "Timeout": 504}
+
+
+def load(path):
+    # -> interactions in recorded order
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+
+def request_key(entry_or_path, payload=None):
+    if payload is None:
+        entry_or_path, payload = entry_or_path["path"], entry_or_path["request"]
+    return entry_or_path, json.dumps(payload, sort_keys=True)
+
+
+def first_byte(entry):
+    chunks = entry.get("chunks")
+    return chunks[0][0] if chunks else entry["latency"]
+
+
+# ── replay backend ──
+class Tape:
+    # recorded responses, each served once per match level before the
+    # last one of a key is reused
+
+    def __init__(self, entries):
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._last = {}
+        self._used = set()
+        for n, entry in enumerate(entries):
+            for key in self._keys(entry["path"], entry["request"]):
+                self._queues.setdefault(key, deque()).append((n, entry))
+        self.served = Counter()
+
+    def _keys(self, path, payload):
+        payload = payload if isinstance(payload, dict) else {}
+        return (
+            ("exact",) + request_key(path, payload),
+            ("shape", path) + tuple(str(payload.get(f)) for f in MATCH_FIELDS.get(path, ())),
+            ("path", path),
+        )
+
+    def take(self, path, payload):
+        # -> recorded entry or None
+        with self._lock:
+            for key in self._keys(path, payload):
+                entry = self._pick(key)
+                if entry is not None:
+                    self.served[key[0]] += 1
+                    return entry
+            self.served["miss"] += 1
+            return None
+
+    def _pick(self, key):
+        queue = self._queues.get(key)
+        while queue:
+            n, entry = queue.popleft()
+            if n not in self._used:
+                self._used.add(n)
+                self._last[key] = entry
+                return entry
+        return self._last.get(key)
+
+
+def make_handler(tape, config):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes: without this,
+        # Nagle + delayed ACKs add ~40 ms, which swamps scaled latencies
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json"):
+            body = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _chunk(self, data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/_stats":
+                self._send(200, json.dumps(dict(tape.served)))
+            else:
+                self._send(404, json.dumps({"error": "not found"}))
+
+        def do_POST(self):
+            received = time.monotonic()
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                payload = {}
+
+            entry = tape.take(self.path, payload)
+            if entry is None:
+                self._send(404, json.dumps({"error": f"{self.path} not in cassette"}))
+                return
+
+            time.sleep(config.delay(entry["latency"]))
+            if entry.get("error"):
+                status = ERROR_STATUS.get(entry["error"], 502)
+                self._send(status, json.dumps({"error": f"recorded {entry['error']}"}))
+                return
+            if "chunks" not in entry:
+                self._send(entry["status"], entry.get("body", ""), entry.get("content_type") or "application/json")
+                return
+
+            self.send_response(entry["status"])
+            self.send_header("Content-Type", entry.get("content_type") or "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for offset, data in entry["chunks"]:
+                time.sleep(max(0.0, received + config.delay(offset) - time.monotonic()))
+                if data:
+                    self._chunk(data.encode())
+            self._chunk(b"")
+
+    return Handler
+
+
+class ReplayConfig:
+    def __init__(self, speed=1.0, scale_latency=True):
+        self.speed = speed
+        self.scale_latency = scale_latency
+
+    def delay(self, seconds):
+        return seconds / self.speed if self.scale_latency else seconds
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, entries, config):
+        self.tape = Tape(entries)
+        self.config = config
+        super().__init__(address, make_handler(self.tape, config))
+
+
+def serve(entries, config=None, host="127.0.0.1", port=0):
+    # returns (server, base_url); the server runs on a daemon thread
+    server = ReplayServer((host, port), entries, config or ReplayConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# ── driver ──
+def sessions(entries):
+    # session -> entries to re-drive; retries of a failed request and
+    # hedge duplicates overlapping the original are left to the client
+    out = OrderedDict()
+    pending = {}        # (session, request key) -> ends at, failed
+    for entry in entries:
+        key = (entry["session"],) + request_key(entry)
+        previous = pending.get(key)
+        ok = not entry.get("error") and (entry.get("status") or 500) < 500
+        if previous and (previous[1] or entry["ts"] < previous[0]):
+            if ok:
+                pending[key] = (entry["ts"] + entry["duration"], False)
+            continue
+        pending[key] = (entry["ts"] + entry["duration"], not ok)
+        out.setdefault(entry["session"], []).append(entry)
+    return out
+
+
+class ReplayStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []             # (path, class, replayed s, recorded s, outcome)
+        self.slip = []              # per session: replayed - recorded span, seconds
+
+    def add(self, *row):
+        with self.lock:
+            self.calls.append(row)
+
+
+def replay_one(client, entry, stats, speed_of, first=None):
+    level = PRIORITY_NAMES.index(entry["priority"])
+    path, payload = entry["path"], entry["request"]
+    start = time.monotonic()
+    seconds = None
+    try:
+        with priority(level):
+            if entry["stream"]:
+                r = client.stream(path, payload)
+                try:
+                    for line in r.iter_lines():
+                        if line and seconds is None:
+                            seconds = time.monotonic() - start
+                            if first:
+                                first.set()
+                finally:
+                    r.close()
+            elif level == TELEMETRY:
+                r = client.post(path, payload)      # the answer queue's single attempt
+            else:
+                r = client.call(path, payload)
+        outcome = "ok" if r.status_code < 400 else f"http_{r.status_code}"
+    except Exception as e:
+        outcome = type(e).__name__
+    finally:
+        if first:
+            first.set()
+    if seconds is None:
+        seconds = time.monotonic() - start
+    stats.add(path, entry["priority"], seconds, speed_of(first_byte(entry)), outcome)
+
+
+def drive(session, entries, client, engine, stats, config, t0, start, timeout):
+    # anchor: a recorded instant and when it happened in the replay
+    anchor, anchored_at = t0, start
+    for entry in entries:
+        time.sleep(max(0.0, anchored_at + (entry["ts"] - anchor) / config.speed - time.monotonic()))
+        job_args = (client, entry, stats, config.delay)
+        if entry["priority"] != "interactive":
+            engine.submit(session, replay_one, *job_args, level=PRIORITY_NAMES.index(entry["priority"]))
+            continue
+        if entry["stream"]:
+            # the app waits for the first question, the rest streams in
+            first = threading.Event()
+            engine.submit(session, replay_one, *job_args, first, level=INTERACTIVE)
+            first.wait(timeout)
+            anchor = entry["ts"] + first_byte(entry)
+        else:
+            replay_one(*job_args)
+            anchor = entry["ts"] + entry["duration"]
+        anchored_at = time.monotonic()
+    recorded = (entries[-1]["ts"] - t0) / config.speed
+    with stats.lock:
+        stats.slip.append(time.monotonic() - start - recorded)
+
+
+def run(entries, args):
+    config = ReplayConfig(args.speed, args.latency == "scaled")
+    server, url = serve(entries, config)
+    client = BackendClient(
+        url,
+        hedge_percentile=HEDGE_PERCENTILE,
+        breaker_failures=BREAKER_FAILURES,
+        breaker_reset=BREAKER_RESET,
+        scheduler=RequestScheduler(
+            max_in_flight=OUTBOUND_CONCURRENCY,
+            rate=OUTBOUND_RATE,
+            burst=OUTBOUND_BURST,
+            shed_after=SHED_AFTER,
+        ),
+    )
+    engine = BackendEngine(max_concurrency=BACKEND_CONCURRENCY, per_user=BACKEND_PER_USER)
+
+    by_session = sessions(entries)
+    if args.sessions:
+        by_session = OrderedDict(list(by_session.items())[: args.sessions])
+    stats = ReplayStats()
+    t0 = entries[0]["ts"]
+    start = time.monotonic()
+    workers = [
+        threading.Thread(
+            target=drive,
+            args=(session, session_entries, client, engine, stats, config, t0, start, args.timeout),
+            name=f"replay-{n}",
+            daemon=True,
+        )
+        for n, (session, session_entries) in enumerate(by_session.items())
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    # background calls still in flight
+    while engine.stats()["running"] or engine.stats()["queued"]:
+        time.sleep(0.05)
+    wall = time.monotonic() - start
+
+    outbound = client.scheduler.stats()
+    engine.close()
+    client.close()
+    server.shutdown()
+    return summarize(stats, wall, len(by_session), server.tape.served, outbound)
+
+
+def summarize(stats, wall, sessions, served, outbound):
+    groups = {}
+    for path, level, seconds, recorded, outcome in stats.calls:
+        groups.setdefault(f"{path} {level}", []).append((seconds, recorded, outcome))
+    endpoints = {}
+    for name, rows in sorted(groups.items()):
+        replayed = [r[0] for r in rows]
+        recorded = [r[1] for r in rows]
+        endpoints[name] = {
+            "calls": len(rows),
+            "errors": sum(r[2] != "ok" for r in rows),
+            "recorded_p50": percentile(recorded, 50),
+            "recorded_p95": percentile(recorded, 95),
+            "p50": percentile(replayed, 50),
+            "p95": percentile(replayed, 95),
+        }
+    return {
+        "wall_seconds": wall,
+        "sessions": sessions,
+        "slip_p50": percentile(stats.slip, 50),
+        "slip_p95": percentile(stats.slip, 95),
+        "slip_mean": statistics.mean(stats.slip) if stats.slip else 0.0,
+        "endpoints": endpoints,
+        "errors": dict(Counter(r[4] for r in stats.calls if r[4] != "ok")),
+        "served": dict(served),
+        "outbound": {
+            name: {
+                "admitted": outbound[f"{name}_admitted"],
+                "mean_wait": outbound[f"{name}_mean_wait"],
+                "shed": outbound[f"{name}_shed"],
+            }
+            for name in PRIORITY_NAMES
+        },
+    }
+
+
+def report(args, entries, result, baseline=None):
+    span = entries[-1]["ts"] - entries[0]["ts"]
+    print(
+        f"cassette {args.cassette}: {len(entries)} interactions, {result['sessions']} sessions,"
+        f" {span:.1f} s recorded -> replayed in {result['wall_seconds']:.1f} s"
+        f" at {args.speed:g}x (latency {args.latency})"
+    )
+    print(
+        f"{'endpoint':<16} {'class':<12} {'calls':>5} {'err':>4}"
+        f" {'rec p50':>8} {'p50 ms':>7} {'rec p95':>8} {'p95 ms':>7}"
+    )
+    for name, e in result["endpoints"].items():
+        path, level = name.split(" ")
+        line = (
+            f"{path:<16} {level:<12} {e['calls']:>5} {e['errors']:>4}"
+            f" {e['recorded_p50'] * 1000:>8.0f} {e['p50'] * 1000:>7.0f}"
+            f" {e['recorded_p95'] * 1000:>8.0f} {e['p95'] * 1000:>7.0f}"
+        )
+        base = ((baseline or {}).get("endpoints") or {}).get(name)
+        if base:
+            line += f"   vs baseline p50 {(e['p50'] - base['p50']) * 1000:+.0f}  p95 {(e['p95'] - base['p95']) * 1000:+.0f}"
+        print(line)
+
+    line = (
+        f"session slip     p50 {result['slip_p50'] * 1000:.0f} ms   p95 {result['slip_p95'] * 1000:.0f} ms"
+        f"   (replayed minus recorded session length)"
+    )
+    if baseline:
+        line += f"   vs baseline p95 {(result['slip_p95'] - baseline['slip_p95']) * 1000:+.0f}"
+    print(line)
+    if result["errors"]:
+        print("errors           " + ", ".join(f"{k} x{v}" for k, v in sorted(result["errors"].items())))
+    print("replay backend   " + ", ".join(f"{k} {v}" for k, v in sorted(result["served"].items())))
+    for name, o in result["outbound"].items():
+        if o["admitted"] or o["shed"]:
+            print(f"  {name:<14} admitted {o['admitted']:5d}   wait mean {o['mean_wait'] * 1000:6.0f} ms   shed {o['shed']:4d}")
+
+
+def speed(text):
+    value = float(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a captured traffic cassette")
+    parser.add_argument("cassette", help="file written with QUIZ_CAPTURE_FILE")
+    parser.add_argument("--speed", type=speed, default=1.0, help="replay speed, 1 to 100")
+    parser.add_argument(
+        "--latency", choices=("scaled", "recorded"), default="scaled",
+        help="backend latencies divided by --speed, or as recorded",
+    )
+    parser.add_argument("--sessions", type=int, help="re-drive only the first N sessions")
+    parser.add_argument("--serve", action="store_true", help="only serve the cassette as a backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per interactive call")
+    parser.add_argument("--json", help="write results here")
+    parser.add_argument("--compare", help="baseline written by --json")
+    args = parser.parse_args()
+
+    entries = load(args.cassette)
+    if not entries:
+        parser.error(f"{args.cassette} has no interactions")
+
+    if args.serve:
+        config = ReplayConfig(args.speed, args.latency == "scaled")
+        server, url = serve(entries, config, args.host, args.port)
+        print(f"replaying {len(entries)} interactions on {url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    result = run(entries, args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report(args, entries, result, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import math
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from bench import resp_server, stub_backend
+from bench.flows import FlowError, launch_app, login, start_stub
+from bench.load import ACTIVITIES, LoadStats, parse_mix, percentile
+from bench.ws_client import StreamlitSession
+
+# ── MULTI-REPLICA BENCHMARK ─────────────────────────────────────
+# Runs N `streamlit run` replicas against the local stub, each with
+# its own QUIZ_DATA_DIR (like separate hosts), and drives learners at
+# them round-robin. After an activity a learner may move to another
+# replica (a reload landing elsewhere behind a load balancer without
+# sticky sessions); the move counts as resumed when the new replica
+# brings the session back instead of showing the login form.
+#
+#   python -m bench.replicas --replicas 1 3 --store redis
+#   python -m bench.replicas --replicas 3 --store local    # no shared state
+#
+# --store: redis (bench.resp_server stand-in), sqlite (one file all
+# replicas open) or local (each replica keeps its own state).
+
+
+class ReplicaStats(LoadStats):
+    def __init__(self):
+        super().__init__()
+        self.moves = Counter()      # resumed / lost
+
+
+def state_store(kind):
+    # -> (QUIZ_STATE_STORE value, resp server or None)
+    if kind == "redis":
+        server, url = resp_server.serve()
+        return url, server
+    if kind == "sqlite":
+        return "sqlite:///" + tempfile.mkdtemp(prefix="quiz-state-") + "/state.db", None
+    return "", None
+
+
+def learner(n, urls, args, mix, stats, start_at, stop_at):
+    rng = random.Random(args.seed * 1000 + n if args.seed is not None else None)
+    mu = math.log(args.think) if args.think > 0 else None
+
+    def think():
+        return rng.lognormvariate(mu, 0.5) if mu is not None else 0.0
+
+    time.sleep(max(0.0, start_at - time.monotonic()))
+    replica = n % len(urls)
+    s = StreamlitSession(urls[replica], timeout=args.timeout, think=think)
+    try:
+        login(s, f"learner-{n}")
+        while time.monotonic() < stop_at and mix:
+            activity = rng.choices(list(mix), list(mix.values()))[0]
+            if ACTIVITIES[activity](s, rng) is False:
+                del mix[activity]
+                continue
+            with stats.lock:
+                stats.activities[activity] += 1
+
+            if rng.random() < args.move:
+                replica = (replica + 1) % len(urls)
+                s.stream_url = urls[replica].replace("http://", "ws://", 1) + "/_stcore/stream"
+                s.reload()
+                resumed = not s.has("button", "Enter")
+                with stats.lock:
+                    stats.moves["resumed" if resumed else "lost"] += 1
+                if not resumed:
+                    login(s, f"learner-{n}")
+    except FlowError as e:
+        with stats.lock:
+            stats.failures[str(e)] += 1
+    except Exception as e:
+        with stats.lock:
+            stats.failures[type(e).__name__] += 1
+    stats.add(s)
+
+
+def run(args, server, replicas):
+    store_url, store_server = state_store(args.store)
+    apps = [
+        launch_app({
+            "QUIZ_STATE_STORE": store_url,
+            "QUIZ_DATA_DIR": tempfile.mkdtemp(prefix="quiz-replica-"),
+            "QUIZ_SESSION_FLUSH_INTERVAL": str(args.flush_interval),
+        })
+        for _ in range(replicas)
+    ]
+    urls = [url for _, url in apps]
+
+    try:
+        for url in urls:
+            warm = StreamlitSession(url, timeout=args.timeout)
+            login(warm, "warmup")
+            warm.close()
+        time.sleep(1.0)
+        calls_before = server.calls
+
+        stats = ReplicaStats()
+        start = time.monotonic()
+        stop_at = start + args.ramp + args.duration
+        workers = [
+            threading.Thread(
+                target=learner,
+                args=(n, urls, args, dict(args.mix), stats,
+                      start + args.ramp * n / args.sessions, stop_at),
+                name=f"learner-{n}",
+                daemon=True,
+            )
+            for n in range(args.sessions)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.monotonic() - start
+        for s in stats.sessions:
+            s.close()
+
+        calls = server.calls
+        calls.subtract(calls_before)
+        return {
+            "replicas": replicas,
+            "elapsed": elapsed,
+            "stats": stats,
+            "calls": {k: v for k, v in calls.items() if v},
+        }
+    finally:
+        for proc, _ in apps:
+            proc.terminate()
+        for proc, _ in apps:
+            proc.wait()
+        if store_server:
+            store_server.shutdown()
+
+
+def report(args, results):
+    print(
+        f"store {args.store}   sessions {args.sessions}   duration {args.duration:.0f} s"
+        f"   think {args.think:.1f} s   move {args.move:.0%} of activities"
+    )
+    print(
+        f"{'replicas':>8} {'inter/s':>8} {'p50 ms':>7} {'p95 ms':>7}"
+        f" {'moves':>6} {'resumed':>8} {'lost':>5} {'generate':>9} {'failures':>9}"
+    )
+    for r in results:
+        stats, lat = r["stats"], r["stats"].latencies
+        moves = sum(stats.moves.values())
+        print(
+            f"{r['replicas']:>8} {len(lat) / r['elapsed']:>8.1f}"
+            f" {percentile(lat, 50) * 1000:>7.0f} {percentile(lat, 95) * 1000:>7.0f}"
+            f" {moves:>6} {stats.moves['resumed']:>8} {stats.moves['lost']:>5}"
+            f" {r['calls'].get('/generate-quiz', 0):>9} {sum(stats.failures.values()):>9}"
+        )
+    for r in results:
+        if r["stats"].failures:
+            print(
+                f"failures ({r['replicas']})  "
+                + ", ".join(f"{k} x{v}" for k, v in r["stats"].failures.most_common())
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-replica benchmark")
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--store", choices=("redis", "sqlite", "local"), default="redis")
+    parser.add_argument("--sessions", type=int, default=12)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds to start all sessions")
+    parser.add_argument("--think", type=float, default=1.0, help="median think time, seconds")
+    parser.add_argument("--move", type=float, default=0.3, help="chance of changing replica after an activity")
+    parser.add_argument("--flush-interval", type=float, default=0.25, help="session snapshot write-behind, seconds")
+    parser.add_argument(
+        "--mix", type=parse_mix, default="quiz=4,tutorial=2,custom=1",
+        help="activity weights",
+    )
+    stub_backend.add_arguments(parser)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per interaction")
+    args = parser.parse_args()
+
+    server = start_stub(args)
+    results = [run(args, server, n) for n in args.replicas]
+    report(args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import socketserver
+import threading
+import time
+from collections import Counter
+
+from kv_store import MemoryStore, RespReader
+
+# ── LOCAL REDIS STAND-IN ────────────────────────────────────────
+# Speaks enough RESP2 for kv_store.RedisStore (GET, MGET, SET [EX|PX],
+# DEL, SADD, SMEMBERS, SREM, EXPIRE, PEXPIRE, PING, DBSIZE, SELECT,
+# FLUSHALL), backed by one kv_store.MemoryStore. For benchmarks and
+# local multi-replica runs where no Redis server is installed.
+#
+#   python -m bench.resp_server --port 6380
+#   QUIZ_STATE_STORE=redis://127.0.0.1:6380 streamlit run streamlit_app.py
+
+
+def _bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    data = str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def _array(values):
+    return b"*%d\r\n" % len(values) + b"".join(_bulk(v) for v in values)
+
+
+def _int(n):
+    return b":%d\r\n" % n
+
+
+OK = b"+OK\r\n"
+
+
+class RespState:
+    def __init__(self):
+        self.store = MemoryStore()
+        self.lock = threading.Lock()
+        self.commands = Counter()
+        self.connections = 0
+
+    def execute(self, args):
+        name = args[0].upper()
+        with self.lock:
+            self.commands[name] += 1
+        store = self.store
+
+        if name == "PING":
+            return b"+PONG\r\n"
+        if name in ("SELECT", "AUTH"):
+            return OK
+        if name == "GET":
+            return _bulk(store.get(args[1]))
+        if name == "MGET":
+            return _array(store.mget(args[1:]))
+        if name == "SET":
+            ttl = None
+            options = [a.upper() for a in args[3:]]
+            if "EX" in options:
+                ttl = float(args[3 + options.index("EX") + 1])
+            elif "PX" in options:
+                ttl = float(args[3 + options.index("PX") + 1]) / 1000.0
+            store.set(args[1], args[2], ttl)
+            return OK
+        if name == "DEL":
+            present = sum(1 for k in args[1:] if store.get(k) is not None or store.smembers(k))
+            store.delete(*args[1:])
+            return _int(present)
+        if name == "SADD":
+            before = store.smembers(args[1])
+            store.sadd(args[1], *args[2:])
+            return _int(len(set(args[2:]) - before))
+        if name == "SMEMBERS":
+            return _array(sorted(store.smembers(args[1])))
+        if name == "SREM":
+            before = store.smembers(args[1])
+            store.srem(args[1], *args[2:])
+            return _int(len(before & set(args[2:])))
+        if name in ("EXPIRE", "PEXPIRE"):
+            ttl = float(args[2]) / (1000.0 if name == "PEXPIRE" else 1.0)
+            store.expire(args[1], ttl)
+            return _int(1)
+        if name == "DBSIZE":
+            return _int(store.size())
+        if name == "FLUSHALL":
+            store.flush()
+            return OK
+        return f"-ERR unknown command '{args[0]}'\r\n".encode()
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, state):
+        self.state = state
+        super().__init__(address, RespHandler)
+
+
+class RespHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        state = self.server.state
+        with state.lock:
+            state.connections += 1
+        reader = RespReader(self.request)
+        while True:
+            try:
+                args = reader.reply()
+            except (ConnectionError, OSError):
+                return
+            if not isinstance(args, list) or not args:
+                self.request.sendall(b"-ERR expected a command array\r\n")
+                return
+            try:
+                reply = state.execute(args)
+            except (IndexError, ValueError) as e:
+                reply = f"-ERR {e}\r\n".encode()
+            self.request.sendall(reply)
+
+
+def serve(host="127.0.0.1", port=0):
+    # -> (server, "redis://host:port"), serving on a daemon thread
+    server = RespServer((host, port), RespState())
+    threading.Thread(target=server.serve_forever, name="resp-server", daemon=True).start()
+    host, port = server.server_address
+    return server, f"redis://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Redis-protocol stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    server, url = serve(args.host, args.port)
+    print(f"serving {url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
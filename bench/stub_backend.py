@@ -0,0 +1,349 @@
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ── LOCAL STUB BACKEND ──────────────────────────────────────────
+# Stand-in for the quiz worker implementing every endpoint the app
+# calls, with per-endpoint latency, jitter and error injection.
+#
+# /generate-quiz simulates an LLM that emits questions one at a
+# time: `first_delay` before the first one, `question_delay` between
+# the rest. With {"stream": true} (or an NDJSON / SSE Accept header)
+# questions are written as they are "generated"; otherwise the whole
+# JSON body is sent at the end.
+#
+#   python -m bench.stub_backend --port 8787 --latency /check-answer=0.8 --error-rate 0.02
+#   QUIZ_BACKEND=http://127.0.0.1:8787 streamlit run streamlit_app.py
+#
+# GET /_stats returns per-endpoint call counts; POST /_reset clears them.
+
+ENDPOINTS = (
+    "/login",
+    "/generate-quiz",
+    "/next-topic",
+    "/next-concept",
+    "/check-answer",
+    "/explain-better",
+    "/submit-answer",
+    "/sync-skill",
+)
+
+CONCEPTS = [
+    {
+        "concept_id": "entropy",
+        "concept": "Entropy",
+        "core_idea": "Entropy measures how many microscopic arrangements match a macroscopic state.",
+        "ideal_explanation": "Entropy counts how many microscopic arrangements of particles are consistent with what we observe, so systems drift toward states with more arrangements.",
+        "difficulty": 3,
+    },
+    {
+        "concept_id": "opportunity-cost",
+        "concept": "Opportunity cost",
+        "core_idea": "The value of the next best alternative you give up when making a choice.",
+        "ideal_explanation": "Opportunity cost is what you give up when you choose one option: the value of the next best alternative.",
+        "difficulty": 2,
+    },
+    {
+        "concept_id": "natural-selection",
+        "concept": "Natural selection",
+        "core_idea": "Heritable traits that improve survival and reproduction spread through a population.",
+        "ideal_explanation": "Individuals with heritable traits that help them survive and reproduce leave more offspring, so those traits become more common.",
+        "difficulty": 2,
+    },
+    {
+        "concept_id": "compound-interest",
+        "concept": "Compound interest",
+        "core_idea": "Interest is earned on previously earned interest, so growth accelerates.",
+        "ideal_explanation": "With compound interest you earn interest on your interest, so the balance grows faster and faster over time.",
+        "difficulty": 1,
+    },
+]
+
+ADAPTIVE_TOPICS = ["world history", "astronomy", "geography", "biology", "music", "sports"]
+
+
+class EndpointProfile:
+    # latency = base + jitter, where jitter is uniform(0, jitter) or,
+    # for "lognormal", a heavy-tailed sample with that mean
+    def __init__(self, latency=0.05, jitter=0.0, distribution="uniform",
+                 error_rate=0.0, error_status=503):
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay(self, rng, base=None):
+        base = self.latency if base is None else base
+        if not self.jitter:
+            return base
+        if self.distribution == "lognormal":
+            return base + rng.lognormvariate(0, 1) * self.jitter / 1.6487
+        return base + rng.uniform(0, self.jitter)
+
+    def fails(self, rng):
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+class StubConfig:
+    def __init__(self, first_delay=1.5, question_delay=1.0, profiles=None, seed=None):
+        self.first_delay = first_delay
+        self.question_delay = question_delay
+        self.profiles = {path: EndpointProfile() for path in ENDPOINTS}
+        self.profiles["/login"] = EndpointProfile(0.1)
+        self.profiles["/check-answer"] = EndpointProfile(0.6)
+        self.profiles["/explain-better"] = EndpointProfile(0.8)
+        self.profiles["/generate-quiz"] = EndpointProfile(0.0)
+        if profiles:
+            self.profiles.update(profiles)
+        self.rng = random.Random(seed)
+
+    def profile(self, path):
+        return self.profiles.get(path, EndpointProfile())
+
+
+def make_question(n, i, topic, difficulty):
+    return {
+        "id": f"stub-{n}-{i}",
+        "question": f"[{difficulty}] Stub question {i + 1} about {topic}?",
+        "choices": {"A": "Right answer", "B": "Wrong", "C": "Also wrong", "D": "Nope"},
+        "correct": "A",
+        "explanation": f"Stub explanation for question {i + 1}.",
+    }
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.mastered = {}      # user_id -> set(concept_id)
+        self.counter = itertools.count()
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.mastered.clear()
+
+
+def make_handler(config, state):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _json(self, obj, status=200):
+            body = json.dumps(obj).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _chunk(self, data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/_stats":
+                with state.lock:
+                    self._json(dict(state.calls))
+            else:
+                self._json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            payload = self._body()
+            if self.path == "/_reset":
+                state.reset()
+                self._json({"ok": True})
+                return
+
+            handler = getattr(self, "ep_" + self.path.strip("/").replace("-", "_"), None)
+            if self.path not in ENDPOINTS or handler is None:
+                self._json({"error": f"unknown endpoint {self.path}"}, status=404)
+                return
+
+            with state.lock:
+                state.calls[self.path] += 1
+            profile = config.profile(self.path)
+
+            if profile.fails(config.rng):
+                time.sleep(profile.delay(config.rng))
+                self._json({"error": "injected failure"}, status=profile.error_status)
+                return
+
+            if self.path != "/generate-quiz":
+                time.sleep(profile.delay(config.rng))
+            handler(payload)
+
+        # ── endpoints ──
+        def ep_login(self, payload):
+            if not payload.get("name") or not payload.get("code"):
+                self._json({"error": "name and code required"}, status=400)
+                return
+            self._json({"user_id": f"user-{payload['name'].lower()}"})
+
+        def ep_generate_quiz(self, payload):
+            n = next(state.counter)
+            topic = payload.get("topic", "general knowledge")
+            difficulty = payload.get("start_difficulty", "adaptive")
+            count = int(payload.get("num_questions", 4))
+            profile = config.profile(self.path)
+
+            accept = self.headers.get("Accept", "")
+            streaming = payload.get("stream") or "ndjson" in accept or "event-stream" in accept
+            sse = accept.lstrip().startswith("text/event-stream")
+
+            def questions():
+                for i in range(count):
+                    base = config.first_delay if i == 0 else config.question_delay
+                    time.sleep(profile.delay(config.rng, base=base))
+                    yield make_question(n, i, topic, difficulty)
+
+            if not streaming:
+                self._json({"questions": list(questions())})
+                return
+
+            self.send_response(200)
+            self.send_header(
+                "Content-Type", "text/event-stream" if sse else "application/x-ndjson"
+            )
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for q in questions():
+                line = json.dumps(q).encode()
+                self._chunk(b"data: " + line + b"\n\n" if sse else line + b"\n")
+            if sse:
+                self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def ep_next_topic(self, payload):
+            topic = ADAPTIVE_TOPICS[next(state.counter) % len(ADAPTIVE_TOPICS)]
+            self._json({
+                "topic": topic,
+                "start_difficulty": "medium",
+                "field_id": f"field-{topic}",
+                "topic_id": f"topic-{topic}",
+            })
+
+        def ep_next_concept(self, payload):
+            user = payload.get("user_id")
+            with state.lock:
+                mastered = set(state.mastered.get(user, ()))
+            for concept in CONCEPTS:
+                if concept["concept_id"] not in mastered:
+                    self._json(concept)
+                    return
+            self._json({"done": True})
+
+        def ep_check_answer(self, payload):
+            # "grading": five or more words counts as a real explanation
+            correct = len(str(payload.get("answer_text", "")).split()) >= 5
+            if correct:
+                with state.lock:
+                    state.mastered.setdefault(payload.get("user_id"), set()).add(
+                        payload.get("concept_id")
+                    )
+            self._json({
+                "correct": correct,
+                "verdict": "Nice explanation." if correct else "Try explaining the core idea.",
+                "ideal_explanation": payload.get("ideal_explanation", ""),
+                "mastery_changed": correct,
+            })
+
+        def ep_explain_better(self, payload):
+            self._json({
+                "simple_explanation": f"In simple terms: {payload.get('core_idea', '')}"
+            })
+
+        def ep_submit_answer(self, payload):
+            self._json({"ok": True})
+
+        def ep_sync_skill(self, payload):
+            self._json({"ok": True})
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        self.config = config
+        self.state = StubState()
+        super().__init__(address, make_handler(config, self.state))
+
+    @property
+    def calls(self):
+        with self.state.lock:
+            return Counter(self.state.calls)
+
+
+def serve(host="127.0.0.1", port=0, config=None):
+    # returns (server, base_url); the server runs on a daemon thread
+    server = StubServer((host, port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def parse_overrides(values, cast=float):
+    # ["/check-answer=0.8", "generate-quiz=0"] -> {"/check-answer": 0.8, ...}
+    out = {}
+    for item in values or []:
+        path, _, value = item.partition("=")
+        out["/" + path.strip("/")] = cast(value)
+    return out
+
+
+def add_arguments(parser):
+    parser.add_argument("--first-delay", type=float, default=1.5)
+    parser.add_argument("--question-delay", type=float, default=1.0)
+    parser.add_argument("--latency", nargs="*", metavar="ENDPOINT=SECONDS")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds, all endpoints")
+    parser.add_argument("--distribution", choices=["uniform", "lognormal"], default="uniform")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0..1, all endpoints")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int)
+
+
+def config_from_args(args):
+    config = StubConfig(args.first_delay, args.question_delay, seed=args.seed)
+    latencies = parse_overrides(args.latency)
+    for path, profile in config.profiles.items():
+        profile.latency = latencies.get(path, profile.latency)
+        profile.jitter = args.jitter
+        profile.distribution = args.distribution
+        profile.error_rate = args.error_rate
+        profile.error_status = args.error_status
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub for the quiz backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    server, url = serve(args.host, args.port, config)
+    print(f"stub backend on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
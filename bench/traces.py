@@ -0,0 +1,101 @@
+import argparse
+import json
+from collections import defaultdict
+
+# ── TRACE VIEWER ────────────────────────────────────────────────
+# Reads the OTLP JSON lines the app writes to QUIZ_TRACE_FILE and
+# prints the slowest actions as span trees, so "the quiz took
+# forever" can be pinned on a phase, a queue wait, a retry or the
+# worker itself:
+#
+#   python -m bench.traces .quiz_data/traces.jsonl --slowest 5
+#   python -m bench.traces traces.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+#
+# (any OTLP viewer that imports JSON works too)
+
+SHOWN_ATTRIBUTES = (
+    "quiz.outcome", "quiz.phase", "quiz.priority", "http.response.status_code", "enduser.id",
+)
+
+
+def _value(v):
+    for kind in ("stringValue", "intValue", "doubleValue", "boolValue"):
+        if kind in v:
+            return v[kind]
+    return None
+
+
+def load(path):
+    # -> {trace_id: [span dict]}
+    traces = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for rs in json.loads(line).get("resourceSpans", []):
+                for ss in rs.get("scopeSpans", []):
+                    for span in ss.get("spans", []):
+                        span["start"] = int(span["startTimeUnixNano"])
+                        span["end"] = int(span["endTimeUnixNano"])
+                        span["attrs"] = {a["key"]: _value(a["value"]) for a in span.get("attributes", [])}
+                        traces[span["traceId"]].append(span)
+    return traces
+
+
+def extent(spans):
+    return min(s["start"] for s in spans), max(s["end"] for s in spans)
+
+
+def print_tree(trace_id, spans):
+    start, end = extent(spans)
+    by_parent = defaultdict(list)
+    ids = {s["spanId"] for s in spans}
+    for s in spans:
+        parent = s.get("parentSpanId")
+        by_parent[parent if parent in ids else None].append(s)
+
+    roots = sorted(by_parent[None], key=lambda s: s["start"])
+    print(f"trace {trace_id}   {(end - start) / 1e6:.0f} ms   {len(spans)} spans   {roots[0]['name'] if roots else ''}")
+
+    def walk(span, depth):
+        attrs = "  ".join(
+            f"{k.split('.')[-1]}={span['attrs'][k]}" for k in SHOWN_ATTRIBUTES if k in span["attrs"]
+        )
+        error = "  ERROR " + span["status"].get("message", "") if span.get("status", {}).get("code") == 2 else ""
+        print(
+            f"  {(span['start'] - start) / 1e6:8.0f} ms {(span['end'] - span['start']) / 1e6:8.0f} ms  "
+            f"{'  ' * depth}{span['name']}  {attrs}{error}"
+        )
+        for event in span.get("events", []):
+            print(f"  {(int(event['timeUnixNano']) - start) / 1e6:8.0f} ms {'':>11}  {'  ' * depth}  · {event['name']}")
+        for child in sorted(by_parent[span["spanId"]], key=lambda s: s["start"]):
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print traces written by QUIZ_TRACE_FILE")
+    parser.add_argument("path")
+    parser.add_argument("--slowest", type=int, default=5, help="how many traces to print")
+    parser.add_argument("--trace", help="print only this trace id")
+    args = parser.parse_args()
+
+    traces = load(args.path)
+    if args.trace:
+        print_tree(args.trace, traces[args.trace])
+        return
+
+    durations = sorted(
+        ((extent(spans)[1] - extent(spans)[0], tid) for tid, spans in traces.items()),
+        reverse=True,
+    )
+    print(f"{len(traces)} traces, {sum(len(s) for s in traces.values())} spans\n")
+    for _, tid in durations[: args.slowest]:
+        print_tree(tid, traces[tid])
+
+
+if __name__ == "__main__":
+    main()
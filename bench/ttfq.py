@@ -0,0 +1,75 @@
+import argparse
+import statistics
+import time
+
+from backend_client import BackendClient
+from bench.stub_backend import StubConfig, serve
+from quiz_stream import iter_questions
+
+# ── TIME-TO-FIRST-QUESTION ──────────────────────────────────────
+# Compares the all-at-once /generate-quiz path with the streamed one
+# against the local stub (or --backend for a real deployment).
+#
+#   python -m bench.ttfq --rounds 5 --num-questions 6
+
+
+def all_at_once(client, payload):
+    start = time.perf_counter()
+    r = client.post("/generate-quiz", payload)
+    r.raise_for_status()
+    r.json()["questions"]
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def streamed(client, payload):
+    start = time.perf_counter()
+    first = None
+    r = client.stream("/generate-quiz", dict(payload, stream=True))
+    try:
+        r.raise_for_status()
+        for _ in iter_questions(r):
+            if first is None:
+                first = time.perf_counter() - start
+    finally:
+        r.close()
+    return first, time.perf_counter() - start
+
+
+def summarize(name, samples):
+    firsts = [f for f, _ in samples]
+    lasts = [t for _, t in samples]
+    print(
+        f"{name:<14} first question p50 {statistics.median(firsts) * 1000:8.0f} ms"
+        f"   full round p50 {statistics.median(lasts) * 1000:8.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time-to-first-question")
+    parser.add_argument("--backend", help="base URL; default starts the local stub")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--num-questions", type=int, default=6)
+    parser.add_argument("--first-delay", type=float, default=1.5)
+    parser.add_argument("--question-delay", type=float, default=1.0)
+    args = parser.parse_args()
+
+    url = args.backend
+    if not url:
+        _, url = serve(config=StubConfig(args.first_delay, args.question_delay))
+
+    client = BackendClient(url)
+    payload = {
+        "topic": "science",
+        "start_difficulty": "medium",
+        "num_questions": args.num_questions,
+        "user_id": "bench",
+        "mode": "tutorial",
+    }
+
+    summarize("all-at-once", [all_at_once(client, payload) for _ in range(args.rounds)])
+    summarize("streamed", [streamed(client, payload) for _ in range(args.rounds)])
+
+
+if __name__ == "__main__":
+    main()
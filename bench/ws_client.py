@@ -0,0 +1,339 @@
+import base64
+import os
+import socket
+import struct
+import time
+from urllib.parse import urlparse
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from bench.flows import FlowError
+
+# ── STREAMLIT WEBSOCKET CLIENT ──────────────────────────────────
+# A headless "browser tab" for a running `streamlit run` server:
+# speaks the /_stcore/stream protocol (BackMsg / ForwardMsg protobufs),
+# keeps the element tree the way the frontend does and sends widget
+# states back on interaction, including fragment-scoped reruns. Same
+# interface as bench.flows.Session, so the flow steps drive either.
+#
+# Widget values follow the current frontend wire format (radio and
+# selectbox send the option label as string_value).
+
+FINISHED = ForwardMsg.ScriptFinishedStatus
+
+
+def _mask(data, key):
+    if not data:
+        return data
+    n = len(data)
+    mask = int.from_bytes((key * (n // 4 + 1))[:n], "big")
+    return (int.from_bytes(data, "big") ^ mask).to_bytes(n, "big")
+
+
+class WebSocket:
+    # minimal RFC 6455 client: binary messages, no extensions
+
+    def __init__(self, url, subprotocols=(), timeout=120.0):
+        u = urlparse(url)
+        host, port = u.hostname, u.port or 80
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (
+            f"GET {u.path or '/'} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n"
+        )
+        if subprotocols:
+            request += f"Sec-WebSocket-Protocol: {', '.join(subprotocols)}\r\n"
+        self.sock.sendall((request + "\r\n").encode())
+
+        self._buf = bytearray()
+        while b"\r\n\r\n" not in self._buf:
+            self._fill()
+        end = self._buf.index(b"\r\n\r\n")
+        status = bytes(self._buf[:end]).split(b"\r\n", 1)[0].decode(errors="replace")
+        del self._buf[: end + 4]
+        if status.split()[1:2] != ["101"]:
+            raise ConnectionError(f"websocket upgrade failed: {status}")
+
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def send(self, data):
+        n = len(data)
+        header = bytearray([0x82])
+        if n < 126:
+            header.append(0x80 | n)
+        elif n < 65536:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", n)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", n)
+        key = os.urandom(4)
+        self.sock.sendall(bytes(header) + key + _mask(data, key))
+        self.bytes_sent += n
+
+    def recv(self):
+        # next complete data message; control frames are handled here
+        message = bytearray()
+        while True:
+            b1, b2 = self._read(2)
+            n = b2 & 0x7F
+            if n == 126:
+                n = struct.unpack("!H", self._read(2))[0]
+            elif n == 127:
+                n = struct.unpack("!Q", self._read(8))[0]
+            payload = self._read(n)
+            opcode = b1 & 0x0F
+            if opcode == 0x8:
+                raise ConnectionError("websocket closed by server")
+            if opcode == 0x9:
+                self._control(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            message += payload
+            if b1 & 0x80:
+                self.bytes_received += len(message)
+                return bytes(message)
+
+    def close(self):
+        try:
+            self._control(0x8, b"")
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _control(self, opcode, payload):
+        key = os.urandom(4)
+        self.sock.sendall(bytes([0x80 | opcode, 0x80 | len(payload)]) + key + _mask(payload, key))
+
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("websocket closed")
+        self._buf += chunk
+
+    def _read(self, n):
+        while len(self._buf) < n:
+            self._fill()
+        data = bytes(self._buf[:n])
+        del self._buf[:n]
+        return data
+
+
+class Element:
+    def __init__(self, path, proto, fragment_id):
+        self.path = path
+        self.kind = proto.WhichOneof("type")
+        self.proto = getattr(proto, self.kind)
+        self.fragment_id = fragment_id
+
+    @property
+    def id(self):
+        return getattr(self.proto, "id", "")
+
+    @property
+    def label(self):
+        return getattr(self.proto, "label", None)
+
+    @property
+    def key(self):
+        # element ids look like "$$ID-<hash>-<user key or None>"
+        key = self.id.split("-", 2)[-1] if self.id else None
+        return None if key == "None" else key
+
+
+class Widget:
+    # what flow steps act on; mirrors the AppTest widget methods used
+
+    def __init__(self, session, element):
+        self.session = session
+        self.element = element
+
+    @property
+    def value(self):
+        return self.session.values.get(self.element.id)
+
+    def click(self):
+        self.session.act(self.element, trigger_value=True)
+        return self
+
+    def set_value(self, value):
+        self.session.act(self.element, string_value=str(value))
+        return self
+
+    def input(self, text):
+        return self.set_value(text)
+
+
+class StreamlitSession:
+    def __init__(self, url, timeout=120.0, think=None, on_run=None):
+        u = urlparse(url)
+        scheme = "wss" if u.scheme == "https" else "ws"
+        self.stream_url = f"{scheme}://{u.netloc}{u.path.rstrip('/')}/_stcore/stream"
+        self.timeout = timeout
+        self.think = think
+        self.on_run = on_run
+        self.query_string = u.query     # kept in sync with st.query_params
+        self._connect()
+
+        self.latencies = []
+        self.script_runs = []       # script runs per interaction
+        self.bytes_received = []    # websocket bytes per interaction
+
+    # ── flow-step interface ──
+    def run(self):
+        if self.think:
+            time.sleep(self.think())
+        received = self.ws.bytes_received
+        start = time.perf_counter()
+        runs = self._rerun()
+        elapsed = time.perf_counter() - start
+
+        self.latencies.append(elapsed)
+        self.script_runs.append(runs)
+        self.bytes_received.append(self.ws.bytes_received - received)
+        if self.on_run:
+            self.on_run(elapsed)
+
+        errors = [e for e in self.elements.values() if e.kind == "exception"]
+        if errors:
+            raise FlowError(errors[0].proto.message)
+        return self
+
+    def widgets(self, kind):
+        return [
+            Widget(self, e)
+            for _, e in sorted(self.elements.items())
+            if e.kind == kind
+        ]
+
+    def has(self, kind, label=None, key=None):
+        return any(
+            (key is not None and w.element.key == key)
+            or (label is not None and w.element.label == label)
+            for w in self.widgets(kind)
+        )
+
+    def widget(self, kind, label=None, key=None, index=None):
+        if index is not None:
+            return self.widgets(kind)[index]
+        for w in self.widgets(kind):
+            if (key is not None and w.element.key == key) or (
+                label is not None and w.element.label == label
+            ):
+                return w
+        raise FlowError(f"no {kind} {key or label!r} on screen")
+
+    def click(self, label=None, key=None):
+        self.widget("button", label, key).click()
+        return self.run()
+
+    def type(self, kind, text, label=None, key=None, index=None):
+        self.widget(kind, label, key, index).input(text)
+        return self.run()
+
+    def select(self, kind, value, label=None, key=None, index=None):
+        self.widget(kind, label, key, index).set_value(value)
+        return self.run()
+
+    def close(self):
+        self.ws.close()
+
+    def reload(self):
+        # a new tab on the current URL: fresh Streamlit session, same query string
+        self.ws.close()
+        self._connect()
+        return self.run()
+
+    # ── protocol ──
+    def _connect(self):
+        self.ws = WebSocket(self.stream_url, subprotocols=("streamlit",), timeout=self.timeout)
+        self.elements = {}          # delta path -> Element currently on screen
+        self.values = {}            # widget id -> value set by this client
+        self._states = {}           # widget id -> WidgetState to send
+        self._trigger = None
+        self._fragment = ""
+        self._page_hash = ""
+        self._cache = {}            # ForwardMsg hash -> message (like the browser)
+
+    def act(self, element, trigger_value=None, string_value=None):
+        state = WidgetState(id=element.id)
+        if trigger_value is not None:
+            state.trigger_value = trigger_value
+            self._trigger = state
+        else:
+            state.string_value = string_value
+            self._states[element.id] = state
+            self.values[element.id] = string_value
+        self._fragment = element.fragment_id
+
+    def _rerun(self):
+        msg = BackMsg()
+        client = msg.rerun_script
+        client.page_script_hash = self._page_hash
+        client.query_string = self.query_string
+        client.fragment_id = self._fragment
+        client.cached_message_hashes.extend(self._cache)
+        on_screen = {e.id for e in self.elements.values()}
+        for widget_id, state in self._states.items():
+            if widget_id in on_screen:
+                client.widget_states.widgets.append(state)
+        if self._trigger is not None:
+            client.widget_states.widgets.append(self._trigger)
+        fragment = self._fragment
+        self._trigger = None
+        self._fragment = ""
+
+        self.ws.send(msg.SerializeToString())
+
+        runs = 0
+        drawn = {}
+        while True:
+            fm = ForwardMsg.FromString(self.ws.recv())
+            if fm.HasField("ref_hash"):
+                cached = self._cache[fm.ref_hash]
+                cached.metadata.CopyFrom(fm.metadata)
+                fm = cached
+            elif fm.metadata.cacheable and fm.hash:
+                self._cache[fm.hash] = fm
+
+            kind = fm.WhichOneof("type")
+            if kind == "new_session":
+                self._page_hash = fm.new_session.page_script_hash or self._page_hash
+            elif kind == "page_info_changed":
+                self.query_string = fm.page_info_changed.query_string
+            elif kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                path = tuple(fm.metadata.delta_path)
+                drawn[path] = Element(path, fm.delta.new_element, fm.delta.fragment_id)
+            elif kind == "delta" and fm.delta.WhichOneof("type") == "add_block":
+                # a block replaces whatever was drawn at its path (st.empty)
+                path = tuple(fm.metadata.delta_path)
+                for elements in (drawn, self.elements):
+                    for p in [p for p in elements if p[: len(path)] == path]:
+                        del elements[p]
+            elif kind == "script_finished":
+                runs += 1
+                status = fm.script_finished
+                if status == FINISHED.FINISHED_EARLY_FOR_RERUN:
+                    drawn = {}
+                    continue
+                if status == FINISHED.FINISHED_WITH_COMPILE_ERROR:
+                    raise FlowError("script failed to compile")
+                if status == FINISHED.FINISHED_FRAGMENT_RUN_SUCCESSFULLY:
+                    # only this fragment was redrawn; the rest stays
+                    self.elements = {
+                        p: e for p, e in self.elements.items()
+                        if not (fragment and e.fragment_id == fragment)
+                    }
+                    self.elements.update(drawn)
+                else:
+                    self.elements = drawn
+                return runs
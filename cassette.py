@@ -0,0 +1,269 @@
+import collections
+import hashlib
+import json
+import re
+import secrets
+import threading
+import time
+
+# ── TRAFFIC CAPTURE ─────────────────────────────────────────────
+# Records what the app sends the worker and what comes back, with
+# timings, as a cassette: JSON lines, one interaction each, which
+# bench/replay.py serves as a local backend and re-drives at 1x-100x.
+#
+# Interactions are anonymized before they are buffered:
+#   name, user_id   stable pseudonyms (learner-<hash>, user-<hash>)
+#   code            "redacted"
+#   answer_text     every word masked, word lengths kept
+#   topic           kept for catalog topics, a pseudonym for custom ones
+# and the original values are scrubbed from response bodies and from
+# the learner's later requests (question_text quoting a custom topic)
+# as well. Response fields written about the learner's answer (the
+# /check-answer verdict and explanation) can quote any part of it, so
+# they are masked like answer_text.
+# The salt keys the pseudonyms: one salt on every replica keeps a
+# learner one session across them; without one each process draws its
+# own. `sample` keeps that share of learners, whole sessions at a time.
+#
+# Streamed bodies are recorded chunk by chunk as the caller reads them
+# (arrival offsets included), so a stream nobody reads is not recorded.
+
+CASSETTE_VERSION = 1
+
+PSEUDONYMS = {"name": "learner", "user_id": "user"}
+WORD = re.compile(r"\w+")
+# response fields masked word by word, per endpoint
+RESPONSE_FREE_TEXT = {"/check-answer": ("verdict", "ideal_explanation")}
+
+
+def mask_words(text):
+    return WORD.sub(lambda m: "x" * len(m.group()), text)
+
+
+class Anonymizer:
+    def __init__(self, salt=None, public=()):
+        self.salt = (salt or secrets.token_hex(16)).encode()
+        self.public = set(public)       # values kept as they are
+
+    def pseudonym(self, kind, value):
+        return f"{kind}-{hashlib.sha256(self.salt + value.encode()).hexdigest()[:10]}"
+
+    def sampled(self, session, share):
+        if share >= 1:
+            return True
+        digest = hashlib.sha256(self.salt + session.encode()).hexdigest()[:8]
+        return int(digest, 16) / 16 ** 8 < share
+
+    def scrub(self, obj, replacements, masked=()):
+        # a copy of obj with sensitive fields replaced; originals are
+        # collected in `replacements` to scrub free text with
+        if isinstance(obj, dict):
+            return {k: self.scrub(v, replacements, masked) if isinstance(v, (dict, list))
+                    else mask_words(v) if k in masked and isinstance(v, str)
+                    else self.field(k, v, replacements) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.scrub(v, replacements, masked) for v in obj]
+        return obj
+
+    def field(self, key, value, replacements):
+        if not isinstance(value, str) or not value or value in self.public:
+            return value
+        if key == "code":
+            return "redacted"       # secrets never go through text replacement
+        if key in PSEUDONYMS:
+            new = self.pseudonym(PSEUDONYMS[key], value)
+        elif key == "answer_text":
+            new = mask_words(value)
+        elif key == "topic":
+            new = self.pseudonym("topic", value)
+        else:
+            return self.text(value, replacements) if replacements else value
+        if len(value) >= 3:
+            replacements[value] = new
+        return new
+
+    def text(self, text, replacements):
+        for old in sorted(replacements, key=len, reverse=True):
+            text = re.sub(rf"(?<!\w){re.escape(old)}(?!\w)", replacements[old], text)
+        return text
+
+    def body(self, text, replacements, masked=()):
+        # -> (scrubbed text, scrubbed JSON object or None)
+        try:
+            obj = self.scrub(json.loads(text), replacements, masked)
+        except ValueError:
+            return self.text(text, replacements), None
+        return self.text(json.dumps(obj), replacements), obj
+
+
+def _text(chunk):
+    return chunk.decode("utf-8", errors="replace") if isinstance(chunk, bytes) else chunk
+
+
+class CassetteRecorder:
+    def __init__(self, path, salt=None, public=(), sample=1.0, flush_interval=1.0, max_buffer=10000,
+                 max_learners=10000):
+        self.path = path
+        self.sample = sample
+        self.flush_interval = flush_interval
+        self.anonymizer = Anonymizer(salt, public)
+        self._buffer = collections.deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+        # user_id -> {original: replacement} seen in their requests (memory only)
+        self._learned = collections.OrderedDict()
+        self._learned_lock = threading.Lock()
+        self.max_learners = max_learners
+
+        # counters
+        self.recorded = 0
+        self.skipped = 0            # learners outside the sample
+        self.dropped = 0
+        self.capture_errors = 0
+        self.write_errors = 0
+
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="cassette-writer", daemon=True)
+        self._worker.start()
+
+    # ── request threads ──
+    def capture(self, path, payload, priority, started, elapsed, response=None, error=None, stream=False):
+        # never lets a recording problem reach the backend call
+        try:
+            self._capture(path, payload, priority, started, elapsed, response, error, stream)
+        except Exception:
+            self.capture_errors += 1
+
+    def _capture(self, path, payload, priority, started, elapsed, response, error, stream):
+        user = payload.get("user_id") if isinstance(payload, dict) else None
+        replacements = self._replacements(user)
+        request = self.anonymizer.scrub(payload, replacements)
+        self._learn(user, replacements)
+        entry = {
+            "v": CASSETTE_VERSION,
+            "ts": round(started, 4),
+            "path": path,
+            "priority": priority,
+            "stream": stream,
+            "request": request,
+            "latency": round(elapsed, 4),
+        }
+
+        if error is not None:
+            entry.update(status=None, error=type(error).__name__, duration=entry["latency"])
+            self._add(entry, request)
+            return
+
+        entry["status"] = response.status_code
+        entry["content_type"] = response.headers.get("Content-Type", "")
+        if not stream:
+            if path == "/next-topic" and response.status_code == 200:
+                # topics the worker picks are not user input
+                topic = re.search(r'"topic"\s*:\s*"([^"]*)"', response.text)
+                if topic:
+                    self.anonymizer.public.add(topic.group(1))
+            entry["body"], obj = self.anonymizer.body(
+                response.text, replacements, RESPONSE_FREE_TEXT.get(path, ())
+            )
+            entry["duration"] = entry["latency"]
+            self._add(entry, request, obj)
+            return
+
+        session = self._session(request)
+        if self.anonymizer.sampled(session, self.sample):
+            self._tee(response, entry, replacements, session)
+        else:
+            self.skipped += 1
+
+    def _replacements(self, user):
+        with self._learned_lock:
+            learned = self._learned.get(user)
+            if learned is None:
+                return {}
+            self._learned.move_to_end(user)
+            return dict(learned)
+
+    def _learn(self, user, replacements):
+        if not user or not replacements:
+            return
+        with self._learned_lock:
+            self._learned.setdefault(user, {}).update(replacements)
+            self._learned.move_to_end(user)
+            while len(self._learned) > self.max_learners:
+                self._learned.popitem(last=False)
+
+    def _session(self, request, response=None):
+        for obj in (request, response or {}):
+            if isinstance(obj, dict) and isinstance(obj.get("user_id"), str):
+                return obj["user_id"]
+        return request.get("name") or "anonymous"
+
+    def _add(self, entry, request, response=None):
+        entry["session"] = self._session(request, response)
+        if not self.anonymizer.sampled(entry["session"], self.sample):
+            self.skipped += 1
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(entry)
+
+    def _tee(self, response, entry, replacements, session):
+        # chunks are recorded as the caller reads them; the entry is
+        # buffered once the body is done (or abandoned)
+        inner = response.iter_content
+        chunks = []
+
+        def iter_content(chunk_size=1, decode_unicode=False):
+            try:
+                for chunk in inner(chunk_size, decode_unicode):
+                    chunks.append((time.time() - entry["ts"], chunk))
+                    yield chunk
+            finally:
+                if "chunks" not in entry:
+                    entry["session"] = session
+                    entry["duration"] = round(chunks[-1][0] if chunks else entry["latency"], 4)
+                    entry["chunks"] = [
+                        [round(t, 4), self.anonymizer.text(_text(c), replacements)] for t, c in chunks
+                    ]
+                    if len(self._buffer) == self._buffer.maxlen:
+                        self.dropped += 1
+                    self._buffer.append(entry)
+
+        response.iter_content = iter_content
+
+    # ── writer thread ──
+    def flush(self):
+        entries = []
+        while self._buffer:
+            try:
+                entries.append(self._buffer.popleft())
+            except IndexError:
+                break
+        if not entries:
+            return
+        lines = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                self.recorded += len(entries)
+            except OSError:
+                self.write_errors += 1
+
+    def close(self):
+        self._stop.set()
+        self._worker.join(5.0)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def stats(self):
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "capture_errors": self.capture_errors,
+            "write_errors": self.write_errors,
+        }
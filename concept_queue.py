@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# ── CONCEPT LOOKAHEAD QUEUE ─────────────────────────────────────
+# Per-user queue of upcoming /next-concept results, filled in the
+# background while the user is still writing an answer, so "Start
+# concept challenge" becomes a local pop. /next-concept is stateful
+# (it depends on mastery) and takes only user_id, so the fill stops at
+# the first concept already queued: until the next grade lands it
+# keeps returning the same one. The app refills only once the grade
+# is in, and every grade reaching /check-answer invalidates the queue.
+# A grade still on its way (write-behind) holds the queue: no fill
+# until the invalidation that follows its delivery.
+
+CONCEPT_FIELDS = ("concept_id", "concept", "core_idea", "ideal_explanation", "difficulty")
+
+
+class ConceptQueue:
+    def __init__(self, depth=2):
+        self.depth = depth
+
+        self._lock = threading.Lock()
+        self._ready = deque()
+        self._filling = False
+        self._generation = 0
+        self.done = False
+        self.held = False
+
+    def fill(self, fetch, executor):
+        # fetch() -> (data, err); runs on the executor
+        with self._lock:
+            if self._filling or self.done or self.held or len(self._ready) >= self.depth:
+                return
+            self._filling = True
+            generation = self._generation
+        executor.submit(self._fill, fetch, generation)
+
+    def pop(self):
+        # -> ("concept", data) | ("done", None) | (None, None) if nothing ready
+        with self._lock:
+            if self._ready:
+                return "concept", self._ready.popleft()
+            if self.done:
+                return "done", None
+            return None, None
+
+    def invalidate(self, hold=False):
+        with self._lock:
+            self._generation += 1
+            self._ready.clear()
+            self.done = False
+            self.held = hold
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ready)
+
+    def _fill(self, fetch, generation):
+        try:
+            while True:
+                with self._lock:
+                    if generation != self._generation or len(self._ready) >= self.depth:
+                        return
+                    queued = [c["concept_id"] for c in self._ready]
+
+                data, err = fetch()
+                if err or not isinstance(data, dict):
+                    return
+
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    if data.get("done"):
+                        self.done = True
+                        return
+                    if not all(f in data for f in CONCEPT_FIELDS):
+                        return
+                    if data["concept_id"] in queued:
+                        return
+                    self._ready.append({f: data[f] for f in CONCEPT_FIELDS})
+        finally:
+            with self._lock:
+                self._filling = False
+
+
+class ConceptQueues:
+    # process-wide registry: one ConceptQueue per user, LRU-bounded
+
+    def __init__(self, depth=2, max_users=5000, workers=4, executor_for=None):
+        self.depth = depth
+        self.max_users = max_users
+        if executor_for is None:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="concept-queue")
+            executor_for = lambda user_id: pool
+        self.executor_for = executor_for
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()
+
+        # counters
+        self.local_pops = 0
+        self.remote_fetches = 0
+        self.invalidations = 0
+
+    def for_user(self, user_id):
+        with self._lock:
+            queue = self._queues.get(user_id)
+            if queue is None:
+                queue = self._queues[user_id] = ConceptQueue(self.depth)
+            self._queues.move_to_end(user_id)
+            while len(self._queues) > self.max_users:
+                self._queues.popitem(last=False)
+            return queue
+
+    def next_concept(self, user_id, fetch):
+        # -> (data, err) shaped like a /next-concept reply
+        kind, data = self.for_user(user_id).pop()
+        if kind == "concept":
+            self.local_pops += 1
+            return data, None
+        if kind == "done":
+            self.local_pops += 1
+            return {"done": True}, None
+        self.remote_fetches += 1
+        return fetch()
+
+    def refill(self, user_id, fetch):
+        self.for_user(user_id).fill(fetch, self.executor_for(user_id))
+
+    def invalidate(self, user_id, hold=False):
+        self.invalidations += 1
+        self.for_user(user_id).invalidate(hold)
+
+    def stats(self):
+        with self._lock:
+            queued = sum(len(q) for q in self._queues.values())
+            users = len(self._queues)
+        return {
+            "users": users,
+            "queued": queued,
+            "local_pops": self.local_pops,
+            "remote_fetches": self.remote_fetches,
+            "invalidations": self.invalidations,
+        }
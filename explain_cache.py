@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from kv_store import StoreError
+
+# ── SIMPLER-EXPLANATION CACHE ───────────────────────────────────
+# /explain-better results memoized by (concept_id, difficulty) and
+# shared by every session. speculate() warms an entry in the
+# background on a small low-priority pool while the feedback panel
+# is on screen; fetch() serves the click from the cache, joins an
+# in-flight speculation, or calls through as a last resort.
+# With a shared `store` (kv_store) every replica's results are
+# mirrored there: a local miss asks the store before the backend.
+
+
+def explain_key(concept_id, difficulty):
+    return (str(concept_id), str(difficulty))
+
+
+class ExplanationCache:
+    def __init__(self, max_entries=2048, ttl=24 * 3600, speculative_workers=2, store=None, executor_for=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (stored_at, text)
+        self._in_flight = {}            # key -> Future
+        self._unused = set()            # speculative entries nobody has read yet
+        if executor_for is None:
+            pool = ThreadPoolExecutor(max_workers=speculative_workers, thread_name_prefix="explain-spec")
+            executor_for = lambda owner: pool
+        self._executor_for = executor_for
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.speculated = 0
+        self.speculation_joined = 0
+        self.wasted = 0
+
+    def peek(self, key):
+        with self._lock:
+            return self._lookup(key)
+
+    def speculate(self, key, fn, owner=None):
+        with self._lock:
+            if self._lookup(key) is not None or key in self._in_flight:
+                return
+            self.speculated += 1
+            self._in_flight[key] = self._executor_for(owner).submit(self._run, key, fn, True)
+
+    def fetch(self, key, fn, timeout=None):
+        with self._lock:
+            text = self._lookup(key)
+            if text is not None:
+                self.hits += 1
+                self._unused.discard(key)
+                return text
+            future = self._in_flight.get(key)
+
+        if future is not None:
+            try:
+                text = future.result(timeout=timeout)
+            except Exception:
+                text = None
+            if text is not None:
+                with self._lock:
+                    self.speculation_joined += 1
+                    self._unused.discard(key)
+                return text
+
+        with self._lock:
+            self.misses += 1
+        return self._run(key, fn, False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_hits": self.shared_hits,
+                "speculated": self.speculated,
+                "speculation_joined": self.speculation_joined,
+                "wasted_speculations": self.wasted,
+                "entries": len(self._entries),
+                "in_flight": len(self._in_flight),
+            }
+
+    # ── internals ──
+    def _run(self, key, fn, speculative):
+        text = None
+        try:
+            text = self._shared(key)
+            if text is None:
+                text = fn()
+                self._share(key, text)
+        finally:
+            # stored before the in-flight future goes, under one lock:
+            # a fetch() in between would find neither and call again
+            with self._lock:
+                if text:
+                    self._entries[key] = (time.time(), text)
+                    self._entries.move_to_end(key)
+                    if speculative:
+                        self._unused.add(key)
+                    while len(self._entries) > self.max_entries:
+                        evicted, _ = self._entries.popitem(last=False)
+                        self._forget(evicted)
+                if speculative:
+                    self._in_flight.pop(key, None)
+        return text
+
+    def _shared(self, key):
+        if self.store is None:
+            return None
+        try:
+            text = self.store.get("explain:" + "|".join(key))
+        except StoreError:
+            return None
+        if text is not None:
+            with self._lock:
+                self.shared_hits += 1
+        return text
+
+    def _share(self, key, text):
+        if self.store is None or not text:
+            return
+        try:
+            self.store.set("explain:" + "|".join(key), text, ttl=self.ttl)
+        except StoreError:
+            pass
+
+    def _lookup(self, key):
+        # lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, text = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            self._forget(key)
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def _forget(self, key):
+        # lock held: a speculative result dropped before anyone read it
+        if key in self._unused:
+            self._unused.discard(key)
+            self.wasted += 1
@@ -0,0 +1,481 @@
+import socket
+import sqlite3
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+# ── SHARED STATE STORE ──────────────────────────────────────────
+# A small key/value + set interface under session snapshots, the quiz
+# cache and cached explanations, so several app replicas behind a load
+# balancer can serve the same users:
+#   MemoryStore   in-process; one replica (and the RESP stand-in)
+#   SQLiteStore   one WAL-mode file; replicas on one host / volume
+#   RedisStore    RESP2 over TCP: Redis, or anything speaking it
+#                 (python -m bench.resp_server locally)
+#
+#   open_store("memory://") / ("sqlite:///var/quiz/state.db") / ("redis://host:6379/0")
+#
+# Values and set members are str, TTLs are seconds (None = keep).
+# Every backend raises StoreError for its own failures, so callers
+# can degrade (a cache miss, a snapshot parked for the next flush).
+
+
+class StoreError(Exception):
+    pass
+
+
+class _Counters:
+    def _init_counters(self):
+        self._counter_lock = threading.Lock()
+        self.ops = 0
+        self.errors = 0
+        self.op_seconds = 0.0
+
+    def _count(self, start, failed=False):
+        with self._counter_lock:
+            self.ops += 1
+            self.errors += failed
+            self.op_seconds += time.perf_counter() - start
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "ops": self.ops,
+                "errors": self.errors,
+                "op_seconds": self.op_seconds,
+            }
+
+
+# ── in-process ──
+class MemoryStore(_Counters):
+    def __init__(self, sweep_every=1000):
+        self.sweep_every = sweep_every
+        self._lock = threading.Lock()
+        self._values = {}       # key -> (value, expires_at or None)
+        self._sets = {}         # key -> (set, expires_at or None)
+        self._writes = 0
+        self._init_counters()
+
+    def get(self, key):
+        return self.mget([key])[0]
+
+    def mget(self, keys):
+        start = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            out = [self._live(self._values, k, now) for k in keys]
+        self._count(start)
+        return out
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl=None):
+        start = time.perf_counter()
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            for key, value in items.items():
+                self._values[key] = (str(value), expires_at)
+            self._wrote(len(items))
+        self._count(start)
+
+    def delete(self, *keys):
+        start = time.perf_counter()
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+                self._sets.pop(key, None)
+        self._count(start)
+
+    def sadd(self, key, *members, ttl=None):
+        start = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            members_now = self._live(self._sets, key, now) or set()
+            members_now.update(str(m) for m in members)
+            expires_at = now + ttl if ttl else self._sets.get(key, (None, None))[1]
+            self._sets[key] = (members_now, expires_at)
+            self._wrote(1)
+        self._count(start)
+
+    def smembers(self, key):
+        start = time.perf_counter()
+        with self._lock:
+            members = set(self._live(self._sets, key, time.time()) or ())
+        self._count(start)
+        return members
+
+    def srem(self, key, *members):
+        start = time.perf_counter()
+        with self._lock:
+            current = self._live(self._sets, key, time.time())
+            if current is not None:
+                current.difference_update(members)
+                if not current:
+                    del self._sets[key]
+        self._count(start)
+
+    def expire(self, key, ttl):
+        start = time.perf_counter()
+        with self._lock:
+            for table in (self._values, self._sets):
+                if key in table:
+                    table[key] = (table[key][0], time.time() + ttl)
+        self._count(start)
+
+    def ping(self):
+        return True
+
+    def size(self):
+        with self._lock:
+            return len(self._values) + len(self._sets)
+
+    def flush(self):
+        with self._lock:
+            self._values.clear()
+            self._sets.clear()
+
+    def close(self):
+        pass
+
+    # lock held
+    def _live(self, table, key, now):
+        entry = table.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del table[key]
+            return None
+        return value
+
+    def _wrote(self, n):
+        self._writes += n
+        if self._writes >= self.sweep_every:
+            self._writes = 0
+            now = time.time()
+            for table in (self._values, self._sets):
+                for key in [k for k, (_, e) in table.items() if e is not None and e <= now]:
+                    del table[key]
+
+
+# ── one file ──
+class SQLiteStore(_Counters):
+    def __init__(self, path, sweep_every=1000):
+        self.sweep_every = sweep_every
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10.0)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS kv (
+                key        TEXT PRIMARY KEY,
+                value      TEXT NOT NULL,
+                expires_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS kv_sets (
+                key        TEXT NOT NULL,
+                member     TEXT NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (key, member)
+            );
+            """
+        )
+        self._db.commit()
+        self._init_counters()
+
+    def get(self, key):
+        return self.mget([key])[0]
+
+    def mget(self, keys):
+        keys = list(keys)
+        if not keys:
+            return []
+        rows = self._run(
+            f"SELECT key, value FROM kv WHERE key IN ({','.join('?' * len(keys))})"
+            " AND (expires_at IS NULL OR expires_at > ?)",
+            (*keys, time.time()),
+        )
+        found = dict(rows)
+        return [found.get(k) for k in keys]
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        self._run_many(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            [(k, str(v), expires_at) for k, v in items.items()],
+        )
+
+    def delete(self, *keys):
+        self._run_many("DELETE FROM kv WHERE key = ?", [(k,) for k in keys])
+        self._run_many("DELETE FROM kv_sets WHERE key = ?", [(k,) for k in keys])
+
+    def sadd(self, key, *members, ttl=None):
+        if ttl:
+            expires_at = time.time() + ttl
+        else:
+            # new members keep the set's current expiry, as in Redis
+            row = self._run(
+                "SELECT expires_at FROM kv_sets WHERE key = ?"
+                " AND (expires_at IS NULL OR expires_at > ?) LIMIT 1",
+                (key, time.time()),
+            )
+            expires_at = row[0][0] if row else None
+        self._run_many(
+            "INSERT OR REPLACE INTO kv_sets (key, member, expires_at) VALUES (?, ?, ?)",
+            [(key, str(m), expires_at) for m in members],
+        )
+        if ttl:
+            # the whole set shares one expiry, as in Redis
+            self._run("UPDATE kv_sets SET expires_at = ? WHERE key = ?", (expires_at, key), write=True)
+
+    def smembers(self, key):
+        rows = self._run(
+            "SELECT member FROM kv_sets WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        )
+        return {r[0] for r in rows}
+
+    def srem(self, key, *members):
+        self._run_many(
+            "DELETE FROM kv_sets WHERE key = ? AND member = ?", [(key, m) for m in members]
+        )
+
+    def expire(self, key, ttl):
+        expires_at = time.time() + ttl
+        self._run("UPDATE kv SET expires_at = ? WHERE key = ?", (expires_at, key), write=True)
+        self._run("UPDATE kv_sets SET expires_at = ? WHERE key = ?", (expires_at, key), write=True)
+
+    def ping(self):
+        self._run("SELECT 1", ())
+        return True
+
+    def size(self):
+        rows = self._run("SELECT (SELECT COUNT(*) FROM kv) + (SELECT COUNT(DISTINCT key) FROM kv_sets)", ())
+        return rows[0][0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _run(self, sql, params, write=False):
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                rows = self._db.execute(sql, params).fetchall()
+                if write:
+                    self._db.commit()
+        except sqlite3.Error as e:
+            self._count(start, failed=True)
+            raise StoreError(str(e)) from e
+        self._count(start)
+        return rows
+
+    def _run_many(self, sql, rows):
+        if not rows:
+            return
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                self._db.executemany(sql, rows)
+                self._writes += len(rows)
+                if self._writes >= self.sweep_every:
+                    self._writes = 0
+                    now = time.time()
+                    self._db.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+                    self._db.execute("DELETE FROM kv_sets WHERE expires_at <= ?", (now,))
+                self._db.commit()
+        except sqlite3.Error as e:
+            self._count(start, failed=True)
+            raise StoreError(str(e)) from e
+        self._count(start)
+
+
+# ── Redis protocol ──
+def encode_command(*args):
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(out)
+
+
+class RespReader:
+    # RESP2 replies from a socket; errors come back as StoreError values
+    def __init__(self, sock):
+        self.sock = sock
+        self._buf = bytearray()
+
+    def line(self):
+        while True:
+            end = self._buf.find(b"\r\n")
+            if end >= 0:
+                line = bytes(self._buf[:end])
+                del self._buf[: end + 2]
+                return line
+            self._fill()
+
+    def exactly(self, n):
+        while len(self._buf) < n + 2:
+            self._fill()
+        data = bytes(self._buf[:n])
+        del self._buf[: n + 2]
+        return data
+
+    def reply(self):
+        line = self.line()
+        kind, rest = line[:1], line[1:]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return StoreError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            return None if n < 0 else self.exactly(n).decode()
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self.reply() for _ in range(n)]
+        raise StoreError(f"bad RESP reply {line[:40]!r}")
+
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("connection closed")
+        self._buf += chunk
+
+
+class RedisStore(_Counters):
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, timeout=2.0, max_idle=16):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = deque()            # (socket, reader) ready for reuse
+        self._init_counters()
+
+    def get(self, key):
+        return self._call(("GET", key))[0]
+
+    def mget(self, keys):
+        keys = list(keys)
+        return self._call(("MGET", *keys))[0] if keys else []
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl=None):
+        expiry = ("PX", int(ttl * 1000)) if ttl else ()
+        self._call(*[("SET", k, v, *expiry) for k, v in items.items()])
+
+    def delete(self, *keys):
+        if keys:
+            self._call(("DEL", *keys))
+
+    def sadd(self, key, *members, ttl=None):
+        commands = [("SADD", key, *members)]
+        if ttl:
+            commands.append(("PEXPIRE", key, int(ttl * 1000)))
+        self._call(*commands)
+
+    def smembers(self, key):
+        return set(self._call(("SMEMBERS", key))[0] or ())
+
+    def srem(self, key, *members):
+        if members:
+            self._call(("SREM", key, *members))
+
+    def expire(self, key, ttl):
+        self._call(("PEXPIRE", key, int(ttl * 1000)))
+
+    def ping(self):
+        return self._call(("PING",))[0] == "PONG"
+
+    def size(self):
+        return self._call(("DBSIZE",))[0]
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._idle.popleft()[0].close()
+
+    def _call(self, *commands):
+        # one round trip for all `commands` (pipelined); a dropped pooled
+        # connection is retried once on a fresh one
+        start = time.perf_counter()
+        payload = b"".join(encode_command(*c) for c in commands)
+        for attempt in range(2):
+            conn = self._checkout(fresh=attempt > 0)
+            try:
+                conn[0].sendall(payload)
+                replies = [conn[1].reply() for _ in commands]
+            except (OSError, ConnectionError, StoreError) as e:
+                conn[0].close()
+                if attempt:
+                    self._count(start, failed=True)
+                    raise StoreError(f"redis {self.address[0]}:{self.address[1]}: {e}") from e
+                continue
+            self._checkin(conn)
+            break
+
+        errors = [r for r in replies if isinstance(r, StoreError)]
+        self._count(start, failed=bool(errors))
+        if errors:
+            raise errors[0]
+        return replies
+
+    def _checkout(self, fresh=False):
+        if not fresh:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop()
+        try:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+        except OSError as e:
+            raise StoreError(f"redis {self.address[0]}:{self.address[1]}: {e}") from e
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, RespReader(sock))
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            sock.sendall(b"".join(encode_command(*c) for c in setup))
+            for _ in setup:
+                reply = conn[1].reply()
+                if isinstance(reply, StoreError):
+                    sock.close()
+                    raise reply
+        return conn
+
+    def _checkin(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn[0].close()
+
+
+def open_store(url):
+    u = urlparse(url)
+    if u.scheme == "memory":
+        return MemoryStore()
+    if u.scheme == "sqlite":
+        return SQLiteStore(u.path if not u.netloc else f"{u.netloc}{u.path}")
+    if u.scheme in ("redis", "tcp"):
+        return RedisStore(
+            u.hostname or "127.0.0.1",
+            u.port or 6379,
+            db=int(u.path.strip("/") or 0),
+            password=u.password,
+        )
+    raise ValueError(f"unknown state store {url!r} (memory://, sqlite:///path, redis://host:port/db)")
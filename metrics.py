@@ -0,0 +1,468 @@
+import bisect
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ── APP METRICS ─────────────────────────────────────────────────
+# Small, dependency-free metrics registry: labelled counters and
+# histograms plus "collectors" (callbacks returning gauges, used to
+# surface the stats() of caches / queues). Exported either as
+# Prometheus text on an HTTP port or as a periodically flushed JSON
+# file. One process-wide REGISTRY; backend_client and the app record
+# into it through the observe_* helpers below.
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120,
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# endpoint -> mode label when no session mode is in context
+PATH_MODES = {
+    "/next-concept": "concept",
+    "/check-answer": "concept",
+    "/explain-better": "concept",
+    "/login": "login",
+}
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _fmt_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_fmt_labels(self.labelnames, key)} {value}"
+            for key, value in items
+        ]
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {"labels": dict(zip(self.labelnames, key)), "value": value}
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}   # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = []
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_fmt_labels(self.labelnames, key, ('le', bound))} {cumulative}"
+                )
+            cumulative += series[len(self.buckets)]
+            lines.append(
+                f"{self.name}_bucket{_fmt_labels(self.labelnames, key, ('le', '+Inf'))} {cumulative}"
+            )
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        out = []
+        for key, series in items:
+            count = sum(series[:-1])
+            out.append({
+                "labels": dict(zip(self.labelnames, key)),
+                "count": count,
+                "sum": series[-1],
+                "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], series[:-1])),
+                "p50": self._quantile(series, 0.5),
+                "p95": self._quantile(series, 0.95),
+                "p99": self._quantile(series, 0.99),
+            })
+        return out
+
+    def _quantile(self, series, q):
+        # upper bucket bound containing the q-th observation
+        count = sum(series[:-1])
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        for bound, n in zip(self.buckets, series):
+            cumulative += n
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = {}
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self._register(Histogram(name, help, buckets, labelnames))
+
+    def collector(self, prefix, fn):
+        # fn() -> {name: number}; exported as gauges "<prefix>_<name>"
+        with self._lock:
+            self._collectors[prefix] = fn
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.render())
+        for prefix, values in self._collect(collectors).items():
+            for name, value in values.items():
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        return {
+            "timestamp": time.time(),
+            "metrics": {m.name: m.snapshot() for m in metrics},
+            "gauges": self._collect(collectors),
+        }
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def _collect(self, collectors):
+        out = {}
+        for prefix, fn in collectors:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            out[prefix] = {
+                k: float(v) for k, v in values.items()
+                if isinstance(v, (int, float)) and not isinstance(v, bool)
+            }
+        return out
+
+
+REGISTRY = Registry()
+
+BACKEND_SECONDS = REGISTRY.histogram(
+    "quiz_backend_request_seconds",
+    "Backend request latency per attempt",
+    LATENCY_BUCKETS,
+    ("endpoint", "mode", "outcome"),
+)
+BACKEND_ERRORS = REGISTRY.counter(
+    "quiz_backend_errors_total",
+    "Backend request failures by kind (timeout, connection, http_4xx, http_5xx, circuit_open)",
+    ("endpoint", "mode", "kind"),
+)
+BACKEND_RETRIES = REGISTRY.counter(
+    "quiz_backend_retries_total", "Backend retry attempts", ("endpoint", "mode")
+)
+REQUEST_BYTES = REGISTRY.histogram(
+    "quiz_backend_request_bytes", "Request body size", SIZE_BUCKETS, ("endpoint",)
+)
+RESPONSE_BYTES = REGISTRY.histogram(
+    "quiz_backend_response_bytes", "Response body size", SIZE_BUCKETS, ("endpoint",)
+)
+RERUN_SECONDS = REGISTRY.histogram(
+    "quiz_rerun_seconds", "Full script run time", LATENCY_BUCKETS, ("mode", "outcome")
+)
+TTFQ_SECONDS = REGISTRY.histogram(
+    "quiz_time_to_first_question_seconds",
+    "From the login click to the first question on screen",
+    LATENCY_BUCKETS,
+    ("mode",),
+)
+
+OUTBOUND_WAIT_SECONDS = REGISTRY.histogram(
+    "quiz_outbound_queue_wait_seconds",
+    "Time a backend request waited for the outbound scheduler",
+    LATENCY_BUCKETS,
+    ("priority",),
+)
+OUTBOUND_SHED = REGISTRY.counter(
+    "quiz_outbound_shed_total",
+    "Low-priority backend requests dropped instead of queued",
+    ("endpoint", "priority"),
+)
+
+# ── mode label ──
+_mode = contextvars.ContextVar("quiz_mode", default=None)
+
+
+def set_mode(mode):
+    _mode.set(mode)
+
+
+def mode_for(path, payload=None):
+    mode = _mode.get()
+    if mode:
+        return mode
+    if isinstance(payload, dict) and payload.get("mode"):
+        return payload["mode"]
+    return PATH_MODES.get(path, "background")
+
+
+# ── recording helpers ──
+def observe_request(path, mode, seconds, request_bytes, response=None, error=None,
+                    response_bytes=None):
+    if error is not None:
+        kind = "timeout" if "Timeout" in type(error).__name__ else "connection"
+        BACKEND_ERRORS.inc(endpoint=path, mode=mode, kind=kind)
+        outcome = kind
+    elif response.status_code >= 500:
+        BACKEND_ERRORS.inc(endpoint=path, mode=mode, kind="http_5xx")
+        outcome = "http_5xx"
+    elif response.status_code >= 400:
+        BACKEND_ERRORS.inc(endpoint=path, mode=mode, kind="http_4xx")
+        outcome = "http_4xx"
+    else:
+        outcome = "ok"
+
+    BACKEND_SECONDS.observe(seconds, endpoint=path, mode=mode, outcome=outcome)
+    REQUEST_BYTES.observe(request_bytes, endpoint=path)
+    if response_bytes is not None:
+        RESPONSE_BYTES.observe(response_bytes, endpoint=path)
+
+
+def observe_retry(path, mode):
+    BACKEND_RETRIES.inc(endpoint=path, mode=mode)
+
+
+def observe_circuit_open(path, mode):
+    BACKEND_ERRORS.inc(endpoint=path, mode=mode, kind="circuit_open")
+
+
+def observe_queue_wait(seconds, priority):
+    OUTBOUND_WAIT_SECONDS.observe(seconds, priority=priority)
+
+
+def observe_shed(path, priority):
+    OUTBOUND_SHED.inc(endpoint=path, priority=priority)
+
+
+def observe_rerun(seconds, mode, outcome):
+    RERUN_SECONDS.observe(seconds, mode=mode, outcome=outcome)
+
+
+def observe_first_question(seconds, mode):
+    TTFQ_SECONDS.observe(seconds, mode=mode)
+
+
+# ── process / session gauges ──
+def thread_group(name):
+    # "prefetch_3" -> "prefetch", "Thread-7 (serve_forever)" -> "Thread"
+    return re.split(r"[-_]\d", name)[0]
+
+
+def thread_counts():
+    counts = {"total": 0}
+    for t in threading.enumerate():
+        group = thread_group(t.name)
+        counts[group] = counts.get(group, 0) + 1
+        counts["total"] += 1
+    return counts
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # peak rather than current, but the best we get off Linux
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def process_stats():
+    return {"rss_bytes": rss_bytes(), "threads": threading.active_count()}
+
+
+def deep_sizeof(obj, seen=None):
+    # containers and __slots__ value objects (question.Question) are
+    # followed; other objects count their own size only, so shared
+    # resources reachable from session state are not charged
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif not hasattr(obj, "__dict__"):
+        for name in getattr(type(obj), "__slots__", ()):
+            size += deep_sizeof(getattr(obj, name, None), seen)
+    return size
+
+
+class SessionSizes:
+    # latest deep size of each session's st.session_state, plus the
+    # mean size per key (to see which entries dominate)
+
+    def __init__(self, max_sessions=10000):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = {}     # session_id -> {key: bytes}
+
+    def record(self, session_id, state):
+        sizes = {str(k): deep_sizeof(v) for k, v in state.items()}
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._sessions[session_id] = sizes
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.pop(next(iter(self._sessions)))
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        totals = [sum(s.values()) for s in sessions]
+        out = {
+            "sessions": len(sessions),
+            "mean_bytes": sum(totals) / len(totals) if totals else 0,
+            "max_bytes": max(totals, default=0),
+            "total_bytes": sum(totals),
+            "mean_keys": sum(len(s) for s in sessions) / len(sessions) if sessions else 0,
+        }
+        per_key = {}
+        for s in sessions:
+            for key, size in s.items():
+                # widget keys carry an index; fold them together
+                group = "key_" + re.sub(r"\W+", "_", thread_group(key))
+                per_key[group] = per_key.get(group, 0) + size
+        for group, size in per_key.items():
+            out[group + "_bytes"] = size / len(sessions)
+        return out
+
+
+# ── exporters ──
+def serve_prometheus(port, host="0.0.0.0", registry=REGISTRY):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class JsonFlusher:
+    # writes REGISTRY.snapshot() to `path` every `interval` seconds (atomic replace)
+
+    def __init__(self, path, interval=15.0, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-json", daemon=True)
+        self._thread.start()
+
+    def flush(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(tmp, self.path)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(self.interval)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except OSError:
+                pass
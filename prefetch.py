@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# ── PREFETCH ENGINE ─────────────────────────────────────────────
+# Process-wide, bounded pool of generation workers. Futures are kept
+# per Streamlit session and per round key (topic, difficulty, mode,
+# size); worker threads never touch st.session_state — the script
+# pulls finished rounds out with take() on its next rerun.
+# `executor_for(owner)` hands the work to a shared executor instead
+# of the engine's own pool (e.g. the app's BackendEngine).
+
+
+def round_key(topic, difficulty, mode, num_questions):
+    return (
+        " ".join(str(topic).lower().split()),
+        (difficulty or "").lower(),
+        (mode or "quiz").lower(),
+        int(num_questions),
+    )
+
+
+class PrefetchEngine:
+    def __init__(self, max_workers=4, lookahead=1, session_ttl=900, executor_for=None):
+        self.lookahead = lookahead
+        self.session_ttl = session_ttl
+
+        if executor_for is None:
+            pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+            executor_for = lambda owner: pool
+        self._executor_for = executor_for
+        self._lock = threading.Lock()
+        self._futures = {}      # session_id -> {key: deque[Future]}
+        self._touched = {}      # session_id -> last activity
+
+        # counters
+        self.scheduled = 0
+        self.hits = 0
+        self.waited = 0
+        self.misses = 0
+        self.discarded = 0
+
+    # ── scheduling ──
+    def schedule(self, session_id, key, fn, lookahead=None, owner=None):
+        # top up (session_id, key) to `lookahead` rounds in flight; any
+        # prefetch for another key in this session is stale and dropped
+        wanted = self.lookahead if lookahead is None else lookahead
+        executor = self._executor_for(owner or session_id)
+
+        with self._lock:
+            self._prune_idle()
+            self._touched[session_id] = time.time()
+            by_key = self._futures.setdefault(session_id, {})
+
+            for other in [k for k in by_key if k != key]:
+                self._discard(by_key.pop(other))
+
+            pending = by_key.setdefault(key, deque())
+            while len(pending) < wanted:
+                pending.append(executor.submit(fn))
+                self.scheduled += 1
+
+    def take(self, session_id, key, wait=False, timeout=None):
+        # pop the next successful round for this key, or None; with
+        # wait=True an in-flight prefetch is awaited instead of skipped
+        with self._lock:
+            self._touched[session_id] = time.time()
+            pending = self._futures.get(session_id, {}).get(key)
+            if not pending:
+                self.misses += 1
+                return None
+            candidates = list(pending)
+
+        for future in candidates:
+            ready = future.done()
+            if not ready and not wait:
+                continue
+            try:
+                result = future.result(timeout=timeout)
+            except (CancelledError, FutureTimeout):
+                continue
+            except Exception:
+                result = None
+
+            with self._lock:
+                if future in pending:
+                    pending.remove(future)
+                if result:
+                    if ready:
+                        self.hits += 1
+                    else:
+                        self.waited += 1
+            if result:
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def cancel(self, session_id):
+        with self._lock:
+            for pending in self._futures.pop(session_id, {}).values():
+                self._discard(pending)
+            self._touched.pop(session_id, None)
+
+    # ── introspection ──
+    def in_flight(self, session_id=None):
+        with self._lock:
+            sessions = (
+                [self._futures.get(session_id, {})]
+                if session_id is not None
+                else list(self._futures.values())
+            )
+            return sum(
+                1
+                for by_key in sessions
+                for pending in by_key.values()
+                for f in pending
+                if not f.done()
+            )
+
+    def stats(self):
+        return {
+            "scheduled": self.scheduled,
+            "hits": self.hits,
+            "waited": self.waited,
+            "misses": self.misses,
+            "discarded": self.discarded,
+            "in_flight": self.in_flight(),
+            "sessions": len(self._futures),
+        }
+
+    # ── internals (lock held) ──
+    def _discard(self, pending):
+        for future in pending:
+            # queued work is cancelled; running work finishes and is ignored
+            future.cancel()
+            self.discarded += 1
+
+    def _prune_idle(self):
+        cutoff = time.time() - self.session_ttl
+        for sid in [s for s, t in self._touched.items() if t < cutoff]:
+            for pending in self._futures.pop(sid, {}).values():
+                self._discard(pending)
+            del self._touched[sid]
@@ -0,0 +1,279 @@
+import json
+import math
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# ── LOCAL PRE-GRADER ────────────────────────────────────────────
+# Scores a free-text concept answer against core_idea and
+# ideal_explanation with hashed TF-IDF vectors (unigrams + bigrams)
+# and resolves only clear-cut cases locally: blank / "I don't know",
+# one-word answers, near-verbatim copies of the ideal explanation
+# and answers the lexical model is very sure about. Everything else
+# returns None and goes to the LLM-backed /check-answer.
+# A local verdict only saves the user the wait: the answer is still
+# reported to /check-answer (write-behind), where mastery is kept.
+#
+# Reference vectors are computed once per concept_id; document
+# frequencies are learned from every reference text seen.
+#
+# The logistic weights and the confidence threshold come from a model
+# file fitted on backend-graded answers (fit(), python -m
+# bench.eval_pregrader LOG --fit MODEL); the built-in weights are only
+# a starting point for shadow mode. Lexical overlap cannot see
+# negation, so an answer that adds one the references do not have is
+# never passed locally.
+
+DIM = 1 << 18
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be been but by can do does for from has have how i
+    if in into is it its it's just like me my of on or so some something
+    that the their them then there these they thing things this to too
+    very was we what when where which while who why will with you your
+    """.split()
+)
+
+NON_ANSWERS = frozenset({
+    "", "i don't know", "i dont know", "idk", "no idea", "not sure",
+    "dunno", "pass", "?", "no clue", "i have no idea",
+})
+
+NEGATIONS = frozenset({
+    "not", "no", "never", "nor", "none", "cannot", "can't", "don't", "doesn't",
+    "isn't", "aren't", "wasn't", "weren't", "won't", "didn't", "without",
+})
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_SUFFIXES = ("ingly", "edly", "ing", "ed", "es", "ly", "s")
+
+
+def stem(word):
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text):
+    words = _WORD.findall((text or "").lower())
+    return [stem(w) for w in words if w not in STOPWORDS]
+
+
+def _hash(term):
+    return zlib.crc32(term.encode()) % DIM
+
+
+def term_counts(tokens):
+    # sparse (indices, counts) over hashed unigrams + bigrams
+    terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not terms:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    idx = np.fromiter((_hash(t) for t in terms), dtype=np.int64, count=len(terms))
+    return np.unique(idx, return_counts=True)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def vector(f):
+    # logistic model inputs: (cos_ideal, cos_core, coverage, length, negated)
+    return np.array([
+        f["cos_ideal"],
+        f["cos_core"],
+        f["coverage"],
+        min(f["words"] / 12.0, 1.0),
+        1.0 if f["negations"] else 0.0,
+    ])
+
+
+def load_model(path):
+    # -> {"weights", "bias", "threshold", ...} or None
+    try:
+        with open(path, encoding="utf-8") as f:
+            model = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if len(model.get("weights", ())) != len(PreGrader.WEIGHTS):
+        return None
+    return model
+
+
+class PreGrader:
+    # unfitted logistic weights over vector()
+    WEIGHTS = np.array([5.0, 3.0, 4.0, 1.0, -3.0])
+    BIAS = -2.5
+
+    def __init__(self, threshold=0.95, copy_similarity=0.9, max_concepts=4096, weights=None, bias=None):
+        self.threshold = threshold
+        self.copy_similarity = copy_similarity
+        self.max_concepts = max_concepts
+        self.weights = self.WEIGHTS if weights is None else np.asarray(weights, dtype=np.float64)
+        self.bias = self.BIAS if bias is None else float(bias)
+        self.fitted = weights is not None
+
+        self._lock = threading.Lock()
+        self._refs = OrderedDict()      # concept_id -> reference features
+        self._df = {}                   # hashed term -> document frequency
+        self._docs = 0
+
+        # counters
+        self.local = 0
+        self.deferred = 0
+
+    # ── public ──
+    def grade(self, concept_id, core_idea, ideal_explanation, answer_text):
+        # -> /check-answer-shaped dict when clear-cut, else None
+        features = self.features(concept_id, core_idea, ideal_explanation, answer_text)
+        verdict = self.decide(features)
+        with self._lock:
+            if verdict is None:
+                self.deferred += 1
+            else:
+                self.local += 1
+        if verdict is None:
+            return None
+
+        correct, confidence, reason = verdict
+        return {
+            "correct": correct,
+            "verdict": reason,
+            "ideal_explanation": ideal_explanation,
+            "confidence": confidence,
+            "source": "local",
+        }
+
+    def features(self, concept_id, core_idea, ideal_explanation, answer_text):
+        ref = self._reference(concept_id, core_idea, ideal_explanation)
+        normalized = " ".join((answer_text or "").lower().split()).rstrip(".!")
+        tokens = tokenize(answer_text)
+        answer = term_counts(tokens)
+
+        with self._lock:
+            cos_ideal = self._cosine(answer, ref["ideal"])
+            cos_core = self._cosine(answer, ref["core"])
+
+        answer_terms = set(tokens)
+        negations = len(answer_terms & NEGATIONS) - len(ref["negations"])
+        coverage = (
+            len(answer_terms & ref["core_terms"]) / len(ref["core_terms"])
+            if ref["core_terms"]
+            else 0.0
+        )
+        return {
+            "non_answer": normalized in NON_ANSWERS,
+            "words": len(tokens),
+            "length_ratio": len(tokens) / max(ref["ideal_words"], 1),
+            "cos_ideal": cos_ideal,
+            "cos_core": cos_core,
+            "coverage": coverage,
+            "negations": max(negations, 0),
+        }
+
+    def decide(self, f):
+        # -> (correct, confidence, reason) or None when ambiguous
+        if f["non_answer"] or f["words"] == 0:
+            return False, 0.99, "No explanation given yet — try describing the core idea in your own words."
+        if f["words"] == 1:
+            return False, 0.97, "A single word isn't an explanation — say how or why it works."
+        if f["cos_ideal"] >= self.copy_similarity and f["length_ratio"] >= 0.6 and not f["negations"]:
+            return True, 0.97, "That matches the key explanation closely."
+
+        p = self.probability(f)
+        confidence = max(p, 1.0 - p)
+        if confidence < self.threshold or (p >= 0.5 and f["negations"]):
+            return None
+        if p >= 0.5:
+            return True, confidence, "You've captured the core idea."
+        return False, confidence, "This doesn't cover the core idea yet."
+
+    def probability(self, f):
+        return _sigmoid(float(self.weights @ vector(f)) + self.bias)
+
+    def stats(self):
+        with self._lock:
+            total = self.local + self.deferred
+            return {
+                "local": self.local,
+                "deferred": self.deferred,
+                "resolved_locally": self.local / total if total else 0.0,
+                "concepts": len(self._refs),
+                "fitted": int(self.fitted),
+            }
+
+    # ── internals ──
+    def _reference(self, concept_id, core_idea, ideal_explanation):
+        with self._lock:
+            ref = self._refs.get(concept_id)
+            if ref is not None:
+                self._refs.move_to_end(concept_id)
+                return ref
+
+        core_tokens = tokenize(core_idea)
+        ideal_tokens = tokenize(ideal_explanation)
+        ref = {
+            "core": term_counts(core_tokens),
+            "ideal": term_counts(ideal_tokens),
+            "core_terms": set(core_tokens),
+            "negations": (set(core_tokens) | set(ideal_tokens)) & NEGATIONS,
+            "ideal_words": len(ideal_tokens),
+        }
+
+        with self._lock:
+            if concept_id not in self._refs:
+                for idx, _ in (ref["core"], ref["ideal"]):
+                    self._docs += 1
+                    for i in idx.tolist():
+                        self._df[i] = self._df.get(i, 0) + 1
+            self._refs[concept_id] = ref
+            while len(self._refs) > self.max_concepts:
+                self._refs.popitem(last=False)
+        return ref
+
+    def _weights(self, sparse):
+        # lock held: sublinear tf * smoothed idf, L2-normalized
+        idx, counts = sparse
+        if not len(idx):
+            return idx, np.empty(0, dtype=np.float64)
+        df = np.fromiter((self._df.get(i, 0) for i in idx.tolist()), dtype=np.float64, count=len(idx))
+        idf = np.log((1.0 + self._docs) / (1.0 + df)) + 1.0
+        w = (1.0 + np.log(counts)) * idf
+        return idx, w / np.linalg.norm(w)
+
+    def _cosine(self, a, b):
+        ia, wa = self._weights(a)
+        ib, wb = self._weights(b)
+        if not len(ia) or not len(ib):
+            return 0.0
+        _, pa, pb = np.intersect1d(ia, ib, assume_unique=True, return_indices=True)
+        return float(wa[pa] @ wb[pb])
+
+
+# ── fitting ──
+def fit(records, l2=0.01, steps=3000, rate=0.5):
+    # logistic regression on backend verdicts (concept_id, core_idea,
+    # ideal_explanation, answer_text, correct) -> (weights, bias);
+    # non-answers and one-word answers are rule-decided and left out
+    grader = PreGrader()
+    xs, ys = [], []
+    for rec in records:
+        f = grader.features(rec["concept_id"], rec["core_idea"], rec["ideal_explanation"], rec["answer_text"])
+        if f["non_answer"] or f["words"] <= 1:
+            continue
+        xs.append(vector(f))
+        ys.append(1.0 if rec["correct"] else 0.0)
+    if not xs or len(set(ys)) < 2:
+        raise ValueError("fitting needs correct and incorrect graded answers")
+
+    x, y = np.array(xs), np.array(ys)
+    w, b = np.zeros(x.shape[1]), 0.0
+    for _ in range(steps):
+        p = 1.0 / (1.0 + np.exp(-(x @ w + b)))
+        w -= rate * (x.T @ (p - y) / len(y) + l2 * w)
+        b -= rate * float(np.mean(p - y))
+    return w, b
@@ -0,0 +1,80 @@
+import sys
+
+# ── QUESTION MODEL ──────────────────────────────────────────────
+# Backend questions are validated and parsed once, when a round
+# enters the session, into a compact immutable Question: __slots__
+# instead of a per-object dict, tuples for the choices and interned
+# choice letters ("A".."D" are shared by every question). Renders and
+# grading read the parsed fields; nothing re-checks the raw JSON.
+#
+# Caches, prefetch and the stream keep the raw dicts (they are
+# serialized and shared between sessions); parse_questions() is the
+# boundary.
+
+
+def valid_question(q):
+    return (
+        isinstance(q, dict)
+        and bool(q.get("question"))
+        and isinstance(q.get("choices"), dict)
+        and len(q["choices"]) >= 2
+    )
+
+
+def _letter(value):
+    return sys.intern(str(value).strip().upper())
+
+
+class Question:
+    __slots__ = ("id", "text", "letters", "options", "correct", "explanation")
+
+    def __init__(self, id, text, letters, options, correct, explanation=""):
+        self.id = id
+        self.text = text
+        self.letters = letters          # interned, upper case
+        self.options = options
+        self.correct = correct          # interned, upper case ("" if missing)
+        self.explanation = explanation
+
+    @classmethod
+    def parse(cls, raw):
+        # -> Question, or None when the payload is not a usable question
+        if not valid_question(raw):
+            return None
+        choices = raw["choices"]
+        return cls(
+            raw.get("id"),
+            str(raw["question"]),
+            tuple(_letter(k) for k in choices),
+            tuple(str(v) for v in choices.values()),
+            _letter(raw.get("correct", "")),
+            str(raw.get("explanation") or ""),
+        )
+
+    def as_dict(self):
+        # backend shape again; parse(q.as_dict()) round-trips
+        return {
+            "id": self.id,
+            "question": self.text,
+            "choices": dict(zip(self.letters, self.options)),
+            "correct": self.correct,
+            "explanation": self.explanation,
+        }
+
+    def labels(self):
+        return [f"{letter}. {option}" for letter, option in zip(self.letters, self.options)]
+
+    def option(self, letter):
+        try:
+            return self.options[self.letters.index(letter)]
+        except ValueError:
+            return None
+
+    def is_correct(self, label):
+        # label as shown by labels(): "B. Paris"
+        return _letter(label.split(".", 1)[0]) == self.correct
+
+
+def parse_questions(raw_questions):
+    # malformed entries are dropped here, once
+    return [q for q in map(Question.parse, raw_questions or ()) if q is not None]
@@ -0,0 +1,218 @@
+import json
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+# ── PRECOMPILED QUESTION BANK ───────────────────────────────────
+# Vetted questions for the built-in categories, compiled ahead of time
+# (python -m bench.build_bank) into one read-only file and mmapped at
+# startup: opening it reads the header and a small key table, question
+# records are decoded from the mapping only when a round is drawn, and
+# every app process on the host shares the same page-cache pages.
+#
+# Layout (little endian):
+#   header   MAGIC, version, key-table offset, key-table length
+#   records  per question: n_choices (u8), then length-prefixed (u32)
+#            UTF-8 strings: id, question, correct, explanation and
+#            letter, option for each choice
+#   offsets  per key: u64 record offsets, contiguous
+#   keys     JSON {"topic|difficulty|mode": [offsets_at, count]}
+#
+# Rebuilds are written to a temp file and renamed over the old one, so
+# a running process keeps reading the inode it mapped.
+
+MAGIC = b"QZBANK\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIQQ")
+U8 = struct.Struct("<B")
+U32 = struct.Struct("<I")
+U64 = struct.Struct("<Q")
+
+
+def bank_key(topic, difficulty, mode):
+    # same normalization as quiz_cache.cache_key, without the round size
+    return "|".join([
+        " ".join(str(topic).lower().split()),
+        (difficulty or "").lower(),
+        (mode or "quiz").lower(),
+    ])
+
+
+def _pack_question(q):
+    choices = q["choices"]
+    fields = [
+        str(q.get("id") or ""),
+        str(q["question"]),
+        str(q.get("correct") or ""),
+        str(q.get("explanation") or ""),
+    ]
+    for letter, option in choices.items():
+        fields += [str(letter), str(option)]
+
+    out = bytearray(U8.pack(len(choices)))
+    for field in fields:
+        data = field.encode("utf-8")
+        out += U32.pack(len(data)) + data
+    return bytes(out)
+
+
+def write_bank(path, sets):
+    # sets: {bank_key: [raw question dicts]} (already validated)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    keys = {}
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+
+        offsets = {}
+        for key, questions in sets.items():
+            offsets[key] = []
+            for q in questions:
+                offsets[key].append(f.tell())
+                f.write(_pack_question(q))
+
+        for key, record_offsets in offsets.items():
+            keys[key] = [f.tell(), len(record_offsets)]
+            f.write(b"".join(U64.pack(o) for o in record_offsets))
+
+        table_at = f.tell()
+        table = json.dumps(keys, sort_keys=True, separators=(",", ":")).encode()
+        f.write(table)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, table_at, len(table)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return keys
+
+
+class QuestionBank:
+    def __init__(self, path, max_tracked=10000):
+        self.path = path
+        self.max_tracked = max_tracked
+
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, table_at, table_len = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path}: not a version {VERSION} question bank")
+        self._keys = {
+            key: tuple(entry)
+            for key, entry in json.loads(self._map[table_at:table_at + table_len]).items()
+        }
+
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()      # user_id -> {key: set(record index)}
+        self._rng = random.Random()
+
+        # counters
+        self.rounds = {}                # reason -> rounds served
+        self.misses = 0
+        self.decoded = 0
+        self.decode_seconds = 0.0
+
+    @classmethod
+    def open(cls, path):
+        # None when no bank has been built
+        if not path or not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def keys(self):
+        return sorted(self._keys)
+
+    def count(self, topic, difficulty, mode):
+        entry = self._keys.get(bank_key(topic, difficulty, mode))
+        return entry[1] if entry else 0
+
+    def has(self, topic, difficulty, mode, n=1):
+        return self.count(topic, difficulty, mode) >= n
+
+    # ── reads ──
+    def question(self, key, i):
+        offsets_at, count = self._keys[key]
+        if not 0 <= i < count:
+            raise IndexError(i)
+        pos = U64.unpack_from(self._map, offsets_at + 8 * i)[0]
+
+        n_choices = U8.unpack_from(self._map, pos)[0]
+        pos += 1
+        fields = []
+        for _ in range(4 + 2 * n_choices):
+            n = U32.unpack_from(self._map, pos)[0]
+            pos += 4
+            fields.append(self._map[pos:pos + n].decode("utf-8"))
+            pos += n
+
+        qid, text, correct, explanation = fields[:4]
+        return {
+            "id": qid or f"bank-{key}-{i}",
+            "question": text,
+            "choices": dict(zip(fields[4::2], fields[5::2])),
+            "correct": correct,
+            "explanation": explanation,
+        }
+
+    def draw(self, topic, difficulty, mode, n, user_id=None, reason="instant"):
+        # -> n raw question dicts, or None when the key holds fewer; a
+        # user gets questions they have not drawn before until the pool
+        # runs out, then it starts over
+        key = bank_key(topic, difficulty, mode)
+        count = self._keys.get(key, (0, 0))[1]
+        if count < n:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            seen = self._seen_for(user_id, key)
+            fresh = [i for i in range(count) if i not in seen]
+            if len(fresh) < n:
+                seen.clear()
+                fresh = range(count)
+            picked = self._rng.sample(fresh, n)
+            seen.update(picked)
+
+        start = time.perf_counter()
+        questions = [self.question(key, i) for i in picked]
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.rounds[reason] = self.rounds.get(reason, 0) + 1
+            self.decoded += n
+            self.decode_seconds += elapsed
+        return questions
+
+    def _seen_for(self, user_id, key):
+        user = self._seen.get(user_id)
+        if user is None:
+            user = self._seen[user_id] = {}
+        self._seen.move_to_end(user_id)
+        while len(self._seen) > self.max_tracked:
+            self._seen.popitem(last=False)
+        return user.setdefault(key, set())
+
+    def close(self):
+        self._map.close()
+
+    # ── metrics ──
+    def stats(self):
+        with self._lock:
+            rounds = dict(self.rounds)
+            decoded, seconds = self.decoded, self.decode_seconds
+            misses = self.misses
+        out = {
+            "keys": len(self._keys),
+            "questions": sum(count for _, count in self._keys.values()),
+            "bytes": len(self._map),
+            "misses": misses,
+            "decoded_questions": decoded,
+            "decode_seconds": seconds,
+        }
+        for reason, n in rounds.items():
+            out[f"{reason}_rounds"] = n
+        return out
@@ -0,0 +1,354 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from kv_store import StoreError
+
+# ── GENERATED QUIZ CACHE ────────────────────────────────────────
+# Two tiers of generated question sets, shared by every session:
+#   memory  LRU of cache keys, bounded by entries + bytes
+#   disk    SQLite, bounded by bytes, survives restarts
+# A key holds several sets; a user is never served a set twice
+# (the "seen" table is the source of truth for that).
+#
+# SharedQuizCache keeps the same contract on a kv_store backend, so
+# every replica serves (and never repeats) the sets any replica has
+# generated:
+#   quiz:set:<set_id>   {"created_at", "questions"}, expires after ttl
+#   quiz:key:<key>      set ids generated for a cache key
+#   quiz:seen:<user>    set ids served to a user
+# Sets are immutable, so decoded ones are also kept in a local LRU.
+
+
+def cache_key(topic, start_difficulty, mode, num_questions):
+    return "|".join([
+        " ".join(str(topic).lower().split()),
+        (start_difficulty or "").lower(),
+        (mode or "quiz").lower(),
+        str(int(num_questions)),
+    ])
+
+
+def set_id_for(blob):
+    return hashlib.sha1(blob).hexdigest()
+
+
+class QuizCache:
+    def __init__(
+        self,
+        path,
+        ttl=6 * 3600,
+        max_memory_entries=256,
+        max_memory_bytes=32 * 1024 * 1024,
+        max_disk_bytes=256 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()    # key -> {set_id: (created_at, size, questions)}
+        self._memory_bytes = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sets (
+                set_id      TEXT PRIMARY KEY,
+                key         TEXT NOT NULL,
+                created_at  REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size        INTEGER NOT NULL,
+                payload     BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sets_by_key ON sets (key, created_at);
+            CREATE TABLE IF NOT EXISTS seen (
+                user_id TEXT NOT NULL,
+                set_id  TEXT NOT NULL,
+                PRIMARY KEY (user_id, set_id)
+            );
+            """
+        )
+        self._db.commit()
+
+        # counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ── lookups ──
+    def get(self, key, user_id):
+        now = time.time()
+        with self._lock:
+            seen = self._seen(user_id)
+
+            entry = self._memory.get(key)
+            if entry:
+                self._memory.move_to_end(key)
+                for set_id, (created_at, size, questions) in list(entry.items()):
+                    if now - created_at > self.ttl:
+                        self._drop_memory(key, set_id)
+                    elif set_id not in seen:
+                        self._mark_seen(user_id, set_id, now)
+                        self.memory_hits += 1
+                        return questions
+
+            row = self._db.execute(
+                "SELECT set_id, created_at, size, payload FROM sets"
+                " WHERE key = ? AND created_at > ?"
+                " AND set_id NOT IN (SELECT set_id FROM seen WHERE user_id = ?)"
+                " ORDER BY created_at DESC LIMIT 1",
+                (key, now - self.ttl, str(user_id)),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            set_id, created_at, size, payload = row
+            questions = json.loads(payload)
+            self._remember(key, set_id, created_at, size, questions)
+            self._mark_seen(user_id, set_id, now)
+            self.disk_hits += 1
+            return questions
+
+    def has(self, key):
+        # a fresh set exists for `key`, whoever has seen it
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM sets WHERE key = ? AND created_at > ? LIMIT 1",
+                (key, time.time() - self.ttl),
+            ).fetchone() is not None
+
+    def put(self, key, questions, user_id=None):
+        blob = json.dumps(questions, separators=(",", ":")).encode()
+        set_id = set_id_for(blob)
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO sets"
+                " (set_id, key, created_at, last_access, size, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (set_id, key, now, now, len(blob), blob),
+            )
+            self._remember(key, set_id, now, len(blob), questions)
+            if user_id is not None:
+                self._mark_seen(user_id, set_id, now, commit=False)
+            self._evict_disk(now)
+            self._db.commit()
+
+    # ── reporting ──
+    def stats(self):
+        with self._lock:
+            disk_bytes, disk_sets = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM sets"
+            ).fetchone()
+            memory_sets = sum(len(v) for v in self._memory.values())
+
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_bytes": self._memory_bytes,
+            "memory_sets": memory_sets,
+            "disk_bytes": disk_bytes,
+            "disk_sets": disk_sets,
+        }
+
+    # ── internals (lock held) ──
+    def _seen(self, user_id):
+        rows = self._db.execute(
+            "SELECT set_id FROM seen WHERE user_id = ?", (str(user_id),)
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def _mark_seen(self, user_id, set_id, now, commit=True):
+        self._db.execute(
+            "INSERT OR IGNORE INTO seen (user_id, set_id) VALUES (?, ?)",
+            (str(user_id), set_id),
+        )
+        self._db.execute(
+            "UPDATE sets SET last_access = ? WHERE set_id = ?", (now, set_id)
+        )
+        if commit:
+            self._db.commit()
+
+    def _remember(self, key, set_id, created_at, size, questions):
+        entry = self._memory.setdefault(key, {})
+        if set_id not in entry:
+            entry[set_id] = (created_at, size, questions)
+            self._memory_bytes += size
+        self._memory.move_to_end(key)
+
+        while self._memory and (
+            len(self._memory) > self.max_memory_entries
+            or self._memory_bytes > self.max_memory_bytes
+        ):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sum(size for _, size, _ in evicted.values())
+
+    def _drop_memory(self, key, set_id):
+        _, size, _ = self._memory[key].pop(set_id)
+        self._memory_bytes -= size
+        if not self._memory[key]:
+            del self._memory[key]
+
+    def _evict_disk(self, now):
+        deleted = self._db.execute(
+            "DELETE FROM sets WHERE created_at < ?", (now - self.ttl,)
+        ).rowcount
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM sets").fetchone()[0]
+        if total > self.max_disk_bytes:
+            rows = self._db.execute(
+                "SELECT set_id, size FROM sets ORDER BY last_access"
+            ).fetchall()
+            doomed = []
+            for set_id, size in rows:
+                if total <= self.max_disk_bytes:
+                    break
+                doomed.append((set_id,))
+                total -= size
+            self._db.executemany("DELETE FROM sets WHERE set_id = ?", doomed)
+            deleted += len(doomed)
+
+        if deleted:
+            self._db.execute(
+                "DELETE FROM seen WHERE set_id NOT IN (SELECT set_id FROM sets)"
+            )
+
+
+class SharedQuizCache:
+    def __init__(self, store, ttl=6 * 3600, max_memory_entries=1024, max_memory_bytes=32 * 1024 * 1024):
+        self.store = store
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_memory_bytes = max_memory_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()    # set_id -> (created_at, size, questions)
+        self._memory_bytes = 0
+
+        # counters
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    # ── lookups ──
+    def get(self, key, user_id):
+        try:
+            ids = self.store.smembers("quiz:key:" + key)
+            if ids:
+                ids -= self.store.smembers("quiz:seen:" + str(user_id))
+            found = self._records(key, ids)
+            if not found:
+                self._count("misses")
+                return None
+
+            set_id, (created_at, size, questions, local) = max(
+                found.items(), key=lambda item: item[1][0]
+            )
+            self.store.sadd("quiz:seen:" + str(user_id), set_id, ttl=self.ttl)
+        except StoreError:
+            self._count("errors")
+            self._count("misses")
+            return None
+
+        self._count("memory_hits" if local else "shared_hits")
+        return questions
+
+    def has(self, key):
+        # a fresh set exists for `key`, whoever has seen it
+        try:
+            return bool(self._records(key, self.store.smembers("quiz:key:" + key)))
+        except StoreError:
+            self._count("errors")
+            return False
+
+    def put(self, key, questions, user_id=None):
+        blob = json.dumps(questions, separators=(",", ":")).encode()
+        set_id = set_id_for(blob)
+        now = time.time()
+        record = json.dumps({"created_at": now, "questions": questions}, separators=(",", ":"))
+
+        try:
+            self.store.set("quiz:set:" + set_id, record, ttl=self.ttl)
+            self.store.sadd("quiz:key:" + key, set_id, ttl=self.ttl)
+            if user_id is not None:
+                self.store.sadd("quiz:seen:" + str(user_id), set_id, ttl=self.ttl)
+        except StoreError:
+            self._count("errors")
+        with self._lock:
+            self._remember(set_id, now, len(blob), questions)
+
+    # ── reporting ──
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_bytes": self._memory_bytes,
+                "memory_sets": len(self._memory),
+            }
+
+    # ── internals ──
+    def _records(self, key, ids):
+        # -> {set_id: (created_at, size, questions, from_memory)} still fresh
+        now = time.time()
+        found, remote = {}, []
+        with self._lock:
+            for set_id in ids:
+                entry = self._memory.get(set_id)
+                if entry is None:
+                    remote.append(set_id)
+                elif now - entry[0] <= self.ttl:
+                    self._memory.move_to_end(set_id)
+                    found[set_id] = entry + (True,)
+
+        if remote:
+            gone = []
+            for set_id, raw in zip(remote, self.store.mget(["quiz:set:" + i for i in remote])):
+                if raw is None:
+                    gone.append(set_id)
+                    continue
+                record = json.loads(raw)
+                entry = (record["created_at"], len(raw), record["questions"])
+                found[set_id] = entry + (False,)
+                with self._lock:
+                    self._remember(set_id, *entry)
+            if gone:
+                self.store.srem("quiz:key:" + key, *gone)
+        return found
+
+    def _remember(self, set_id, created_at, size, questions):
+        # lock held
+        if set_id not in self._memory:
+            self._memory_bytes += size
+        self._memory[set_id] = (created_at, size, questions)
+        self._memory.move_to_end(set_id)
+        while self._memory and (
+            len(self._memory) > self.max_memory_entries
+            or self._memory_bytes > self.max_memory_bytes
+        ):
+            _, (_, evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
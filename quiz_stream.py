@@ -0,0 +1,105 @@
+import json
+import threading
+
+from question import valid_question
+
+# ── STREAMED QUIZ GENERATION ────────────────────────────────────
+# /generate-quiz with {"stream": true} may answer with NDJSON (one
+# question object per line) or SSE ("data: {...}" events, optional
+# "data: [DONE]"). A plain JSON body is still accepted, so a backend
+# without streaming support degrades to the all-at-once path.
+
+
+def _questions_in(obj):
+    # a line/event may carry one question or a {"questions": [...]} chunk
+    if isinstance(obj, dict) and isinstance(obj.get("questions"), list):
+        return obj["questions"]
+    if isinstance(obj, dict) and "question" in obj:
+        return [obj]
+    return []
+
+
+def iter_questions(response):
+    content_type = response.headers.get("Content-Type", "").lower()
+
+    if "application/json" in content_type:
+        for q in _questions_in(response.json()):
+            if valid_question(q):
+                yield q
+        return
+
+    sse = "text/event-stream" in content_type
+
+    for raw in response.iter_lines(decode_unicode=True):
+        line = (raw or "").strip()
+        if not line:
+            continue
+
+        if sse:
+            if not line.startswith("data:"):
+                continue    # event:, id:, retry:, comments
+            line = line[5:].strip()
+            if line == "[DONE]":
+                return
+
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            continue
+
+        for q in _questions_in(obj):
+            if valid_question(q):
+                yield q
+
+
+class StreamingRound:
+    # filled by a worker thread, read by script reruns via snapshot()
+
+    def __init__(self, open_stream, on_done=None):
+        self._open_stream = open_stream
+        self._on_done = on_done
+
+        self._cond = threading.Condition()
+        self._questions = []
+        self.finished = False
+        self.error = None
+
+    def start(self, executor):
+        executor.submit(self._run)
+        return self
+
+    def _run(self):
+        try:
+            response = self._open_stream()
+            try:
+                response.raise_for_status()
+                for q in iter_questions(response):
+                    with self._cond:
+                        self._questions.append(q)
+                        self._cond.notify_all()
+            finally:
+                response.close()
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            with self._cond:
+                self.finished = True
+                self._cond.notify_all()
+
+        if self._on_done and self._questions and self.error is None:
+            try:
+                self._on_done(list(self._questions))
+            except Exception:
+                pass
+
+    def wait_for(self, index, timeout=None):
+        # block until question `index` exists or the stream ends
+        with self._cond:
+            self._cond.wait_for(
+                lambda: len(self._questions) > index or self.finished, timeout
+            )
+            return len(self._questions) > index
+
+    def snapshot(self):
+        with self._cond:
+            return list(self._questions)
@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+
+# ── RESILIENCE PRIMITIVES ───────────────────────────────────────
+# Building blocks for BackendClient.call(): a per-action deadline,
+# jittered exponential backoff, a per-endpoint circuit breaker and
+# a rolling latency window (used to decide when to hedge).
+
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# statuses that mean the request was not processed, so even
+# non-idempotent calls can be safely retried
+NOT_PROCESSED_STATUS = frozenset({425, 429, 503})
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    pass
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+class LoadShed(requests.exceptions.RequestException):
+    # low-priority request dropped by the outbound scheduler
+    pass
+
+
+class Deadline:
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+def backoff_delay(attempt, base=0.25, cap=4.0):
+    # "full jitter": uniform over [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    # closed -> open after `failure_threshold` consecutive failures;
+    # open -> half-open after `reset_after` seconds; one probe decides
+
+    def __init__(self, failure_threshold=5, reset_after=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        # the call never reached the backend (shed): no outcome to
+        # record, but a probe slot it held is free again
+        with self._lock:
+            self._probing = False
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+
+class LatencyWindow:
+    def __init__(self, size=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p):
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        k = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+        return ordered[k]
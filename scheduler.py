@@ -0,0 +1,225 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+from resilience import LoadShed
+
+# ── OUTBOUND REQUEST SCHEDULER ──────────────────────────────────
+# Every request to the worker passes through one process-wide gate
+# (BackendClient._request) that admits it by priority class:
+#   interactive   a user is waiting on it (login, grading, start_quiz)
+#   prefetch      user-visible lookahead (next round, next concept)
+#   speculative   may never be used (warm-up rounds, explanations)
+#   telemetry     write-behind answers and skill syncs
+# Admission needs a free in-flight slot and a token from a bucket
+# refilled at `rate` requests/s (burst `burst`); when either is short,
+# the highest class goes first, FIFO within a class.
+#
+# Load shedding: classes from `shed_from` down fail with LoadShed
+# instead of queueing once waits pass `shed_after` seconds, so
+# speculative work gives way on a busy node. The callers already
+# treat it as a failed call (a missed speculation, a spooled answer).
+#
+# The class travels in a context variable; work handed to another
+# thread is wrapped with with_priority().
+#
+# A request several callers share (single_flight.py) runs under a
+# SharedPriority: a caller that joins it raises its class to the
+# joiner's own, even while it is queued here, so a user waiting on a
+# speculative warm-up generation does not wait at speculative priority
+# and the flight is no longer sheddable once an interactive caller
+# waits on it.
+
+INTERACTIVE, PREFETCH, SPECULATIVE, TELEMETRY = range(4)
+PRIORITY_NAMES = ("interactive", "prefetch", "speculative", "telemetry")
+
+_priority = contextvars.ContextVar("quiz_priority", default=INTERACTIVE)
+_shared = contextvars.ContextVar("quiz_shared_priority", default=None)
+
+
+def current_priority():
+    return _priority.get()
+
+
+@contextmanager
+def priority(level):
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def with_priority(level, fn):
+    # fn, run under `level` on whichever thread calls it
+    def run(*args, **kwargs):
+        with priority(level):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+class SharedPriority:
+    # the class of a request callers share: the highest of theirs
+
+    def __init__(self, level):
+        self.level = level
+        self.cond = None            # the scheduler's, while the request queues
+
+    def raise_to(self, level):
+        if level < self.level:
+            self.level = level
+            cond = self.cond
+            if cond is not None:
+                with cond:
+                    cond.notify_all()
+
+
+@contextmanager
+def shared_priority(shared):
+    token = _shared.set(shared)
+    try:
+        yield
+    finally:
+        _shared.reset(token)
+
+
+def effective_priority(level):
+    shared = _shared.get()
+    return level if shared is None else min(level, shared.level)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def delay(self, now):
+        # seconds until a token is available (0 = one is there)
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class RequestScheduler:
+    def __init__(self, max_in_flight=32, rate=50.0, burst=50, shed_after=2.0, shed_from=SPECULATIVE):
+        self.max_in_flight = max_in_flight
+        self.shed_after = shed_after
+        self.shed_from = shed_from
+        self.bucket = TokenBucket(rate, burst) if rate else None
+
+        self._cond = threading.Condition()
+        self._waiting = []              # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._in_flight = 0
+
+        # counters, per class
+        self.admitted = [0] * len(PRIORITY_NAMES)
+        self.shed = [0] * len(PRIORITY_NAMES)
+        self.wait_seconds = [0.0] * len(PRIORITY_NAMES)
+        self.max_wait = [0.0] * len(PRIORITY_NAMES)
+        self.throttled = 0              # waits caused by the token bucket
+        self.boosted = 0                # queued requests raised by a joining caller
+
+    @contextmanager
+    def slot(self, path, level=None):
+        level = current_priority() if level is None else level
+        self.acquire(path, level)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, path, level):
+        start = time.monotonic()
+        shared = _shared.get()
+        if shared is not None:
+            level = min(level, shared.level)
+        ticket = (level, next(self._seq))
+        with self._cond:
+            if shared is not None:
+                shared.cond = self._cond
+            heapq.heappush(self._waiting, ticket)
+            throttled = False
+            while True:
+                if shared is not None and shared.level < level:
+                    # a caller of a higher class joined: requeue at its class
+                    self._drop(ticket)
+                    level = shared.level
+                    ticket = (level, ticket[1])
+                    heapq.heappush(self._waiting, ticket)
+                    self.boosted += 1
+                sheddable = level >= self.shed_from
+                now = time.monotonic()
+                waited = now - start
+                if self._waiting[0] == ticket and self._in_flight < self.max_in_flight:
+                    delay = self.bucket.delay(now) if self.bucket else 0.0
+                    if not delay:
+                        break
+                    throttled = True
+                else:
+                    delay = None
+
+                if sheddable and waited >= self.shed_after:
+                    self._drop(ticket)
+                    if shared is not None:
+                        shared.cond = None
+                    self.shed[level] += 1
+                    metrics.observe_shed(path, PRIORITY_NAMES[level])
+                    raise LoadShed(f"{path} shed: queued {waited:.1f}s at {PRIORITY_NAMES[level]} priority")
+
+                timeout = delay
+                if sheddable:
+                    left = self.shed_after - waited
+                    timeout = left if timeout is None else min(timeout, left)
+                self._cond.wait(timeout)
+
+            heapq.heappop(self._waiting)
+            if shared is not None:
+                shared.cond = None
+            if self.bucket:
+                self.bucket.take()
+            self._in_flight += 1
+            self.admitted[level] += 1
+            self.throttled += throttled
+            self.wait_seconds[level] += waited
+            self.max_wait[level] = max(self.max_wait[level], waited)
+            # the next ticket may be admissible too
+            self._cond.notify_all()
+        metrics.observe_queue_wait(waited, PRIORITY_NAMES[level])
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _drop(self, ticket):
+        # lock held
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+
+    # ── metrics ──
+    def stats(self):
+        with self._cond:
+            queued = [0] * len(PRIORITY_NAMES)
+            for level, _ in self._waiting:
+                queued[level] += 1
+            out = {"in_flight": self._in_flight, "throttled": self.throttled, "boosted": self.boosted}
+            for level, name in enumerate(PRIORITY_NAMES):
+                admitted = self.admitted[level]
+                out[f"{name}_queued"] = queued[level]
+                out[f"{name}_admitted"] = admitted
+                out[f"{name}_shed"] = self.shed[level]
+                out[f"{name}_mean_wait"] = self.wait_seconds[level] / admitted if admitted else 0.0
+                out[f"{name}_max_wait"] = self.max_wait[level]
+            return out
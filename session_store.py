@@ -0,0 +1,147 @@
+import json
+import secrets
+import threading
+from collections import OrderedDict
+
+from kv_store import StoreError
+
+# ── SESSION RESUME STORE ────────────────────────────────────────
+# Snapshots of each session's progress (user, score, the round being
+# played) keyed by a resume token that lives in the page URL. Saves
+# are write-behind: the script thread only serializes and parks the
+# latest snapshot per token, a background worker writes whatever is
+# parked every `flush_interval` seconds in one batch. Unchanged
+# snapshots are skipped, so a run that moves nothing writes nothing.
+# Restoring is one read (the parked snapshot or one store key).
+#
+# The store is a kv_store backend: local SQLite for one replica, a
+# shared one (Redis protocol, a shared SQLite file) when any replica
+# may pick a session up; expiry is the store's TTL.
+
+
+class SessionStore:
+    def __init__(self, store, ttl=2 * 3600, flush_interval=1.0, max_tracked=10000, prefix="session:"):
+        self.store = store
+        self.prefix = prefix
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.max_tracked = max_tracked
+
+        self._lock = threading.Lock()
+        self._pending = {}              # token -> payload not yet written
+        self._writing = {}              # batch being written right now
+        self._digests = OrderedDict()   # token -> hash of the last saved payload
+
+        # counters
+        self.saves = 0
+        self.unchanged = 0
+        self.written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._stop = threading.Event()
+        self._worker = threading.Thread(
+            target=self._run, name="session-store", daemon=True
+        )
+        self._worker.start()
+
+    @staticmethod
+    def new_token():
+        return secrets.token_urlsafe(16)
+
+    # ── script side ──
+    def save(self, token, state):
+        # False when the snapshot is the same as the last one saved
+        payload = json.dumps(state, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hash(payload)
+        with self._lock:
+            if self._digests.get(token) == digest:
+                self.unchanged += 1
+                return False
+            self._remember(token, digest)
+            self._pending[token] = payload
+            self.saves += 1
+        return True
+
+    def load(self, token):
+        with self._lock:
+            payload = self._pending.get(token) or self._writing.get(token)
+        if payload is None:
+            try:
+                payload = self.store.get(self.prefix + token)
+            except StoreError:
+                payload = None
+
+        if payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # another replica may have saved it last: compare against this
+        with self._lock:
+            self._remember(token, hash(payload))
+        return json.loads(payload)
+
+    def delete(self, token):
+        with self._lock:
+            self._pending.pop(token, None)
+            self._digests.pop(token, None)
+        self.store.delete(self.prefix + token)
+
+    def _remember(self, token, digest):
+        # lock held
+        self._digests[token] = digest
+        self._digests.move_to_end(token)
+        while len(self._digests) > self.max_tracked:
+            self._digests.popitem(last=False)
+
+    # ── worker side ──
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._writing = batch
+        try:
+            if batch:
+                self.store.set_many(
+                    {self.prefix + token: payload for token, payload in batch.items()},
+                    ttl=self.ttl,
+                )
+                self.written += len(batch)
+                self.flushes += 1
+        except StoreError:
+            # park them again unless a newer snapshot arrived meanwhile
+            with self._lock:
+                for token, entry in batch.items():
+                    self._pending.setdefault(token, entry)
+            raise
+        finally:
+            with self._lock:
+                self._writing = {}
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._worker.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except StoreError:
+                self.flush_errors += 1
+
+    # ── metrics ──
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "saves": self.saves,
+            "unchanged": self.unchanged,
+            "written": self.written,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
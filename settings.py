@@ -0,0 +1,131 @@
+import os
+
+# ── LOCAL DATA ──────────────────────────────────────────────────
+# Spools, caches and snapshots live here (override with QUIZ_DATA_DIR)
+DATA_DIR = os.environ.get("QUIZ_DATA_DIR", ".quiz_data")
+
+
+def data_path(name):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
+
+# ── SHARED STATE ────────────────────────────────────────────────
+# one store for session snapshots, generated rounds and explanations,
+# shared by every replica behind the load balancer:
+#   redis://host:6379/0 | sqlite:///shared/volume/state.db | memory://
+# unset = each replica keeps its own (local SQLite files under DATA_DIR)
+STATE_STORE = os.environ.get("QUIZ_STATE_STORE", "")
+
+# ── BACKEND ENGINE ──────────────────────────────────────────────
+# background backend jobs (prefetch, streams, lookahead, speculation)
+# running at once: per process, and per user within that
+BACKEND_CONCURRENCY = int(os.environ.get("QUIZ_BACKEND_CONCURRENCY", "16"))
+BACKEND_PER_USER = int(os.environ.get("QUIZ_BACKEND_PER_USER", "4"))
+
+# ── OUTBOUND SCHEDULER ──────────────────────────────────────────
+# requests to the worker in flight at once, and a token-bucket rate
+# limit (requests/s, 0 = none); speculative and telemetry requests
+# queued longer than QUIZ_SHED_AFTER seconds are dropped
+OUTBOUND_CONCURRENCY = int(os.environ.get("QUIZ_OUTBOUND_CONCURRENCY", "32"))
+OUTBOUND_RATE = float(os.environ.get("QUIZ_OUTBOUND_RATE", "50"))
+OUTBOUND_BURST = int(os.environ.get("QUIZ_OUTBOUND_BURST", "50"))
+SHED_AFTER = float(os.environ.get("QUIZ_SHED_AFTER", "2.0"))
+
+# ── PREFETCH ────────────────────────────────────────────────────
+PREFETCH_LOOKAHEAD = int(os.environ.get("QUIZ_PREFETCH_LOOKAHEAD", "1"))
+
+# ── GENERATED QUIZ CACHE ────────────────────────────────────────
+QUIZ_CACHE_TTL = int(os.environ.get("QUIZ_CACHE_TTL", str(6 * 3600)))
+QUIZ_CACHE_MEMORY_MB = int(os.environ.get("QUIZ_CACHE_MEMORY_MB", "32"))
+QUIZ_CACHE_DISK_MB = int(os.environ.get("QUIZ_CACHE_DISK_MB", "256"))
+
+# ── REQUEST COALESCING ──────────────────────────────────────────
+# payload fields ignored when deciding two /generate-quiz calls are identical
+COALESCE_IGNORE_FIELDS = tuple(
+    f for f in os.environ.get("QUIZ_COALESCE_IGNORE", "user_id").split(",") if f
+)
+COALESCE_MAX_WAITERS = int(os.environ.get("QUIZ_COALESCE_MAX_WAITERS", "64"))
+
+# ── STREAMED GENERATION ─────────────────────────────────────────
+QUIZ_STREAMING = os.environ.get("QUIZ_STREAMING", "0") == "1"
+
+# ── STARTUP WARM-UP ─────────────────────────────────────────────
+# pre-open backend connections at process start
+WARMUP = os.environ.get("QUIZ_WARMUP", "1") == "1"
+WARMUP_CONNECTIONS = int(os.environ.get("QUIZ_WARMUP_CONNECTIONS", "4"))
+# also pre-generate the first round of every category while the login
+# form is shown: real (paid) /generate-quiz calls nobody may play
+WARMUP_ROUNDS = os.environ.get("QUIZ_WARMUP_ROUNDS", "0") == "1"
+
+# ── QUESTION BANK ───────────────────────────────────────────────
+# precompiled category rounds (python -m bench.build_bank); no file = off
+QUESTION_BANK = os.environ.get("QUIZ_QUESTION_BANK", os.path.join(DATA_DIR, "question_bank.qbk"))
+# instant (bank first) | fallback (when generation is over budget or fails) | off
+QUESTION_BANK_MODE = os.environ.get("QUIZ_QUESTION_BANK_MODE", "fallback").lower()
+# seconds a banked round waits for /generate-quiz before falling back
+QUESTION_BANK_BUDGET = float(os.environ.get("QUIZ_QUESTION_BANK_BUDGET", "6"))
+
+# ── CONCEPT LOOKAHEAD ───────────────────────────────────────────
+CONCEPT_LOOKAHEAD = int(os.environ.get("QUIZ_CONCEPT_LOOKAHEAD", "2"))
+
+# ── ADAPTIVE ROUNDS ─────────────────────────────────────────────
+# General Knowledge switches to rounds the local skill model picks,
+# and the model is synced to /sync-skill. Off until the worker has
+# that endpoint: the rounds then stay on General Knowledge.
+ADAPTIVE_ROUNDS = os.environ.get("QUIZ_ADAPTIVE_ROUNDS", "0") == "1"
+# predicted success the local skill model aims each round at
+SKILL_TARGET = float(os.environ.get("QUIZ_SKILL_TARGET", "0.75"))
+
+# ── LOCAL PRE-GRADER ────────────────────────────────────────────
+# on | shadow (grade locally, still ask the backend, log both) | off
+# "on" needs a model fitted on logged backend verdicts (python -m
+# bench.eval_pregrader LOG --fit ...); without one it runs as shadow.
+# Locally graded answers are still sent to /check-answer, write-behind.
+PREGRADER_MODE = os.environ.get("QUIZ_PREGRADER", "shadow").lower()
+PREGRADER_MODEL = os.environ.get("QUIZ_PREGRADER_MODEL", os.path.join(DATA_DIR, "pregrader_model.json"))
+# used without a model (shadow); a model carries its calibrated threshold
+PREGRADER_THRESHOLD = float(os.environ.get("QUIZ_PREGRADER_THRESHOLD", "0.95"))
+# JSONL of backend-graded answers for bench/eval_pregrader.py
+PREGRADER_LOG = os.environ.get("QUIZ_PREGRADER_LOG", "")
+
+# ── SESSION RESUME ──────────────────────────────────────────────
+# progress snapshots keyed by a token in the URL (?session=...)
+SESSION_RESUME = os.environ.get("QUIZ_SESSION_RESUME", "1") == "1"
+# The token resumes a logged-in session without the access code, so a
+# copied URL is a credential. It only resumes in a browser sending the
+# same User-Agent / Accept-Language it was saved from (a weak binding:
+# headers can be copied too) and expires after this many seconds
+# without progress. Keep it short; QUIZ_SESSION_RESUME=0 turns it off.
+SESSION_TTL = int(os.environ.get("QUIZ_SESSION_TTL", str(2 * 3600)))
+SESSION_FLUSH_INTERVAL = float(os.environ.get("QUIZ_SESSION_FLUSH_INTERVAL", "1.0"))
+
+# ── RESILIENCE ──────────────────────────────────────────────────
+# hedge idempotent calls slower than this latency percentile (unset = off)
+HEDGE_PERCENTILE = float(os.environ["QUIZ_HEDGE_PERCENTILE"]) if os.environ.get("QUIZ_HEDGE_PERCENTILE") else None
+BREAKER_FAILURES = int(os.environ.get("QUIZ_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.environ.get("QUIZ_BREAKER_RESET", "30"))
+
+# ── TRACING ─────────────────────────────────────────────────────
+# OTLP JSON spans (script runs, phases, backend calls) appended here
+# (unset = off); QUIZ_TRACE_SAMPLE is the share of actions traced
+TRACE_FILE = os.environ.get("QUIZ_TRACE_FILE", "")
+TRACE_SAMPLE = float(os.environ.get("QUIZ_TRACE_SAMPLE", "1.0"))
+
+# ── TRAFFIC CAPTURE ─────────────────────────────────────────────
+# anonymized backend requests/responses appended here as a cassette
+# for python -m bench.replay (unset = off); QUIZ_CAPTURE_SAMPLE is the
+# share of learners recorded, QUIZ_CAPTURE_SALT keys their pseudonyms
+# (set the same one on every replica)
+CAPTURE_FILE = os.environ.get("QUIZ_CAPTURE_FILE", "")
+CAPTURE_SAMPLE = float(os.environ.get("QUIZ_CAPTURE_SAMPLE", "1.0"))
+CAPTURE_SALT = os.environ.get("QUIZ_CAPTURE_SALT", "")
+
+# ── METRICS EXPORT ──────────────────────────────────────────────
+# Prometheus text on http://<host>:QUIZ_METRICS_PORT/metrics (unset = off)
+METRICS_PORT = int(os.environ["QUIZ_METRICS_PORT"]) if os.environ.get("QUIZ_METRICS_PORT") else None
+# JSON snapshot rewritten every QUIZ_METRICS_INTERVAL seconds (unset = off)
+METRICS_FILE = os.environ.get("QUIZ_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("QUIZ_METRICS_INTERVAL", "15"))
+# record each session's st.session_state deep size after every run (costs a
+# walk of the state per run; for load tests, exported as quiz_session_state_*)
+METRICS_SESSION_STATE = os.environ.get("QUIZ_METRICS_SESSION_STATE", "0") == "1"
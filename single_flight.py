@@ -0,0 +1,119 @@
+import json
+import threading
+
+from scheduler import SharedPriority, current_priority, shared_priority
+
+# ── SINGLE-FLIGHT ───────────────────────────────────────────────
+# Identical concurrent calls share one execution: the first caller
+# (leader) runs fn, everyone else arriving while it is in flight
+# waits and receives the same result (or exception). Past
+# max_waiters a caller runs fn on its own instead of piling on.
+#
+# The leader runs fn under a scheduler.SharedPriority that every
+# joining caller raises to its own class, so the shared backend call
+# is admitted (and protected from shedding) at the most urgent
+# waiter's priority. Errors in `retry_on` (a shed leader) are not
+# shared: each waiter then runs fn itself, at its own class.
+
+
+def payload_key(payload, ignore=("user_id",)):
+    # requests that differ only in the ignored fields are "identical"
+    normalized = {}
+    for k, v in payload.items():
+        if k in ignore:
+            continue
+        if isinstance(v, str):
+            v = " ".join(v.lower().split())
+        normalized[k] = v
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "priority")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.priority = SharedPriority(current_priority())
+
+
+class SingleFlight:
+    def __init__(self, normalize=None, max_waiters=64, retry_on=()):
+        self.normalize = normalize or (lambda key: key)
+        self.max_waiters = max_waiters
+        self.retry_on = tuple(retry_on)
+
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        # counters
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.overflow = 0
+        self.retried = 0
+
+    def do(self, key, fn):
+        key = self.normalize(key)
+
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            elif call.waiters < self.max_waiters:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                self.overflow += 1
+                call = None
+
+        if call is None:
+            with self._lock:
+                self.executed += 1
+            return fn()
+
+        if not leader:
+            call.priority.raise_to(current_priority())
+            call.done.wait()
+            if call.error is not None and isinstance(call.error, self.retry_on):
+                with self._lock:
+                    self.executed += 1
+                    self.retried += 1
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self._lock:
+                self.executed += 1
+            with shared_priority(call.priority):
+                call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "overflow": self.overflow,
+            "retried": self.retried,
+            "in_flight": self.in_flight(),
+        }
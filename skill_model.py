@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ── LOCAL SKILL MODEL ───────────────────────────────────────────
+# Per-user, per-topic ability on a logistic (1PL IRT / Elo) scale, held
+# in-process as one user x topic matrix. Every answer moves the
+# rating toward the result: theta += k * (correct - p), where
+# p = sigmoid(theta - b) for the question's difficulty b and the step
+# k shrinks as the topic collects answers (a new player settles fast,
+# an established rating moves slowly).
+#
+# Picking the next round is one vectorized pass over all topics: the
+# least practised and weakest topic wins (not the one just played),
+# at the difficulty whose predicted success is closest to `target`.
+# This is the old "75% of the round correct" rule, applied per answer.
+# No backend call is needed, so the app can plan the next round while
+# the current one is still being played.
+
+LEVELS = ("easy", "medium", "hard")
+LEVEL_B = np.array([-1.0, 0.0, 1.0])
+
+
+def topic_key(topic):
+    return " ".join(str(topic).lower().split())
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class SkillModel:
+    def __init__(self, topics, target=0.75, k_max=0.8, k_min=0.1, explore=0.5, max_users=10000):
+        self.topics = tuple(topic_key(t) for t in topics)
+        self.target = target
+        self.k_max = k_max
+        self.k_min = k_min
+        self.explore = explore
+        self.max_users = max_users
+
+        self._columns = {t: i for i, t in enumerate(self.topics)}
+        self._lock = threading.Lock()
+        self._rows = OrderedDict()      # user_id -> row, least recently used first
+        self._theta = np.zeros((64, len(self.topics)))
+        self._answers = np.zeros((64, len(self.topics)), dtype=np.int32)
+        self._last_pick = {}            # user_id -> column of the last pick
+
+        # counters
+        self.updates = 0
+        self.ignored = 0
+        self.picks = 0
+        self.evicted = 0
+        self.pick_seconds = 0.0
+
+    # ── updates ──
+    def observe(self, user_id, topic, difficulty, correct):
+        return self.observe_many(user_id, [topic], [difficulty], [correct])
+
+    def observe_many(self, user_id, topics, difficulties, correct):
+        # -> answers applied; topics outside the catalog are ignored
+        pairs = [
+            (self._columns.get(topic_key(t)), LEVELS.index(d) if d in LEVELS else 1)
+            for t, d in zip(topics, difficulties)
+        ]
+        keep = [i for i, (col, _) in enumerate(pairs) if col is not None]
+        with self._lock:
+            self.ignored += len(pairs) - len(keep)
+            if not keep:
+                return 0
+            cols = np.array([pairs[i][0] for i in keep])
+            b = LEVEL_B[[pairs[i][1] for i in keep]]
+            y = np.array([float(bool(correct[i])) for i in keep])
+
+            row = self._row(user_id)
+            theta = self._theta[row]
+            answers = self._answers[row]
+            p = _sigmoid(theta[cols] - b)
+            k = np.maximum(self.k_min, self.k_max / np.sqrt(1.0 + answers[cols]))
+            np.add.at(theta, cols, k * (y - p))
+            np.add.at(answers, cols, 1)
+            self.updates += len(keep)
+        return len(keep)
+
+    # ── decisions ──
+    def predict(self, user_id):
+        # -> topics x LEVELS matrix of predicted success
+        with self._lock:
+            row = self._rows.get(user_id)
+            theta = self._theta[row] if row is not None else np.zeros(len(self.topics))
+        return _sigmoid(theta[:, None] - LEVEL_B[None, :])
+
+    def pick(self, user_id):
+        # -> {"topic", "start_difficulty", "expected"} for the next round
+        start = time.perf_counter()
+        with self._lock:
+            row = self._row(user_id)
+            theta = self._theta[row].copy()
+            answers = self._answers[row].copy()
+            last = self._last_pick.get(user_id)
+
+        # weak topics and little-seen topics score high
+        score = (1.0 - _sigmoid(theta)) + self.explore / np.sqrt(1.0 + answers)
+        if last is not None and len(self.topics) > 1:
+            score[last] = -np.inf
+        best = np.flatnonzero(score == score.max())
+        col = int(best[np.random.randint(len(best))])
+
+        p = _sigmoid(theta[col] - LEVEL_B)
+        level = int(np.argmin(np.abs(p - self.target)))
+
+        with self._lock:
+            self._last_pick[user_id] = col
+            self.picks += 1
+            self.pick_seconds += time.perf_counter() - start
+        return {
+            "topic": self.topics[col],
+            "start_difficulty": LEVELS[level],
+            "expected": round(float(p[level]), 3),
+        }
+
+    # ── state ──
+    def export(self, user_id):
+        # {topic: [rating, answers]} for topics with answers; JSON-safe
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return {}
+            theta, answers = self._theta[row], self._answers[row]
+            return {
+                t: [round(float(theta[i]), 4), int(answers[i])]
+                for i, t in enumerate(self.topics)
+                if answers[i]
+            }
+
+    def load(self, user_id, state):
+        # restore an export(); unknown topics are skipped
+        if not state:
+            return
+        with self._lock:
+            row = self._row(user_id)
+            for topic, (rating, answers) in state.items():
+                col = self._columns.get(topic_key(topic))
+                if col is not None:
+                    self._theta[row, col] = float(rating)
+                    self._answers[row, col] = int(answers)
+
+    def _row(self, user_id):
+        # caller holds the lock
+        row = self._rows.get(user_id)
+        if row is not None:
+            self._rows.move_to_end(user_id)
+            return row
+
+        if len(self._rows) >= self.max_users:
+            old_user, row = self._rows.popitem(last=False)
+            self._last_pick.pop(old_user, None)
+            self.evicted += 1
+        else:
+            row = len(self._rows)
+            if row >= len(self._theta):
+                self._theta = np.vstack([self._theta, np.zeros_like(self._theta)])
+                self._answers = np.vstack([self._answers, np.zeros_like(self._answers)])
+
+        self._theta[row] = 0.0
+        self._answers[row] = 0
+        self._rows[user_id] = row
+        return row
+
+    # ── metrics ──
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._rows),
+                "topics": len(self.topics),
+                "updates": self.updates,
+                "ignored": self.ignored,
+                "picks": self.picks,
+                "evicted": self.evicted,
+                "pick_seconds": self.pick_seconds,
+            }
@@ -1,6 +1,83 @@
-import threading
+import functools
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
 import streamlit as st
 import requests
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import metrics
+import tracing
+from answer_queue import AnswerQueue
+from backend_client import BackendClient
+from backend_engine import BackendEngine
+from cassette import CassetteRecorder
+from concept_queue import ConceptQueues
+from explain_cache import ExplanationCache, explain_key
+from prefetch import PrefetchEngine, round_key
+from pregrader import PreGrader, load_model
+from kv_store import SQLiteStore, open_store
+from quiz_cache import QuizCache, SharedQuizCache, cache_key
+from settings import (
+    ADAPTIVE_ROUNDS,
+    BACKEND_CONCURRENCY,
+    BACKEND_PER_USER,
+    BREAKER_FAILURES,
+    BREAKER_RESET,
+    CAPTURE_FILE,
+    CAPTURE_SALT,
+    CAPTURE_SAMPLE,
+    COALESCE_IGNORE_FIELDS,
+    COALESCE_MAX_WAITERS,
+    CONCEPT_LOOKAHEAD,
+    HEDGE_PERCENTILE,
+    METRICS_FILE,
+    METRICS_INTERVAL,
+    METRICS_PORT,
+    METRICS_SESSION_STATE,
+    OUTBOUND_BURST,
+    OUTBOUND_CONCURRENCY,
+    OUTBOUND_RATE,
+    PREFETCH_LOOKAHEAD,
+    PREGRADER_LOG,
+    PREGRADER_MODE,
+    PREGRADER_MODEL,
+    PREGRADER_THRESHOLD,
+    QUIZ_CACHE_DISK_MB,
+    QUIZ_CACHE_MEMORY_MB,
+    QUIZ_CACHE_TTL,
+    QUIZ_STREAMING,
+    QUESTION_BANK,
+    QUESTION_BANK_BUDGET,
+    QUESTION_BANK_MODE,
+    SESSION_FLUSH_INTERVAL,
+    SESSION_RESUME,
+    SESSION_TTL,
+    SHED_AFTER,
+    TRACE_FILE,
+    TRACE_SAMPLE,
+    SKILL_TARGET,
+    STATE_STORE,
+    WARMUP,
+    WARMUP_CONNECTIONS,
+    WARMUP_ROUNDS,
+    data_path,
+)
+from question import parse_questions
+from question_bank import QuestionBank
+from quiz_stream import StreamingRound
+from resilience import Deadline, LoadShed
+from scheduler import PREFETCH, SPECULATIVE, RequestScheduler
+from session_store import SessionStore
+from skill_model import SkillModel
+from single_flight import SingleFlight, payload_key
+from warmup import Warmup
+
+RUN_STARTED = time.perf_counter()
+RUN_STARTED_NS = time.time_ns()
 
 # MUST be first Streamlit call
 st.set_page_config(
@@ -25,7 +102,526 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-BACKEND = "https://quiz.peterrazeghi.workers.dev"
+BACKEND = os.environ.get("QUIZ_BACKEND", "https://quiz.peterrazeghi.workers.dev")
+
+# ── CATEGORY TOPICS ─────────────────────────────────────────────
+category_topic_map = {
+    "general": "general knowledge",
+    "sports": "sports",
+    "science": "science",
+    "history": "history",
+    "geography": "geography",
+}
+
+# General Knowledge goes on with rounds the local skill model picks
+# (QUIZ_ADAPTIVE_ROUNDS; otherwise no mode is adaptive)
+ADAPTIVE_MODE = "general" if ADAPTIVE_ROUNDS else None
+
+
+def round_size(mode, adaptive=False):
+    if adaptive:
+        return 3
+    return 4 if mode == "quiz" else 6
+
+
+# ── SHARED BACKEND CLIENT (ONE PER PROCESS) ────────────────────
+@st.cache_resource
+def get_backend():
+    return BackendClient(
+        BACKEND,
+        hedge_percentile=HEDGE_PERCENTILE,
+        breaker_failures=BREAKER_FAILURES,
+        breaker_reset=BREAKER_RESET,
+        scheduler=RequestScheduler(
+            max_in_flight=OUTBOUND_CONCURRENCY,
+            rate=OUTBOUND_RATE,
+            burst=OUTBOUND_BURST,
+            shed_after=SHED_AFTER,
+        ),
+        recorder=get_recorder(),
+    )
+
+
+def get_recorder():
+    # catalog topics are not personal: kept as is
+    if not CAPTURE_FILE:
+        return None
+    return CassetteRecorder(
+        CAPTURE_FILE,
+        salt=CAPTURE_SALT,
+        sample=CAPTURE_SAMPLE,
+        public=category_topic_map.values(),
+    )
+
+
+@st.cache_resource
+def get_backend_engine():
+    # every background backend job runs here, capped and fair per user
+    return BackendEngine(max_concurrency=BACKEND_CONCURRENCY, per_user=BACKEND_PER_USER)
+
+
+@st.cache_resource
+def get_answer_queue():
+    return AnswerQueue(get_backend(), data_path("answer_spool.sqlite3"))
+
+
+@st.cache_resource
+def get_prefetcher():
+    return PrefetchEngine(
+        lookahead=PREFETCH_LOOKAHEAD,
+        executor_for=lambda owner: engine.executor(owner, PREFETCH),
+    )
+
+
+@st.cache_resource
+def get_state_store():
+    # shared by all replicas; None = per-replica local state
+    return open_store(STATE_STORE) if STATE_STORE else None
+
+
+@st.cache_resource
+def get_quiz_cache():
+    if state_store:
+        return SharedQuizCache(
+            state_store,
+            ttl=QUIZ_CACHE_TTL,
+            max_memory_bytes=QUIZ_CACHE_MEMORY_MB * 1024 * 1024,
+        )
+    return QuizCache(
+        data_path("quiz_cache.sqlite3"),
+        ttl=QUIZ_CACHE_TTL,
+        max_memory_bytes=QUIZ_CACHE_MEMORY_MB * 1024 * 1024,
+        max_disk_bytes=QUIZ_CACHE_DISK_MB * 1024 * 1024,
+    )
+
+
+@st.cache_resource
+def get_generate_flight():
+    return SingleFlight(
+        normalize=lambda payload: payload_key(payload, ignore=COALESCE_IGNORE_FIELDS),
+        max_waiters=COALESCE_MAX_WAITERS,
+        retry_on=(LoadShed,),
+    )
+
+
+@st.cache_resource
+def get_explanations():
+    return ExplanationCache(
+        store=state_store,
+        executor_for=lambda owner: engine.executor(owner, SPECULATIVE),
+    )
+
+
+@st.cache_resource
+def get_concept_queues():
+    return ConceptQueues(
+        depth=CONCEPT_LOOKAHEAD,
+        executor_for=lambda user_id: engine.executor(user_id, PREFETCH),
+    )
+
+
+@st.cache_resource
+def get_pregrader():
+    model = load_model(PREGRADER_MODEL)
+    if model is None:
+        return PreGrader(threshold=PREGRADER_THRESHOLD)
+    return PreGrader(threshold=model["threshold"], weights=model["weights"], bias=model["bias"])
+
+
+@st.cache_resource
+def get_grade_reports():
+    # locally graded answers still reach /check-answer (mastery lives
+    # there); once one lands the learner's queued concepts are stale
+    queues = get_concept_queues()
+    return AnswerQueue(
+        get_backend(),
+        data_path("grade_spool.sqlite3"),
+        path="/check-answer",
+        on_delivered=lambda payload: queues.invalidate(payload.get("user_id")),
+    )
+
+
+@st.cache_resource
+def get_session_store():
+    return SessionStore(
+        state_store or SQLiteStore(data_path("sessions.sqlite3")),
+        ttl=SESSION_TTL,
+        flush_interval=SESSION_FLUSH_INTERVAL,
+    )
+
+
+@st.cache_resource
+def get_skill_model():
+    return SkillModel(category_topic_map.values(), target=SKILL_TARGET)
+
+
+@st.cache_resource
+def get_skill_sync():
+    # skill state goes to the backend write-behind, like answers
+    return AnswerQueue(get_backend(), data_path("skill_spool.sqlite3"), path="/sync-skill")
+
+
+@st.cache_resource
+def get_question_bank():
+    if QUESTION_BANK_MODE == "off":
+        return None
+    return QuestionBank.open(QUESTION_BANK)
+
+
+backend = get_backend()
+engine = get_backend_engine()
+state_store = get_state_store()
+answers = get_answer_queue()
+prefetcher = get_prefetcher()
+quiz_cache = get_quiz_cache()
+generate_flight = get_generate_flight()
+explanations = get_explanations()
+concept_queues = get_concept_queues()
+pregrader = get_pregrader()
+grade_reports = get_grade_reports()
+# local verdicts are only shown with a fitted, calibrated model
+PREGRADE_LOCALLY = PREGRADER_MODE == "on" and pregrader.fitted
+session_store = get_session_store() if SESSION_RESUME else None
+question_bank = get_question_bank()
+skills = get_skill_model()
+skill_sync = get_skill_sync() if ADAPTIVE_ROUNDS else None
+
+
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else st.session_state.get("user_id")
+
+
+# ── METRICS (PROCESS-WIDE EXPORT + PER-RUN TIMING) ─────────────
+@st.cache_resource
+def get_session_sizes():
+    return metrics.SessionSizes()
+
+
+session_sizes = get_session_sizes()
+
+
+@st.cache_resource
+def get_metrics_exporters():
+    metrics.REGISTRY.collector("quiz_client", backend.health)
+    metrics.REGISTRY.collector("quiz_backend_engine", engine.stats)
+    metrics.REGISTRY.collector("quiz_outbound", backend.scheduler.stats)
+    metrics.REGISTRY.collector("quiz_answer_queue", answers.metrics)
+    metrics.REGISTRY.collector("quiz_prefetch", prefetcher.stats)
+    metrics.REGISTRY.collector("quiz_cache", quiz_cache.stats)
+    metrics.REGISTRY.collector("quiz_generate_coalescing", generate_flight.stats)
+    metrics.REGISTRY.collector("quiz_explanations", explanations.stats)
+    metrics.REGISTRY.collector("quiz_concept_queue", concept_queues.stats)
+    metrics.REGISTRY.collector("quiz_pregrader", pregrader.stats)
+    metrics.REGISTRY.collector("quiz_grade_reports", grade_reports.metrics)
+    metrics.REGISTRY.collector("quiz_skill_model", skills.stats)
+    if state_store:
+        metrics.REGISTRY.collector("quiz_state_store", state_store.stats)
+    if session_store:
+        metrics.REGISTRY.collector("quiz_session_store", session_store.stats)
+    if question_bank:
+        metrics.REGISTRY.collector("quiz_question_bank", question_bank.stats)
+    if skill_sync:
+        metrics.REGISTRY.collector("quiz_skill_sync", skill_sync.metrics)
+    metrics.REGISTRY.collector("quiz_process", metrics.process_stats)
+    metrics.REGISTRY.collector("quiz_threads", metrics.thread_counts)
+    if METRICS_SESSION_STATE:
+        metrics.REGISTRY.collector("quiz_session_state", session_sizes.stats)
+
+    if backend.recorder:
+        metrics.REGISTRY.collector("quiz_capture", backend.recorder.stats)
+
+    if TRACE_FILE:
+        traces = tracing.configure(TRACE_FILE, sample=TRACE_SAMPLE)
+        metrics.REGISTRY.collector("quiz_tracing", traces.stats)
+
+    server = metrics.serve_prometheus(METRICS_PORT) if METRICS_PORT else None
+    flusher = metrics.JsonFlusher(METRICS_FILE, METRICS_INTERVAL) if METRICS_FILE else None
+    return server, flusher
+
+
+get_metrics_exporters()
+
+
+def start_run_trace(name, start_ns=None):
+    # one trace per action: its callback left the traceparent to continue
+    return tracing.TRACER.start_run(
+        name,
+        parent=st.session_state.pop("trace_parent", None),
+        start_ns=start_ns,
+        **{"quiz.session": session_id(), "quiz.phase": st.session_state.get("phase", "idle")},
+    )
+
+
+RUN_TRACE = start_run_trace("run", RUN_STARTED_NS)
+
+
+# ── BACKEND CALLS ───────────────────────────────────────────────
+# Above the login form: warm-up generates rounds before anyone logs in.
+def post(path, payload, retries=2, deadline=None, raise_shed=False):
+    # retries, backoff, deadline and circuit breaking live in backend.call()
+    try:
+        r = backend.call(path, payload, retries=retries, deadline=deadline)
+        if r.status_code != 200:
+            return None, r.text
+        return r.json(), None
+    except LoadShed as e:
+        if raise_shed:
+            raise
+        return None, str(e)
+    except requests.exceptions.Timeout:
+        return None, "Backend timeout after retries"
+    except Exception as e:
+        # includes a 200 whose body is not JSON
+        return None, str(e)
+
+
+def quiz_cache_key(payload):
+    # adaptive rounds (no start_difficulty) are never cached
+    if not payload.get("start_difficulty"):
+        return None
+    return cache_key(
+        payload["topic"],
+        payload["start_difficulty"],
+        payload.get("mode"),
+        payload["num_questions"],
+    )
+
+
+def generate_questions(payload):
+    # shared quiz cache first, then the backend; also runs on prefetch
+    # workers, so no st.* calls in here. Warm-up payloads carry no
+    # user_id: they only fill the cache.
+    key = quiz_cache_key(payload)
+    user_id = payload.get("user_id")
+    if key and user_id is not None:
+        questions = quiz_cache.get(key, user_id)
+        if questions:
+            return questions, None
+
+    # identical in-flight generations (any user) share one backend call,
+    # at the most urgent waiter's priority; a shed leader is retried by
+    # each waiter at its own
+    try:
+        quiz_data, err = generate_flight.do(
+            payload, lambda: post("/generate-quiz", payload, raise_shed=True)
+        )
+    except LoadShed as e:
+        return None, str(e)
+    if err:
+        return None, err
+    if not quiz_data or "questions" not in quiz_data:
+        return None, None
+
+    if key:
+        quiz_cache.put(key, quiz_data["questions"], user_id=user_id)
+    return quiz_data["questions"], None
+
+
+@st.cache_resource
+def get_warmup():
+    # built with the first session, i.e. at process start
+    warmup = Warmup(
+        backend,
+        engine.executor("warmup", SPECULATIVE),
+        generate=generate_questions,
+        cached=lambda payload: quiz_cache.has(quiz_cache_key(payload)),
+        connections=WARMUP_CONNECTIONS,
+    )
+    warmup.connect()
+    metrics.REGISTRY.collector("quiz_warmup", warmup.stats)
+    return warmup
+
+
+if WARMUP:
+    get_warmup()
+
+
+# ── FLOW STATE MACHINE ──────────────────────────────────────────
+# st.session_state.phase is what the main card shows. Buttons move it
+# in on_click callbacks, which run before the script, so a click is
+# rendered by the run it triggers instead of mutating state and
+# calling st.rerun(). Slow steps (loading a round or a concept,
+# grading) are phases of their own: the card does the work under a
+# spinner, moves on and renders the next phase in the same pass.
+
+# phase -> phases it can move to; any phase can drop back to "idle"
+PHASES = {
+    "idle": ("loading", "concept_loading"),
+    "loading": ("question", "round_done"),
+    "question": ("answered", "round_done"),
+    "answered": ("question", "round_done"),
+    "round_done": ("loading",),
+    "concept_loading": ("concept_answer",),
+    "concept_answer": ("grading",),
+    "grading": ("concept_feedback", "concept_answer"),
+    "concept_feedback": ("grading",),
+}
+QUIZ_PHASES = ("loading", "question", "answered", "round_done")
+CONCEPT_PHASES = ("concept_loading", "concept_answer", "grading", "concept_feedback")
+
+
+def go(phase):
+    current = st.session_state.get("phase", "idle")
+    if phase != "idle" and phase not in PHASES[current]:
+        raise ValueError(f"no transition {current} -> {phase}")
+    st.session_state.phase = phase
+
+
+def action(fn):
+    # on_click callback; opens the trace its run continues
+    @functools.wraps(fn)
+    def run(*args):
+        tracing.TRACER.activate(None)
+        with tracing.TRACER.span(
+            f"action {fn.__name__}", root=True, **{"quiz.session": session_id()}
+        ) as span:
+            fn(*args)
+        st.session_state.trace_parent = span.traceparent
+
+    return run
+
+
+# ── SESSION RESUME ──────────────────────────────────────────────
+# A reloaded tab (or a restarted process) is a new Streamlit session.
+# The ?session= token in its URL brings the old one back from the
+# local store: no /login, no quiz generation. Saved after every run.
+# The token skips the access code, so it is bound to the browser that
+# saved it and expires quickly (settings.SESSION_TTL).
+
+RESUME_KEYS = (
+    "user_id", "total_answered", "total_correct",
+    "user_mode", "user_difficulty", "selected_mode", "custom_topic_input",
+    "phase", "index", "round_correct", "meta",
+    "last_correct", "last_explanation", "last_verdict",
+    "concept_id", "concept_name", "core_idea", "ideal_explanation",
+    "concept_difficulty", "free_text_answer",
+)
+# a step still in flight resumes at the phase before it
+RESUME_PHASES = {"loading": "idle", "concept_loading": "idle", "grading": "concept_answer"}
+
+
+def session_snapshot():
+    state = {k: st.session_state[k] for k in RESUME_KEYS if k in st.session_state}
+    if "phase" in state:
+        state["phase"] = RESUME_PHASES.get(state["phase"], state["phase"])
+    # a round still streaming in resumes with the questions received
+    state["quiz"] = [q.as_dict() for q in st.session_state.get("quiz", ())]
+    if "user_id" in state:
+        state["skill"] = skills.export(state["user_id"])
+    state["browser"] = browser_tag()
+    return state
+
+
+def browser_tag():
+    # what a resume token is bound to: the URL copied into another
+    # browser (or device) does not resume the session
+    headers = st.context.headers
+    seen = "|".join(headers.get(h) or "" for h in ("User-Agent", "Accept-Language"))
+    return hashlib.sha256(seen.encode()).hexdigest()[:16]
+
+
+def save_session():
+    token = st.session_state.get("resume_token")
+    if session_store and token:
+        session_store.save(token, session_snapshot())
+
+
+def start_resume():
+    # once logged in: mint the token and put it in the URL
+    if session_store:
+        token = session_store.new_token()
+        st.session_state.resume_token = token
+        st.query_params["session"] = token
+
+
+def resume_session():
+    token = st.query_params.get("session")
+    if not session_store or not token:
+        return False
+
+    state = session_store.load(token)
+    if not state or state.pop("browser", None) != browser_tag():
+        # unknown, expired or saved by another browser: log in instead
+        del st.query_params["session"]
+        return False
+
+    quiz = parse_questions(state.pop("quiz", ()))
+    skills.load(state.get("user_id"), state.pop("skill", None))
+    for key, value in state.items():
+        st.session_state[key] = value
+    st.session_state.quiz = quiz
+    st.session_state.resume_token = token
+    return True
+
+
+def round_owner():
+    # prefetched rounds follow the resume token, so a reloaded tab
+    # still finds the round generated for it
+    return st.session_state.get("resume_token") or session_id()
+
+
+def current_mode():
+    if "user_id" not in st.session_state:
+        return "login"
+    if (
+        st.session_state.get("phase") in CONCEPT_PHASES
+        or st.session_state.get("selected_mode") == "concept"
+    ):
+        return "concept"
+    return st.session_state.get("user_mode", "quiz")
+
+
+metrics.set_mode(current_mode())
+
+
+def finish_run(outcome):
+    # time per run; runs per interaction are measured client side
+    # (bench.flows), where a click and the runs it causes can be told apart
+    metrics.observe_rerun(time.perf_counter() - RUN_STARTED, current_mode(), outcome)
+
+    save_session()
+
+    if METRICS_SESSION_STATE:
+        session_sizes.record(session_id(), st.session_state.to_dict())
+
+    RUN_TRACE.end(**{
+        "quiz.outcome": outcome,
+        "quiz.mode": current_mode(),
+        "enduser.id": st.session_state.get("user_id"),
+    })
+
+
+# st.stop() ends the script early: time the run first
+def stop():
+    finish_run("stop")
+    st.stop()
+
+
+# ── CARD FRAGMENTS ──────────────────────────────────────────────
+# The quiz card (with the round panel) and the concept card are
+# st.fragment: a click inside one re-executes and re-sends only that
+# card. A fragment rerun does not execute this module, so it is timed
+# here instead.
+def in_fragment_run():
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+
+def card_fragment(fn):
+    @st.fragment
+    @functools.wraps(fn)
+    def run():
+        global RUN_STARTED, RUN_TRACE
+        partial = in_fragment_run()
+        if partial:
+            RUN_STARTED = time.perf_counter()
+            RUN_TRACE = start_run_trace(f"fragment {fn.__name__}")
+        fn()
+        if partial:
+            finish_run("fragment")
+
+    return run
 
 # ── BASIC STYLING (POLISHED) ─────────────────────────────────────
 st.markdown("""
@@ -158,49 +754,97 @@ def end_main_card():
     st.markdown("</div>", unsafe_allow_html=True)
 
 # ── LOGIN ───────────────────────────────────────────────────────
+@action
+def log_in():
+    name = st.session_state.login_name.strip()
+    code = st.session_state.login_code.strip()
+
+    if not name or not code:
+        st.session_state.login_error = ("warning", "Please enter both name and access code")
+        return
+
+    try:
+        r = backend.call("/login", {"name": name, "code": code})
+        r.raise_for_status()
+        data = r.json()
+        st.session_state.user_id = data["user_id"]
+    except Exception as e:
+        st.session_state.login_error = ("error", f"Login failed: {str(e)}")
+        return
+
+    # a backend that keeps the synced skill state may hand it back
+    skills.load(st.session_state.user_id, data.get("skills"))
+    st.session_state.logged_in_at = time.time()
+    start_resume()
+
+
+def speculate_first_rounds():
+    # the first round of every category at the default settings, so
+    # the first click after login finds it generated (or generating);
+    # sent without a user_id, so the worker keeps no record for it
+    payloads = {}
+    for topic in category_topic_map.values():
+        payload = {
+            "topic": topic,
+            "start_difficulty": "medium",
+            "num_questions": round_size("quiz"),
+            "mode": "quiz",
+        }
+        payloads[quiz_cache_key(payload)] = payload
+    get_warmup().speculate(payloads)
+
+
+RUN_TRACE.phase("login_gate")
+
+if "user_id" not in st.session_state:
+    resume_session()
+
 if "user_id" not in st.session_state:
+    if WARMUP and WARMUP_ROUNDS:
+        speculate_first_rounds()
+
     st.subheader("Login")
 
-    name = st.text_input("Your name").strip()
-    code = st.text_input("Access code", type="password").strip()
+    st.text_input("Your name", key="login_name")
+    st.text_input("Access code", type="password", key="login_code")
 
-    if st.button("Enter"):
-        if not name or not code:
-            st.warning("Please enter both name and access code")
-            st.stop()
+    st.button("Enter", on_click=log_in)
 
-        try:
-            r = requests.post(
-                f"{BACKEND}/login",
-                json={"name": name, "code": code},
-                timeout=10
-            )
-            r.raise_for_status()
-            st.session_state.user_id = r.json()["user_id"]
-            st.rerun()
-        except Exception as e:
-            st.error(f"Login failed: {str(e)}")
-            st.stop()
+    login_error = st.session_state.pop("login_error", None)
+    if login_error:
+        kind, message = login_error
+        getattr(st, kind)(message)
 
-    st.stop()
+    stop()
 
 # ── GLOBAL PROGRESS ─────────────────────────────────────────────
+RUN_TRACE.phase("controls")
+
 if "total_answered" not in st.session_state:
     st.session_state.total_answered = 0
 if "total_correct" not in st.session_state:
     st.session_state.total_correct = 0
 
-accuracy = (
-    st.session_state.total_correct / st.session_state.total_answered
-    if st.session_state.total_answered > 0
-    else 0
-)
+# placeholder, so the quiz card can refresh it from a fragment rerun
+progress_slot = st.empty()
+
+
+def render_progress():
+    accuracy = (
+        st.session_state.total_correct / st.session_state.total_answered
+        if st.session_state.total_answered > 0
+        else 0
+    )
+
+    with progress_slot.container():
+        st.markdown(
+            f"### Accuracy: **{round(accuracy * 100)}%** "
+            f"({st.session_state.total_correct} / {st.session_state.total_answered})"
+        )
+        st.progress(accuracy)
 
-st.markdown(
-    f"### Accuracy: **{round(accuracy * 100)}%** "
-    f"({st.session_state.total_correct} / {st.session_state.total_answered})"
-)
-st.progress(accuracy)
+
+render_progress()
 
 # ── MAIN CARD: DEFAULT PLACEHOLDER + PRIMARY CONTROLS ──────────
 # Single, clean entry point. No redundancy.
@@ -263,8 +907,28 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+
+def request_round(topic, adaptive=False, back="idle"):
+    # the quiz card starts it under a spinner; `back` is the phase to
+    # return to if it fails
+    mode = st.session_state.user_mode
+    st.session_state.pending_round = {
+        "topic": topic,
+        "difficulty": st.session_state.user_difficulty,
+        "num_questions": round_size(mode, adaptive),
+        "mode": mode,
+        "adaptive": adaptive,
+        "back": back,
+    }
+    go("loading")
+
+
 # ── Mode selection handler (FULL RESET – FIXES BUG) ────────────
+@action
 def select_mode(mode):
+    # drop prefetched rounds for the previous mode
+    prefetcher.cancel(round_owner())
+
     # navigation
     st.session_state.selected_mode = mode
     st.session_state.quiz = []
@@ -272,56 +936,54 @@ def select_mode(mode):
     st.session_state.round_correct = 0
 
     # feedback (quiz + concept)
-    st.session_state.show_feedback = False
     st.session_state.last_correct = False
     st.session_state.last_explanation = ""
     st.session_state.last_verdict = ""
 
-    # concept / free-text mode
-    st.session_state.free_text_mode = False
-    st.session_state.is_grading = False
-
     # explain-more reset (CRITICAL)
     st.session_state.show_simple_explanation = False
     st.session_state.simple_explanation = ""
     st.session_state.is_simplifying = False
 
+    # detach any round still streaming in (it finishes into the cache)
+    st.session_state.quiz_stream = None
+    st.session_state.next_meta = {}
+
     # remove lingering input
     if "free_text_answer" in st.session_state:
         del st.session_state["free_text_answer"]
 
+    go("idle")
+
+    # categories start right away (NO EXTRA CLICKS)
+    if mode in category_topic_map:
+        request_round(category_topic_map[mode])
+
 
 # ── BUTTON GRID ───────────────────────────────────────────────
 row1 = st.columns(5)
 row2 = st.columns(2)
 
 with row1[0]:
-    if st.button("General Knowledge", use_container_width=True):
-        select_mode("general")
+    st.button("General Knowledge", use_container_width=True, on_click=select_mode, args=("general",))
 
 with row1[1]:
-    if st.button("Sports", use_container_width=True):
-        select_mode("sports")
+    st.button("Sports", use_container_width=True, on_click=select_mode, args=("sports",))
 
 with row1[2]:
-    if st.button("Science", use_container_width=True):
-        select_mode("science")
+    st.button("Science", use_container_width=True, on_click=select_mode, args=("science",))
 
 with row1[3]:
-    if st.button("History", use_container_width=True):
-        select_mode("history")
+    st.button("History", use_container_width=True, on_click=select_mode, args=("history",))
 
 with row1[4]:
-    if st.button("Geography", use_container_width=True):
-        select_mode("geography")
+    st.button("Geography", use_container_width=True, on_click=select_mode, args=("geography",))
 
 with row2[0]:
-    if st.button("Pick a Topic", use_container_width=True):
-        select_mode("custom")
+    st.button("Pick a Topic", use_container_width=True, on_click=select_mode, args=("custom",))
 
 with row2[1]:
-    if st.button("Concepts", use_container_width=True):
-        select_mode("concept")
+    st.button("Concepts", use_container_width=True, on_click=select_mode, args=("concept",))
 
 # ── STATE INITIALIZATION ────────────────────────────────────────
 defaults = {
@@ -329,14 +991,16 @@ defaults = {
     "index": 0,
     "meta": {},
     "error": None,
-    "show_feedback": False,
+    "phase": "idle",
+    "pending_round": None,
     "last_correct": False,
     "last_explanation": "",
     "last_verdict": "",
-    "next_quiz": [],
     "next_meta": {},
     "round_correct": 0,
     "selected_mode": None,
+    "quiz_stream": None,
+    "stream_seen": 0,
 
     # ── Explain more simply feature ──
     "show_simple_explanation": False,
@@ -349,115 +1013,220 @@ for key, value in defaults.items():
         st.session_state[key] = value
 
 # ── HELPERS ─────────────────────────────────────────────────────
-def post(url, payload, retries=2, timeout=90):
-    for attempt in range(retries + 1):
-        try:
-            r = requests.post(url, json=payload, timeout=timeout)
-            if r.status_code == 200:
-                return r.json(), None
-            else:
-                return None, r.text
-        except requests.exceptions.ReadTimeout:
-            if attempt == retries:
-                return None, "Backend timeout after retries"
-        except Exception as e:
-            if attempt == retries:
-                return None, str(e)
-    return None, "Request failed after retries"
-
-
-def prefetch_next(topic, num_questions, difficulty):
-    quiz_data, err = post(
-        f"{BACKEND}/generate-quiz",
-        {
-            "topic": topic,
-            "start_difficulty": difficulty,
-            "num_questions": num_questions,
-            "user_id": st.session_state.user_id
-        }
-    )
-    if err or not quiz_data or "questions" not in quiz_data:
+def fetch_questions(payload):
+    questions, _ = generate_questions(payload)
+    return questions
+
+
+def generate_within(payload, deadline=None):
+    # generate_questions(), but stop waiting when `deadline` expires;
+    # the generation itself runs on and still lands in the quiz cache
+    if deadline is None:
+        return generate_questions(payload)
+    future = engine.submit(payload["user_id"], generate_questions, payload)
+    try:
+        return future.result(timeout=deadline.remaining())
+    except FutureTimeout:
+        return None, None
+
+
+def open_quiz_stream(payload, deadline=None):
+    # -> (questions, stream): a cache hit needs no stream; otherwise wait
+    # only for the first streamed question, the rest keep arriving
+    key = quiz_cache_key(payload)
+    user_id = payload["user_id"]
+    if key:
+        questions = quiz_cache.get(key, user_id)
+        if questions:
+            return questions, None
+
+    def on_done(questions):
+        if key:
+            quiz_cache.put(key, questions, user_id=user_id)
+
+    stream = StreamingRound(
+        lambda: backend.stream("/generate-quiz", dict(payload, stream=True)),
+        on_done=on_done,
+    ).start(engine.executor(user_id))
+
+    timeout = backend.timeout_for("/generate-quiz")[1]
+    if deadline is not None:
+        timeout = min(timeout, deadline.remaining())
+    stream.wait_for(0, timeout=timeout)
+    questions = stream.snapshot()
+    if not questions:
+        return None, None
+    return questions, stream
+
+
+def simple_explanation_job():
+    # snapshot the concept now: the job may run on a background worker
+    payload = {
+        "concept": st.session_state.concept_name,
+        "core_idea": st.session_state.core_idea,
+        "ideal_explanation": st.session_state.ideal_explanation,
+        "difficulty": st.session_state.concept_difficulty
+    }
+    key = explain_key(st.session_state.concept_id, st.session_state.concept_difficulty)
+
+    def job():
+        r = backend.call("/explain-better", payload)
+        r.raise_for_status()
+        return r.json().get("simple_explanation", "")
+
+    return key, job
+
+
+def concept_fetcher(user_id):
+    # fetch() for the concept queue; safe on background workers
+    def fetch():
+        return post("/next-concept", {"user_id": user_id})
+
+    return fetch
+
+
+def log_graded_answer(record):
+    # opt-in evaluation log (QUIZ_PREGRADER_LOG)
+    if not PREGRADER_LOG:
         return
-    st.session_state.next_quiz = quiz_data["questions"]
+    try:
+        with open(PREGRADER_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
 
 
 # ── MODE EXIT HELPERS ───────────────────────────────────────────
 # Ensures Concept Challenge does NOT block quizzes
 
 def exit_concept_mode():
-    st.session_state.free_text_mode = False
-    st.session_state.is_grading = False
-    st.session_state.show_feedback = False
+    st.session_state.show_simple_explanation = False
+    st.session_state.is_simplifying = False
+    go("idle")
 
     # Remove lingering widget state
     if "free_text_answer" in st.session_state:
         del st.session_state["free_text_answer"]
 
 # ── START QUIZ FUNCTION ─────────────────────────────────────────
-def start_quiz(topic, difficulty, num_questions=4, is_adaptive=False, mode="quiz"):
+def quiz_payload(topic, difficulty, num_questions, mode):
+    return {
+        "topic": topic,
+        "start_difficulty": difficulty,
+        "num_questions": num_questions,
+        "user_id": st.session_state.user_id,
+        "mode": mode
+    }
+
+
+def start_quiz(topic, difficulty, num_questions=4, mode="quiz"):
+    payload = quiz_payload(topic, difficulty, num_questions, mode)
+
+    sid = round_owner()
+    key = round_key(topic, difficulty, mode, num_questions)
+
+    # categories with a precompiled bank: served from it right away
+    # ("instant"), or once generation is over budget or fails
+    banked = (
+        question_bank is not None
+        and question_bank.has(topic, difficulty, mode, num_questions)
+    )
+    instant = banked and QUESTION_BANK_MODE == "instant"
+    # one budget for the whole wait: prefetch, stream, generation
+    deadline = Deadline(QUESTION_BANK_BUDGET) if banked else None
+
+    def from_bank(reason):
+        return question_bank.draw(
+            topic, difficulty, mode, num_questions,
+            user_id=st.session_state.user_id, reason=reason,
+        )
+
     with st.spinner("Creating your quiz..."):
-        payload = {
-            "topic": topic,
-            "start_difficulty": difficulty,
-            "num_questions": num_questions,
-            "user_id": st.session_state.user_id,
-            "mode": mode
-        }
+        questions = from_bank("instant") if instant else None
+        stream = None
 
-        if is_adaptive:
-            payload.pop("start_difficulty", None)
+        # a prefetched (or still in-flight) round beats a fresh request
+        if questions is None:
+            questions = prefetcher.take(
+                sid, key, wait=True, timeout=deadline.remaining() if deadline else None
+            )
 
-        quiz_data, err = post(f"{BACKEND}/generate-quiz", payload)
+        if questions is None and QUIZ_STREAMING:
+            questions, stream = open_quiz_stream(payload, deadline)
+            # a slow stream keeps filling the cache; the bank covers this round
+            if questions is None and banked:
+                questions = from_bank("fallback")
 
-    if err:
-        st.error(f"Quiz generation failed: {err}")
-        return False
+        if questions is None:
+            questions, err = generate_within(payload, deadline)
+            if questions is None and banked:
+                questions, err = from_bank("fallback"), None
 
-    if not quiz_data or "questions" not in quiz_data:
+            if err:
+                st.error(f"Quiz generation failed: {err}")
+                return False
+
+    # validated once here; renders only see parsed Questions
+    quiz = parse_questions(questions)
+    if not quiz:
         st.error("Invalid quiz data from server")
         return False
 
-    st.session_state.quiz = quiz_data["questions"]
-    st.session_state.index = 0
-    st.session_state.show_feedback = False
-    st.session_state.round_correct = 0
+    # keep the next round(s) generating while this one is played;
+    # adaptive rounds plan theirs on the last answer instead
+    if not instant and st.session_state.get("selected_mode") != ADAPTIVE_MODE:
+        prefetcher.schedule(
+            sid, key, lambda: fetch_questions(dict(payload)), owner=st.session_state.user_id
+        )
 
-    if not is_adaptive:
-        st.session_state.meta = {"field_id": None, "topic_id": None}
+    st.session_state.quiz = quiz                # unanswered questions, current first
+    st.session_state.quiz_stream = stream
+    st.session_state.stream_seen = len(questions)
+    st.session_state.index = 0                  # questions consumed this round
+    st.session_state.round_correct = 0
+    # what the skill model files this round's answers under
+    st.session_state.meta = {
+        "field_id": None, "topic_id": None, "topic": topic, "difficulty": difficulty,
+    }
 
     return True
 
-# ── CATEGORY AUTO-START (NO EXTRA CLICKS) ───────────────────────
-# This MUST be placed AFTER start_quiz is defined
+# ── ROUND LOADING ───────────────────────────────────────────────
+def load_round():
+    request = st.session_state.pending_round
+    st.session_state.pending_round = None
+
+    if request["adaptive"]:
+        # usually planned (and generating) since the last answer
+        pick = st.session_state.next_meta or skills.pick(st.session_state.user_id)
+        st.session_state.next_meta = {}
+
+        started = start_quiz(
+            pick["topic"],
+            pick["start_difficulty"],
+            num_questions=request["num_questions"],
+            mode=request["mode"]
+        )
 
-category_topic_map = {
-    "general": "general knowledge",
-    "sports": "sports",
-    "science": "science",
-    "history": "history",
-    "geography": "geography",
-}
+    else:
+        started = start_quiz(
+            request["topic"],
+            request["difficulty"],
+            num_questions=request["num_questions"],
+            mode=request["mode"]
+        )
 
-selected = st.session_state.get("selected_mode")
+    go("question" if started else request["back"])
 
-if (
-    selected in category_topic_map
-    and not st.session_state.quiz
-    and not st.session_state.get("free_text_mode")
-):
-    topic = category_topic_map[selected]
-    mode = st.session_state.user_mode
-    difficulty = st.session_state.user_difficulty
+# ── PICK A TOPIC FLOW ───────────────────────────────────────────
 
-    if start_quiz(
-        topic=topic,
-        difficulty=difficulty,
-        num_questions=4 if mode == "quiz" else 6,
-        mode=mode
-    ):
-        st.rerun()
+@action
+def start_custom_round():
+    go("idle")
+    request_round(st.session_state.custom_topic_input.strip())
 
-# ── PICK A TOPIC FLOW ───────────────────────────────────────────
+
+RUN_TRACE.phase("mode_branch")
 
 if st.session_state.get("selected_mode") == "custom":
 
@@ -473,23 +1242,42 @@ if st.session_state.get("selected_mode") == "custom":
 
     if custom_topic.strip():
 
-        if st.button(
+        st.button(
             f"Start {st.session_state.user_mode.title()}",
             use_container_width=True,
-            key="start_custom_topic"
-        ):
-            if start_quiz(
-                topic=custom_topic.strip(),
-                difficulty=st.session_state.user_difficulty,
-                num_questions=4 if st.session_state.user_mode == "quiz" else 6,
-                mode=st.session_state.user_mode
-            ):
-                st.rerun()
+            key="start_custom_topic",
+            on_click=start_custom_round
+        )
 
     end_main_card()
 
 # ── CONCEPT CHALLENGE ENTRY ─────────────────────────────────────
 
+@action
+def start_concept():
+    # ── CLEAR ANY PRIOR QUIZ / FEEDBACK STATE ─────────
+    st.session_state.quiz = []
+    st.session_state.index = 0
+    st.session_state.round_correct = 0
+
+    st.session_state.last_correct = False
+    st.session_state.last_verdict = ""
+    st.session_state.last_explanation = ""
+
+    # ── CLEAR EXPLAIN-MORE STATE (CRITICAL) ───────────
+    st.session_state.show_simple_explanation = False
+    st.session_state.simple_explanation = ""
+    st.session_state.is_simplifying = False
+
+    # ── CLEAR FREE-TEXT STATE ─────────────────────────
+    if "free_text_answer" in st.session_state:
+        del st.session_state["free_text_answer"]
+
+    # the concept card fetches it
+    go("idle")
+    go("concept_loading")
+
+
 if st.session_state.get("selected_mode") == "concept":
 
     begin_main_card()
@@ -503,60 +1291,7 @@ if st.session_state.get("selected_mode") == "concept":
         unsafe_allow_html=True
     )
 
-    if st.button("Start concept challenge", use_container_width=True):
-
-        # ── CLEAR ANY PRIOR QUIZ / FEEDBACK STATE ─────────
-        st.session_state.quiz = []
-        st.session_state.index = 0
-        st.session_state.round_correct = 0
-
-        st.session_state.show_feedback = False
-        st.session_state.last_correct = False
-        st.session_state.last_verdict = ""
-        st.session_state.last_explanation = ""
-
-        # ── CLEAR EXPLAIN-MORE STATE (CRITICAL) ───────────
-        st.session_state.show_simple_explanation = False
-        st.session_state.simple_explanation = ""
-        st.session_state.is_simplifying = False
-
-        # ── CLEAR FREE-TEXT STATE ─────────────────────────
-        st.session_state.free_text_mode = False
-        st.session_state.is_grading = False
-
-        if "free_text_answer" in st.session_state:
-            del st.session_state["free_text_answer"]
-
-        # ── FETCH NEXT CONCEPT ───────────────────────────
-        with st.spinner("Selecting next concept..."):
-            data, err = post(
-                f"{BACKEND}/next-concept",
-                {"user_id": st.session_state.user_id}
-            )
-
-        if err:
-            st.error(f"Failed to load concept: {err}")
-            end_main_card()
-            st.stop()
-
-        if data.get("done"):
-            st.success("You’ve mastered all available concepts.")
-            end_main_card()
-            st.stop()
-
-        # ── SET NEW CONCEPT STATE ────────────────────────
-        st.session_state.concept_id = data["concept_id"]
-        st.session_state.concept_name = data["concept"]
-        st.session_state.core_idea = data["core_idea"]
-        st.session_state.ideal_explanation = data["ideal_explanation"]
-        st.session_state.concept_difficulty = data["difficulty"]
-
-        # ── ACTIVATE FREE-TEXT MODE (AFTER RESET) ────────
-        st.session_state.free_text_mode = True
-        st.session_state.is_grading = False
-        st.session_state.show_feedback = False
-
-        st.rerun()
+    st.button("Start concept challenge", use_container_width=True, on_click=start_concept)
 
     end_main_card()
 
@@ -581,7 +1316,123 @@ st.markdown(
 # ── FREE-TEXT QUESTION MODE ────────────────────────────────────
 # Uses native keyboard dictation on iOS (no custom mic needed)
 
-if st.session_state.get("free_text_mode"):
+def load_concept():
+    # ── FETCH NEXT CONCEPT ───────────────────────────
+    # usually a local pop from the lookahead queue
+    with st.spinner("Selecting next concept..."):
+        data, err = concept_queues.next_concept(
+            st.session_state.user_id,
+            concept_fetcher(st.session_state.user_id)
+        )
+
+    if err:
+        st.error(f"Failed to load concept: {err}")
+        go("idle")
+        return
+
+    if data.get("done"):
+        st.success("You’ve mastered all available concepts.")
+        go("idle")
+        return
+
+    # ── SET NEW CONCEPT STATE ────────────────────────
+    st.session_state.concept_id = data["concept_id"]
+    st.session_state.concept_name = data["concept"]
+    st.session_state.core_idea = data["core_idea"]
+    st.session_state.ideal_explanation = data["ideal_explanation"]
+    st.session_state.concept_difficulty = data["difficulty"]
+
+    go("concept_answer")
+
+
+def grade_concept_answer(concept, core_idea, ideal_explanation):
+    answer = st.session_state.free_text_answer.strip()
+
+    payload = {
+        "user_id": st.session_state.user_id,
+        "concept_id": st.session_state.concept_id,
+        "concept": concept,
+        "core_idea": core_idea,
+        "ideal_explanation": ideal_explanation,
+        # ✅ Always send non-empty text
+        "answer_text": answer if answer else "I don't know."
+    }
+
+    # clear-cut answers are graded locally, no LLM round trip for the
+    # user; the backend still grades them write-behind
+    local = None
+    if PREGRADER_MODE in ("on", "shadow"):
+        local = pregrader.grade(
+            st.session_state.concept_id, core_idea, ideal_explanation, answer
+        )
+    result = local if PREGRADE_LOCALLY else None
+    if result is not None:
+        # mastery moves only once the report lands: no lookahead until
+        # then (on_delivered lifts the hold), or the current concept
+        # would be queued again
+        concept_queues.invalidate(st.session_state.user_id, hold=True)
+        grade_reports.put(payload)
+
+    if result is None:
+        # independent of the verdict: fetch it alongside the grading call
+        explanations.speculate(*simple_explanation_job(), owner=st.session_state.user_id)
+        with st.spinner("🧠 Evaluating your answer..."):
+            try:
+                r = backend.call("/check-answer", payload)
+                r.raise_for_status()
+                result = r.json()
+
+            except Exception as e:
+                st.error(f"Grading failed: {str(e)}")
+                go("concept_answer")
+                return
+
+        log_graded_answer({
+            "concept_id": st.session_state.concept_id,
+            "concept": concept,
+            "core_idea": core_idea,
+            "ideal_explanation": ideal_explanation,
+            "answer_text": answer,
+            "correct": bool(result.get("correct", False)),
+            "local_correct": local["correct"] if local else None,
+        })
+
+        # any grade may move mastery: queued concepts were picked for
+        # the old state
+        concept_queues.invalidate(st.session_state.user_id)
+
+    # ── STORE RESULT ───────────────────────────
+    st.session_state.last_correct = result.get("correct", False)
+    st.session_state.last_explanation = result.get("ideal_explanation", "")
+    st.session_state.last_verdict = result.get("verdict", "")
+    go("concept_feedback")
+
+
+@action
+def submit_concept():
+    st.session_state.show_simple_explanation = False
+    go("grading")
+
+
+@action
+def explain_more():
+    st.session_state.is_simplifying = True
+    st.session_state.show_simple_explanation = False
+
+
+@action
+def next_concept():
+    # EXIT CONCEPT MODE
+    exit_concept_mode()
+
+
+@card_fragment
+def concept_card():
+    if st.session_state.phase == "concept_loading":
+        load_concept()
+
+    if st.session_state.phase not in CONCEPT_PHASES:
+        return
 
     begin_main_card()
 
@@ -597,7 +1448,7 @@ if st.session_state.get("free_text_mode"):
 
     st.markdown("### Your answer")
 
-    answer_text = st.text_area(
+    st.text_area(
         "Explain in your own words:",
         key="free_text_answer",
         height=140,
@@ -605,51 +1456,25 @@ if st.session_state.get("free_text_mode"):
     )
 
     # ── SUBMIT (allow blank) ───────────────────────
-    if st.button("Submit answer", use_container_width=True, key="submit_concept"):
-        st.session_state.is_grading = True
-        st.rerun()
+    st.button(
+        "Submit answer",
+        use_container_width=True,
+        key="submit_concept",
+        on_click=submit_concept
+    )
 
     # ── GRADING STATE ──────────────────────────────
-    if st.session_state.get("is_grading"):
+    if st.session_state.phase == "grading":
+        grade_concept_answer(concept, core_idea, ideal_explanation)
 
-        with st.spinner("🧠 Evaluating your answer..."):
-            try:
-                r = requests.post(
-                    f"{BACKEND}/check-answer",
-                    json={
-                        "user_id": st.session_state.user_id,
-                        "concept_id": st.session_state.concept_id,
-                        "concept": concept,
-                        "core_idea": core_idea,
-                        "ideal_explanation": ideal_explanation,
-                        # ✅ Always send non-empty text
-                        "answer_text": (
-                            st.session_state.free_text_answer.strip()
-                            if st.session_state.free_text_answer.strip()
-                            else "I don't know."
-                        )
-                    },
-                    timeout=30
-                )
-                r.raise_for_status()
-                result = r.json()
+    # ── FEEDBACK ──────────────────────────────────
+    if st.session_state.phase == "concept_feedback":
 
-            except Exception as e:
-                st.error(f"Grading failed: {str(e)}")
-                st.session_state.is_grading = False
-                end_main_card()
-                st.stop()
-
-        # ── STORE RESULT ───────────────────────────
-        st.session_state.last_correct = result.get("correct", False)
-        st.session_state.last_explanation = result.get("ideal_explanation", "")
-        st.session_state.last_verdict = result.get("verdict", "")
-        st.session_state.show_feedback = True
-        st.session_state.is_grading = False
-        st.rerun()
+        # the grade is in: line up the next concept while the user reads
+        concept_queues.refill(st.session_state.user_id, concept_fetcher(st.session_state.user_id))
 
-    # ── FEEDBACK ──────────────────────────────────
-    if st.session_state.get("show_feedback"):
+        # warm "Explain this more simply" while the user reads feedback
+        explanations.speculate(*simple_explanation_job(), owner=st.session_state.user_id)
 
         if st.session_state.last_correct:
             st.markdown("<div class='feedback-good'>✅ Correct</div>", unsafe_allow_html=True)
@@ -664,92 +1489,214 @@ if st.session_state.get("free_text_mode"):
             st.markdown(st.session_state.last_explanation)
 
         # 👉 Explain more simply
-        if st.button(
+        st.button(
             "Explain this more simply",
             use_container_width=True,
-            key="explain_more_btn"
-        ):
-            st.session_state.is_simplifying = True
-            st.session_state.show_simple_explanation = False
+            key="explain_more_btn",
+            on_click=explain_more
+        )
 
-        # EXIT CONCEPT MODE
-        if st.button("Next →", use_container_width=True, key="next_concept"):
-            st.session_state.free_text_mode = False
-            st.session_state.show_simple_explanation = False
-            st.session_state.is_simplifying = False
+        st.button("Next →", use_container_width=True, key="next_concept", on_click=next_concept)
 
-            if "free_text_answer" in st.session_state:
-                del st.session_state["free_text_answer"]
+    # ── SIMPLER EXPLANATION FLOW ───────────────────
+    # ⚠️ Fetch is fine, render MUST be gated by feedback
 
-            st.session_state.show_feedback = False
-            st.rerun()
+    if st.session_state.get("is_simplifying"):
 
-    # ── SIMPLER EXPLANATION FLOW ───────────────────
-# ⚠️ Fetch is fine, render MUST be gated by feedback
-
-if st.session_state.get("is_simplifying"):
-
-    with st.spinner("Breaking it down more simply..."):
-        try:
-            r = requests.post(
-                f"{BACKEND}/explain-better",
-                json={
-                    "concept": st.session_state.concept_name,
-                    "core_idea": st.session_state.core_idea,
-                    "ideal_explanation": st.session_state.ideal_explanation,
-                    "difficulty": st.session_state.concept_difficulty
-                },
-                timeout=30
-            )
-            r.raise_for_status()
-            data = r.json()
+        with st.spinner("Breaking it down more simply..."):
+            try:
+                key, job = simple_explanation_job()
+                st.session_state.simple_explanation = explanations.fetch(
+                    key, job, timeout=backend.timeout_for("/explain-better")[1]
+                )
+                st.session_state.show_simple_explanation = True
+                st.session_state.is_simplifying = False
+
+            except Exception as e:
+                st.error(f"Could not simplify explanation: {str(e)}")
+                st.session_state.is_simplifying = False
+
+    # ── RENDER (STRICTLY AFTER FEEDBACK) ───────────
+    if (
+        st.session_state.phase == "concept_feedback"
+        and st.session_state.get("show_simple_explanation")
+    ):
+        st.markdown("### Simpler explanation")
+        st.success(st.session_state.simple_explanation)
+
+    end_main_card()
+
+
+RUN_TRACE.phase("concept_card")
+concept_card()
 
-            st.session_state.simple_explanation = data.get("simple_explanation", "")
-            st.session_state.show_simple_explanation = True
-            st.session_state.is_simplifying = False
+# ── STREAMED ROUND SYNC ─────────────────────────────────────────
+# Later questions land in the StreamingRound; parse the new ones in
+# per run (stream_seen = raw questions already taken)
 
-        except Exception as e:
-            st.error(f"Could not simplify explanation: {str(e)}")
-            st.session_state.is_simplifying = False
+def sync_quiz_stream():
+    quiz_stream = st.session_state.get("quiz_stream")
+    while quiz_stream is not None:
+        finished = quiz_stream.finished     # read before the snapshot
+        raw = quiz_stream.snapshot()
+        st.session_state.quiz.extend(parse_questions(raw[st.session_state.stream_seen:]))
+        st.session_state.stream_seen = len(raw)
+        if finished:
+            st.session_state.quiz_stream = None
+            return
 
+        if st.session_state.quiz:
+            return
 
-# ── RENDER (STRICTLY AFTER FEEDBACK) ───────────
-if (
-    st.session_state.get("show_feedback")
-    and st.session_state.get("show_simple_explanation")
-):
-    st.markdown("### Simpler explanation")
-    st.success(st.session_state.simple_explanation)
+        # user is ahead of the stream: wait for the next question only
+        with st.spinner("Loading next question..."):
+            quiz_stream.wait_for(st.session_state.stream_seen, timeout=30)
 
-end_main_card()
+
+def current_question():
+    # None once the round is over
+    sync_quiz_stream()
+    return st.session_state.quiz[0] if st.session_state.quiz else None
 
 # ── QUIZ DISPLAY ────────────────────────────────────────────────
 # 🚫 IMPORTANT: Do NOT render MCQs while in Concept Challenge mode
 
-if (
-    not st.session_state.get("free_text_mode")
-    and st.session_state.quiz
-    and st.session_state.index < len(st.session_state.quiz)
-):
+def last_question():
+    stream = st.session_state.quiz_stream
+    return len(st.session_state.quiz) == 1 and (stream is None or stream.finished)
 
-    begin_main_card()
 
-    q = st.session_state.quiz[st.session_state.index]
+def sync_skills():
+    if skill_sync is None:
+        return
+    user_id = st.session_state.user_id
+    skill_sync.put({"user_id": user_id, "skills": skills.export(user_id)})
+
+
+def plan_next_round():
+    # pick the next adaptive round now and start generating it while
+    # the user reads the last explanation
+    mode = st.session_state.user_mode
+    pick = skills.pick(st.session_state.user_id)
+    payload = quiz_payload(pick["topic"], pick["start_difficulty"], round_size(mode, True), mode)
+    key = round_key(pick["topic"], pick["start_difficulty"], mode, payload["num_questions"])
+
+    st.session_state.next_meta = pick
+    prefetcher.schedule(
+        round_owner(), key, lambda: fetch_questions(payload), owner=st.session_state.user_id
+    )
+
+
+@action
+def submit_quiz_answer():
+    i = st.session_state.index
+    selected_answer = (
+        st.session_state.get(f"radio_left_{i}")
+        or st.session_state.get(f"radio_right_{i}")
+        or st.session_state.get(f"radio_{i}")
+    )
+    if not selected_answer:
+        st.session_state.quiz_warning = "Please select an answer first"
+        return
+
+    q = st.session_state.quiz[0]
+    is_correct = q.is_correct(selected_answer)
+
+    # write-behind: delivered by the background answer queue
+    answers.put({
+        "user_id": st.session_state.user_id,
+        "field_id": st.session_state.meta.get("field_id"),
+        "topic_id": st.session_state.meta.get("topic_id"),
+        "question_id": q.id,
+        "question_text": q.text,
+        "correct": is_correct
+    })
+
+    meta = st.session_state.meta
+    skills.observe(st.session_state.user_id, meta.get("topic"), meta.get("difficulty"), is_correct)
+
+    st.session_state.total_answered += 1
+    if is_correct:
+        st.session_state.total_correct += 1
+        st.session_state.round_correct += 1
+
+    if last_question():
+        sync_skills()
+        if st.session_state.get("selected_mode") == ADAPTIVE_MODE:
+            plan_next_round()
+
+    st.session_state.last_correct = is_correct
+    st.session_state.last_explanation = q.explanation
+    go("answered")
+
+
+@action
+def next_question():
+    # answered questions are not kept
+    st.session_state.quiz.pop(0)
+    st.session_state.index += 1
+    go("question")
+
+
+@action
+def next_round():
+    selected = st.session_state.get("selected_mode")
+
+    if selected == ADAPTIVE_MODE:
+        request_round(None, adaptive=True, back="round_done")
+        return
+
+    # Non-adaptive modes
+    topic = (
+        st.session_state.get("custom_topic_input", "").strip()
+        if selected == "custom"
+        else category_topic_map.get(selected)
+    )
+
+    if not topic:
+        st.session_state.quiz = []
+        go("idle")
+    else:
+        request_round(topic, back="round_done")
+
+
+@card_fragment
+def quiz_card():
+    if st.session_state.phase not in QUIZ_PHASES:
+        return
+
+    # the header sits outside the card; writing it here on every run
+    # (full runs included) lets Submit update it without a full rerun
+    render_progress()
+
+    if st.session_state.phase == "loading":
+        load_round()
+
+    if st.session_state.phase in ("question", "answered"):
+        q = current_question()
+        if q is None:
+            go("round_done")
+
+    if st.session_state.phase == "round_done":
+        round_panel()
+        return
+
+    if st.session_state.phase not in ("question", "answered"):
+        return
+
+    logged_in_at = st.session_state.pop("logged_in_at", None)
+    if logged_in_at:
+        metrics.observe_first_question(time.time() - logged_in_at, current_mode())
+
+    begin_main_card()
 
     # ── QUESTION ─────────────────────────────
     st.markdown(
-        f"<div class='quiz-question'>{q.get('question', '—')}</div>",
+        f"<div class='quiz-question'>{q.text}</div>",
         unsafe_allow_html=True
     )
 
-    choices = q.get("choices", {})
-    if not isinstance(choices, dict):
-        end_main_card()
-        st.session_state.index += 1
-        st.rerun()
-
-    option_items = [(k, v) for k, v in choices.items()]
-    option_labels = [f"{k}. {v}" for k, v in option_items]
+    option_labels = q.labels()
 
     # ── ANSWER OPTIONS ───────────────────────
     if len(option_labels) >= 4:
@@ -757,7 +1704,7 @@ if (
 
         with col1:
             left_opts = option_labels[: len(option_labels) // 2]
-            left_choice = st.radio(
+            st.radio(
                 " ",
                 left_opts,
                 index=None,
@@ -766,17 +1713,15 @@ if (
 
         with col2:
             right_opts = option_labels[len(option_labels) // 2 :]
-            right_choice = st.radio(
+            st.radio(
                 "  ",
                 right_opts,
                 index=None,
                 key=f"radio_right_{st.session_state.index}"
             )
 
-        selected_answer = left_choice or right_choice
-
     else:
-        selected_answer = st.radio(
+        st.radio(
             "Select an answer:",
             option_labels,
             index=None,
@@ -784,54 +1729,26 @@ if (
         )
 
     # ── SUBMIT ───────────────────────────────
-    if st.button(
-        "Submit answer",
-        use_container_width=True,
-        key=f"submit_quiz_{st.session_state.index}"
-    ):
-        if not selected_answer:
-            st.warning("Please select an answer first")
-            end_main_card()
-            st.stop()
-
-        letter = selected_answer.split(".", 1)[0].strip().upper()
-        correct_letter = str(q.get("correct", "")).strip().upper()
-        is_correct = (letter == correct_letter)
-
-        try:
-            requests.post(
-                f"{BACKEND}/submit-answer",
-                json={
-                    "user_id": st.session_state.user_id,
-                    "field_id": st.session_state.meta.get("field_id"),
-                    "topic_id": st.session_state.meta.get("topic_id"),
-                    "question_id": q.get("id"),
-                    "question_text": q.get("question"),
-                    "correct": is_correct
-                },
-                timeout=5
-            )
-        except Exception as e:
-            st.error(f"Request failed: {str(e)}")
-
-        st.session_state.total_answered += 1
-        if is_correct:
-            st.session_state.total_correct += 1
-            st.session_state.round_correct += 1
+    if st.session_state.phase == "question":
+        st.button(
+            "Submit answer",
+            use_container_width=True,
+            key=f"submit_quiz_{st.session_state.index}",
+            on_click=submit_quiz_answer
+        )
 
-        st.session_state.last_correct = is_correct
-        st.session_state.last_explanation = q.get("explanation", "")
-        st.session_state.show_feedback = True
-        st.rerun()
+        warning = st.session_state.pop("quiz_warning", None)
+        if warning:
+            st.warning(warning)
 
     # ── FEEDBACK ─────────────────────────────
-    if st.session_state.show_feedback:
+    if st.session_state.phase == "answered":
 
         if st.session_state.last_correct:
             st.markdown("<div class='feedback-good'>✅ Correct!</div>", unsafe_allow_html=True)
         else:
-            correct_letter = q.get("correct", "?")
-            correct_text = q["choices"].get(correct_letter, "—")
+            correct_letter = q.correct or "?"
+            correct_text = q.option(q.correct) or "—"
             st.markdown(
                 f"<div class='feedback-bad'>❌ Correct answer: {correct_letter}. {correct_text}</div>",
                 unsafe_allow_html=True
@@ -840,22 +1757,20 @@ if (
         if st.session_state.last_explanation:
             st.info(st.session_state.last_explanation)
 
-        if st.button(
+        st.button(
             "Next question →",
             use_container_width=True,
-            key=f"next_quiz_{st.session_state.index}"
-        ):
-            st.session_state.show_feedback = False
-            st.session_state.index += 1
-            st.rerun()
+            key=f"next_quiz_{st.session_state.index}",
+            on_click=next_question
+        )
 
     end_main_card()
 
 
 # ── ROUND FINISHED ──────────────────────────────────────────────
-if st.session_state.quiz and st.session_state.index >= len(st.session_state.quiz):
+def round_panel():
     score = st.session_state.round_correct
-    total = len(st.session_state.quiz)
+    total = st.session_state.index      # every question was consumed
     percent = int((score / total) * 100) if total > 0 else 0
 
     st.markdown("### Round complete 🎯")
@@ -867,64 +1782,10 @@ if st.session_state.quiz and st.session_state.index >= len(st.session_state.quiz
     else:
         st.info("Nice effort — let’s keep practicing 💪")
 
-    if st.button("Next round ▶", use_container_width=True):
-        # Reset round
-        st.session_state.round_correct = 0
-        st.session_state.show_feedback = False
-        st.session_state.index = 0
+    st.button("Next round ▶", use_container_width=True, on_click=next_round)
 
-        selected = st.session_state.get("selected_mode")
 
-        if selected == "🎯 General Knowledge":
-            data, err = post(
-                f"{BACKEND}/next-topic",
-                {"user_id": st.session_state.user_id}
-            )
-
-            if err or not data:
-                st.error("Couldn't load next topic — try again")
-            else:
-                st.session_state.meta = data
-
-                if st.session_state.next_quiz:
-                    st.session_state.quiz = st.session_state.next_quiz
-                    st.session_state.next_quiz = []
-                else:
-                    start_quiz(
-                        data["topic"],
-                        data.get("start_difficulty", selected_difficulty),
-                        num_questions=3,
-                        is_adaptive=True
-                    )
-
-                threading.Thread(
-                    target=prefetch_next,
-                    args=(data["topic"], 3, data.get("start_difficulty", selected_difficulty)),
-                    daemon=True
-                ).start()
-                st.rerun()
-
-        else:
-            # Non-adaptive modes
-            topic = (
-                st.session_state.custom_topic
-                if selected == "custom"
-                else field_map.get(selected)
-            )
+RUN_TRACE.phase("quiz_render")
+quiz_card()
 
-            if not topic:
-                st.session_state.quiz = []
-                st.rerun()
-            else:
-                if st.session_state.next_quiz:
-                    st.session_state.quiz = st.session_state.next_quiz
-                    st.session_state.next_quiz = []
-                else:
-                    start_quiz(topic, selected_difficulty, num_questions=4)
-
-                threading.Thread(
-                    target=prefetch_next,
-                    args=(topic, 4, selected_difficulty),
-                    daemon=True
-                ).start()
-                st.rerun()
\ No newline at end of file
+finish_run("complete")
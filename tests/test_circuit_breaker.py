@@ -0,0 +1,75 @@
+import time
+
+import pytest
+import requests
+
+from backend_client import BackendClient
+from resilience import CircuitOpen, LoadShed
+
+PATH = "/check-answer"
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def half_open_client(monkeypatch):
+    # one failure opens the breaker; it goes half-open almost at once
+    client = BackendClient("http://backend", breaker_failures=1, breaker_reset=0.05)
+    monkeypatch.setattr(client, "_send", lambda *a, **k: Response(503))
+    client.call(PATH, {}, retries=0)
+    time.sleep(0.06)
+    assert client.breaker(PATH).state == "half-open"
+    return client
+
+
+def raise_(error):
+    def send(*args, **kwargs):
+        raise error
+    return send
+
+
+def test_shed_probe_frees_the_probe_slot(monkeypatch):
+    client = half_open_client(monkeypatch)
+    monkeypatch.setattr(client, "_send", raise_(LoadShed("shed")))
+    with pytest.raises(LoadShed):
+        client.call(PATH, {}, retries=0)
+
+    # never reached the backend: still half-open, the next call probes
+    assert client.breaker(PATH).state == "half-open"
+    monkeypatch.setattr(client, "_send", lambda *a, **k: Response(200))
+    assert client.call(PATH, {}, retries=0).status_code == 200
+    assert client.breaker(PATH).state == "closed"
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ChunkedEncodingError("truncated"),
+    requests.exceptions.TooManyRedirects("loop"),
+    ValueError("odd"),
+])
+def test_failed_probe_reopens_the_breaker(monkeypatch, error):
+    client = half_open_client(monkeypatch)
+    monkeypatch.setattr(client, "_send", raise_(error))
+    with pytest.raises(type(error)):
+        client.call(PATH, {}, retries=0)
+    assert client.breaker(PATH).state == "open"
+
+    # reopened, not stuck: after the reset another probe goes out
+    time.sleep(0.06)
+    monkeypatch.setattr(client, "_send", lambda *a, **k: Response(200))
+    assert client.call(PATH, {}, retries=0).status_code == 200
+
+
+def test_stuck_probe_regression(monkeypatch):
+    # a shed probe used to leave _probing set: CircuitOpen forever
+    client = half_open_client(monkeypatch)
+    monkeypatch.setattr(client, "_send", raise_(LoadShed("shed")))
+    with pytest.raises(LoadShed):
+        client.call(PATH, {}, retries=0)
+    monkeypatch.setattr(client, "_send", lambda *a, **k: Response(200))
+    for _ in range(3):
+        try:
+            client.call(PATH, {}, retries=0)
+        except CircuitOpen:
+            pytest.fail("breaker stuck half-open after a shed probe")
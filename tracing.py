@@ -0,0 +1,319 @@
+import collections
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# ── TRACING ─────────────────────────────────────────────────────
+# Spans for script runs, their phases and every backend call, written
+# as OTLP JSON (one ExportTraceServiceRequest per line, like the
+# OpenTelemetry collector's file exporter) so a slow action can be
+# opened offline (python -m bench.traces, or any OTLP viewer).
+#
+# One trace per user action: the on_click callback opens it, the run
+# it triggers continues it.
+# Backend calls carry it to the worker as a W3C traceparent header.
+# The current span lives in a context variable; work handed to
+# another thread keeps its parent through bind().
+#
+# Disabled (the default) every call is a cheap no-op; configure()
+# turns it on for the process.
+
+INTERNAL, SERVER, CLIENT = 1, 2, 3      # OTLP span kinds
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_current = contextvars.ContextVar("quiz_span", default=None)
+
+
+def _new_id(nbytes):
+    return "%0*x" % (nbytes * 2, random.getrandbits(nbytes * 8) or 1)
+
+
+def parse_traceparent(header):
+    # "00-<trace>-<span>-<flags>" -> (trace_id, span_id) or None
+    parts = (header or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+class Span:
+    def __init__(self, tracer, name, trace_id, parent_id, kind, attributes, start_ns=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes)
+        self.events = []
+        self.status = None
+        self.message = ""
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def event(self, name, **attributes):
+        self.events.append((time.time_ns(), name, attributes))
+
+    def fail(self, error):
+        self.status = STATUS_ERROR
+        self.message = str(error)[:200]
+        if isinstance(error, BaseException):
+            self.attributes["exception.type"] = type(error).__name__
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.exporter.export(self)
+
+
+class _NoSpan:
+    # stands in when tracing is off or the trace was not sampled
+    traceparent = None
+    trace_id = None
+
+    def set(self, key, value):
+        pass
+
+    def event(self, name, **attributes):
+        pass
+
+    def fail(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample=1.0):
+        self.exporter = exporter
+        self.sample = sample
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    # ── starting spans ──
+    def start(self, name, parent=None, kind=INTERNAL, root=False, start_ns=None, **attributes):
+        # parent: a Span, a traceparent header, or None for the current
+        # span. Without a parent only root=True starts a (sampled) trace.
+        if not self.enabled:
+            return NO_SPAN
+        if parent is None:
+            parent = _current.get()
+        if isinstance(parent, str):
+            ids = parse_traceparent(parent)
+            if ids:
+                return Span(self, name, ids[0], ids[1], kind, attributes, start_ns)
+            parent = None
+        if isinstance(parent, Span):
+            return Span(self, name, parent.trace_id, parent.span_id, kind, attributes, start_ns)
+        if parent is NO_SPAN or not root or random.random() >= self.sample:
+            return NO_SPAN
+        return Span(self, name, _new_id(16), None, kind, attributes, start_ns)
+
+    @contextmanager
+    def span(self, name, kind=INTERNAL, root=False, **attributes):
+        span = self.start(name, kind=kind, root=root, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+
+    def activate(self, span):
+        # make `span` current on this thread until the next activate()
+        _current.set(span)
+
+    def current(self):
+        return _current.get() or NO_SPAN
+
+    def traceparent(self):
+        return self.current().traceparent
+
+    def bind(self, fn):
+        # fn, run under the span current here, on whichever thread calls it
+        span = _current.get()
+        if span is None:
+            return fn
+
+        def run(*args, **kwargs):
+            token = _current.set(span)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current.reset(token)
+
+        return run
+
+    def start_run(self, name, parent=None, start_ns=None, **attributes):
+        return RunTrace(self, name, parent, start_ns, attributes)
+
+
+class RunTrace:
+    # a script run: one span, with its top-down phases as children,
+    # each phase current until the next one starts
+
+    def __init__(self, tracer, name, parent, start_ns, attributes):
+        self.tracer = tracer
+        # parent: traceparent of the action this run belongs to, or a new trace
+        tracer.activate(None)
+        self.span = tracer.start(name, parent=parent, root=True, start_ns=start_ns, **attributes)
+        self._phase = None
+        tracer.activate(self.span)
+
+    def phase(self, name, **attributes):
+        self._end_phase()
+        self._phase = self.tracer.start(name, parent=self.span, **attributes)
+        self.tracer.activate(self._phase)
+
+    def end(self, **attributes):
+        self._end_phase()
+        for key, value in attributes.items():
+            self.span.set(key, value)
+        self.span.end()
+        self.tracer.activate(None)
+
+    def _end_phase(self):
+        if self._phase is not None:
+            self._phase.end()
+            self._phase = None
+        self.tracer.activate(self.span)
+
+
+# ── OTLP JSON file export ──
+def _value(v):
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def _attributes(attributes):
+    return [{"key": k, "value": _value(v)} for k, v in attributes.items()]
+
+
+def otlp_span(span):
+    out = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _attributes(span.attributes),
+        "status": {"code": span.status or STATUS_OK},
+    }
+    if span.parent_id:
+        out["parentSpanId"] = span.parent_id
+    if span.message:
+        out["status"]["message"] = span.message
+    if span.events:
+        out["events"] = [
+            {"timeUnixNano": str(t), "name": name, "attributes": _attributes(attrs)}
+            for t, name, attrs in span.events
+        ]
+    return out
+
+
+class OtlpFileExporter:
+    # ended spans are buffered and appended in batches by a background
+    # thread, so a span end costs the script thread one deque append
+
+    def __init__(self, path, service="quiz-app", flush_interval=2.0, max_buffer=10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.resource = {"attributes": _attributes({
+            "service.name": service,
+            "process.pid": os.getpid(),
+        })}
+        self._buffer = collections.deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+
+        # counters
+        self.exported = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._worker.start()
+
+    def export(self, span):
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(span)
+
+    def flush(self):
+        spans = []
+        while self._buffer:
+            try:
+                spans.append(self._buffer.popleft())
+            except IndexError:
+                break
+        if not spans:
+            return
+        request = {"resourceSpans": [{
+            "resource": self.resource,
+            "scopeSpans": [{
+                "scope": {"name": "quiz"},
+                "spans": [otlp_span(s) for s in spans],
+            }],
+        }]}
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                self.exported += len(spans)
+            except OSError:
+                self.write_errors += 1
+
+    def close(self):
+        self._stop.set()
+        self._worker.join(5.0)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def stats(self):
+        return {
+            "buffered": len(self._buffer),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+        }
+
+
+TRACER = Tracer()
+
+
+def configure(path, sample=1.0, service="quiz-app"):
+    # turn tracing on for this process; -> the exporter
+    TRACER.exporter = OtlpFileExporter(path, service=service)
+    TRACER.sample = sample
+    return TRACER.exporter
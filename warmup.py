@@ -0,0 +1,88 @@
+import threading
+import time
+
+# ── STARTUP WARM-UP ─────────────────────────────────────────────
+# Work done before anyone asks for it, so the first click after login
+# is not the slowest one:
+#   connect()    once per process: resolve the backend host and open
+#                pooled keep-alive (TCP + TLS) connections to it
+#   speculate()  while a login form is on screen (QUIZ_WARMUP_ROUNDS,
+#                off by default: each one is a paid generation):
+#                generate the first round of each category at the
+#                default difficulty in the background, for no user.
+#                Results land in the shared quiz cache;
+#                a click while one is still generating joins it through
+#                request coalescing instead of starting another.
+# A key is skipped when the cache already holds a fresh set for it or
+# a speculative generation for it is in flight, so rounds are
+# generated at most once per cache TTL, not once per login.
+
+
+class Warmup:
+    def __init__(self, client, executor, generate, cached, connections=4):
+        self.client = client
+        self.executor = executor
+        self.generate = generate        # payload -> (questions, err)
+        self.cached = cached            # payload -> bool
+        self.connections = connections
+
+        self._lock = threading.Lock()
+        self._in_flight = set()
+
+        # counters
+        self.connected = 0
+        self.connect_seconds = 0.0
+        self.connect_errors = 0
+        self.speculated = 0
+        self.speculated_ok = 0
+        self.skipped = 0
+
+    def connect(self):
+        # in the background: app start-up does not wait on the network
+        threading.Thread(target=self._connect, name="warmup", daemon=True).start()
+
+    def _connect(self):
+        start = time.perf_counter()
+        try:
+            self.connected = self.client.warm(self.connections)
+        except Exception:
+            self.connect_errors += 1
+        self.connect_seconds = time.perf_counter() - start
+
+    def speculate(self, payloads):
+        # payloads: {key: /generate-quiz payload}
+        for key, payload in payloads.items():
+            with self._lock:
+                if key in self._in_flight:
+                    self.skipped += 1
+                    continue
+                self._in_flight.add(key)
+            if self.cached(payload):
+                with self._lock:
+                    self._in_flight.discard(key)
+                    self.skipped += 1
+                continue
+            self.speculated += 1
+            self.executor.submit(self._generate, key, payload)
+
+    def _generate(self, key, payload):
+        try:
+            questions, _ = self.generate(payload)
+            if questions:
+                self.speculated_ok += 1
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            "connections": self.connected,
+            "connect_seconds": self.connect_seconds,
+            "connect_errors": self.connect_errors,
+            "speculated": self.speculated,
+            "speculated_ok": self.speculated_ok,
+            "skipped": self.skipped,
+            "in_flight": in_flight,
+        }